@@ -0,0 +1,406 @@
+# avaluacio_vectorial.py - AVALUACIÓ EN LOT DE TOTA LA POBLACIÓ AMB NUMPY
+
+from collections import defaultdict
+from time import perf_counter_ns
+from typing import List, Dict, Optional, Callable
+
+try:
+    import numpy as np
+except ImportError:  # numpy és opcional: sense ell només hi ha el backend python
+    np = None
+
+from data_structures import (
+    Assignacio, Treballador, Torn, NecessitatCobertura,
+    ServeiTorn, EstadistiquesGlobals, minuts_absoluts, MINUTS_DIA, DESCANS_MINIM_MINUTS
+)
+import constraints as c
+
+NUMPY_DISPONIBLE = np is not None
+
+
+class AvaluadorVectorial:
+    """
+    Avalua tota una generació en una sola crida. Treballadors, necessitats i dies
+    es codifiquen com a índexs enters i la població és una matriu (individu × necessitat)
+    amb l'índex del treballador assignat o -1.
+
+    Les restriccions amb nucli vectorial es calculen amb operacions sobre arrays;
+    la resta (o si un nucli falla) es calculen amb la funció original sobre
+    les assignacions descodificades. Els scores coincideixen amb constraints.py.
+    """
+
+    def __init__(self, restriccions: List[Dict],
+                 ids_treballadors: List[str],
+                 necessitats: List[NecessitatCobertura],
+                 serveis_necessitat: List[Optional[ServeiTorn]],
+                 treballadors: Dict[str, Treballador],
+                 torns: Dict[str, Torn],
+                 calendari: Dict,
+                 estadistiques: EstadistiquesGlobals = None,
+                 decodifica: Callable[[List[int]], List[Assignacio]] = None,
+                 gestor: Optional['c.RestriccionManager'] = None):
+        if np is None:
+            raise ImportError("El backend d'avaluació 'numpy' necessita el paquet numpy")
+
+        self.restriccions = restriccions
+        self.ids_treballadors = ids_treballadors
+        self.necessitats = necessitats
+        self.treballadors = treballadors
+        self.torns = torns
+        self.calendari = calendari
+        self.estadistiques = estadistiques
+        self.decodifica = decodifica
+        self.gestor = gestor  # rep els comptadors i el perfil de cada lot
+        self.problema = c._ContextAvaluacio(treballadors, torns, necessitats, calendari, estadistiques)
+
+        self._precalcula(serveis_necessitat)
+
+    # ==================== PRECÀLCUL ====================
+
+    def _precalcula(self, serveis_necessitat: List[Optional[ServeiTorn]]):
+        """Arrays estàtics per necessitat, per treballador i per (necessitat, treballador)"""
+        treballadors = [self.treballadors[t] for t in self.ids_treballadors]
+        n_nec = len(self.necessitats)
+        n_treb = len(treballadors)
+        necessitats_map = {(nec.servei, nec.data): nec for nec in self.necessitats}
+
+        # Per necessitat: dia, interval en minuts absoluts i durada
+        dies = sorted({nec.data for nec in self.necessitats})
+        index_dia = {d: k for k, d in enumerate(dies)}
+        self.dia = np.array([index_dia[nec.data] for nec in self.necessitats], dtype=np.int64)
+        self.ordinal = np.array([nec.data.toordinal() for nec in self.necessitats], dtype=np.int64)
+        self.inici = np.zeros(n_nec, dtype=np.int64)
+        self.fi = np.zeros(n_nec, dtype=np.int64)
+        self.durada = np.zeros(n_nec, dtype=np.float64)
+        for i, (nec, servei) in enumerate(zip(self.necessitats, serveis_necessitat)):
+            if servei is None:
+                continue
+            self.inici[i] = minuts_absoluts(nec.data, servei.hora_inici)
+            self.fi[i] = minuts_absoluts(nec.data, servei.hora_fi)
+            if servei.hora_fi < servei.hora_inici:
+                self.fi[i] += MINUTS_DIA
+            self.durada[i] = servei.durada_hores()
+
+        # Cobertura: grup de necessitats amb la mateixa clau (servei, data)
+        index_clau = {}
+        self.clau = np.array([index_clau.setdefault((nec.servei, nec.data), len(index_clau))
+                              for nec in self.necessitats], dtype=np.int64)
+        self.necessitats_per_clau = np.bincount(self.clau, minlength=len(index_clau))
+
+        # Per treballador
+        self.no_grup_t = np.array([t.grup != 'T' for t in treballadors], dtype=bool)
+        self.hores_realitzades = np.array([t.hores_anuals_realitzades for t in treballadors])
+        self.max_hores_anuals = np.array([t.max_hores_anuals for t in treballadors])
+        self.max_hores_ampliables = np.array([t.max_hores_ampliables for t in treballadors])
+        self.canvis_zona_historic = np.array([t.canvis_zona for t in treballadors], dtype=np.int64)
+        self.canvis_torn_historic = np.array([t.canvis_torn for t in treballadors], dtype=np.int64)
+        self.descans = np.array([[t.te_descans(d) for t in treballadors] for d in dies],
+                                dtype=bool).reshape(len(dies), n_treb)
+
+        # Per (necessitat, treballador): violacions i canvis que només depenen del parell
+        self.viola_formacio = np.zeros((n_nec, n_treb), dtype=bool)
+        self.viola_linia = np.zeros((n_nec, n_treb), dtype=bool)
+        self.viola_divendres = np.zeros((n_nec, n_treb), dtype=bool)
+        self.canvi_zona = np.zeros((n_nec, n_treb), dtype=bool)
+        self.canvi_torn = np.zeros((n_nec, n_treb), dtype=bool)
+        canvis_zona = {}
+        canvis_torn = {}
+        for i, (nec, servei) in enumerate(zip(self.necessitats, serveis_necessitat)):
+            nec_map = necessitats_map[(nec.servei, nec.data)]
+            for w, t in enumerate(treballadors):
+                self.viola_formacio[i, w] = not nec_map.formacio.intersection(t.habilitacions)
+                self.viola_linia[i, w] = t.linia != nec_map.linia
+                if (w, nec_map.zona) not in canvis_zona:
+                    canvis_zona[(w, nec_map.zona)] = t.es_canvi_zona(nec_map.zona)
+                if (w, nec_map.torn) not in canvis_torn:
+                    canvis_torn[(w, nec_map.torn)] = t.es_canvi_torn(nec_map.torn)
+                self.canvi_zona[i, w] = canvis_zona[(w, nec_map.zona)]
+                self.canvi_torn[i, w] = canvis_torn[(w, nec_map.torn)]
+                if servei is not None and nec.data.weekday() == 4:
+                    assignacio = Assignacio(
+                        treballador_id=t.id, torn_id=nec.servei, data=nec.data,
+                        hora_inici=servei.hora_inici, hora_fi=servei.hora_fi
+                    )
+                    self.viola_divendres[i, w] = c._viola_divendres(assignacio, self.treballadors)
+
+        # Històric: última assignació (12h, solapaments, única per dia) i dates de l'any
+        ultimes = []
+        dates_historic = defaultdict(set)
+        for w, treb_id in enumerate(self.ids_treballadors):
+            if not self.estadistiques:
+                continue
+            hist = self.estadistiques.get_historic(treb_id)
+            if hist and getattr(hist, 'ultima_assignacio', None):
+                ultima = hist.ultima_assignacio
+                inici, fi = ultima.interval_minuts()
+                ultimes.append((w, inici, fi, ultima.data.toordinal()))
+            for a in hist.assignacions_any:
+                dates_historic[w].add(a.data.toordinal())
+        self.ultima_w = np.array([u[0] for u in ultimes], dtype=np.int64)
+        self.ultima_inici = np.array([u[1] for u in ultimes], dtype=np.int64)
+        self.ultima_fi = np.array([u[2] for u in ultimes], dtype=np.int64)
+        self.ultima_ordinal = np.array([u[3] for u in ultimes], dtype=np.int64)
+
+        # Eix de dies per als dies consecutius (horitzó + dates de l'històric)
+        ordinals = {d.toordinal() for d in dies}
+        for dates in dates_historic.values():
+            ordinals |= dates
+        self.primer_ordinal = min(ordinals) if ordinals else 0
+        mida_eix = (max(ordinals) - self.primer_ordinal + 1) if ordinals else 0
+        self.dies_historic = np.zeros((n_treb, mida_eix), dtype=bool)
+        for w, dates in dates_historic.items():
+            for o in dates:
+                self.dies_historic[w, o - self.primer_ordinal] = True
+        self.eix_dia = self.ordinal - self.primer_ordinal
+
+    # ==================== AVALUACIÓ ====================
+
+    def avalua_lot(self, matriu) -> List[Dict]:
+        """
+        Avalua una matriu (individu × necessitat) d'índexs de treballador (-1 = sense assignar).
+        Retorna un resultat per individu amb el mateix format que evalua_solucio.
+        Si hi ha gestor, el lot se suma als seus comptadors per nivell i al perfil.
+        """
+        lot = _Lot(self, np.asarray(matriu, dtype=np.int64).reshape(-1, len(self.necessitats)))
+        mida = lot.matriu.shape[0]
+        totals = [0] * mida
+        detalls = [{} for _ in range(mida)]
+        contextos = [None] * mida  # context d'avaluació per individu (només si cal la funció original)
+        temps_ns = {}
+
+        for restriccio in self.restriccions:
+            inici = perf_counter_ns()
+            nucli = NUCLIS_VECTORIALS.get(restriccio['funcio'])
+            scores = None
+            if nucli is not None:
+                try:
+                    scores = nucli(lot).tolist()
+                except Exception:
+                    scores = None  # es recalcula amb la funció original
+            for p in range(mida):
+                try:
+                    if scores is not None:
+                        score = scores[p]
+                    else:
+                        if contextos[p] is None:
+                            contextos[p] = c.ContextSolucio(self.problema, lot.assignacions(p))
+                        score = c.avalua_restriccio(restriccio['funcio'], contextos[p])
+                    score_ponderat = score * restriccio['pes']
+                    totals[p] += score_ponderat
+                    detalls[p][restriccio['nom']] = {
+                        'score': score,
+                        'pes': restriccio['pes'],
+                        'ponderat': score_ponderat
+                    }
+                except Exception as e:
+                    print(f"Error en {restriccio['nom']}: {e}")
+                    detalls[p][restriccio['nom']] = {
+                        'score': 0,
+                        'pes': restriccio['pes'],
+                        'ponderat': 0,
+                        'error': str(e)
+                    }
+            temps_ns[restriccio['nom']] = perf_counter_ns() - inici
+
+        resultats = [{'total': total, 'detall': detall} for total, detall in zip(totals, detalls)]
+        if self.gestor is not None:
+            self.gestor.registra_lot(resultats, temps_ns)
+        return resultats
+
+
+class _Lot:
+    """Dades derivades d'una matriu de població, calculades només si algun nucli les necessita"""
+
+    def __init__(self, avaluador: AvaluadorVectorial, matriu):
+        self.av = avaluador
+        self.matriu = matriu
+        self.valid = matriu >= 0
+        self.files, self.columnes = np.nonzero(self.valid)
+        self.w = matriu[self.files, self.columnes]
+        self._cache = {}
+        self._decodificades = {}
+
+    def assignacions(self, p: int) -> List[Assignacio]:
+        if p not in self._decodificades:
+            self._decodificades[p] = self.av.decodifica(self.matriu[p].tolist())
+        return self._decodificades[p]
+
+    @property
+    def num_assignacions(self):
+        return self.valid.sum(axis=1)
+
+    def per_treballador(self, pesos=None):
+        """Suma per (individu, treballador) en l'ordre de les necessitats"""
+        mida, n_treb = self.matriu.shape[0], len(self.av.ids_treballadors)
+        suma = np.zeros((mida, n_treb), dtype=np.float64 if pesos is not None else np.int64)
+        np.add.at(suma, (self.files, self.w), 1 if pesos is None else pesos)
+        return suma
+
+    def comptador(self):
+        if 'comptador' not in self._cache:
+            self._cache['comptador'] = self.per_treballador()
+        return self._cache['comptador']
+
+    def parelles(self):
+        """
+        Assignacions de cada (individu, treballador) ordenades per inici, amb l'última
+        assignació de l'històric. Retorna (fila, és_mateix_treballador, anterior, següent)
+        per a cada parella consecutiva.
+        """
+        if 'parelles' in self._cache:
+            return self._cache['parelles']
+        av = self.av
+        mida = self.matriu.shape[0]
+        n_ult = len(av.ultima_w)
+        files = np.concatenate([self.files, np.repeat(np.arange(mida), n_ult)])
+        ws = np.concatenate([self.w, np.tile(av.ultima_w, mida)])
+        inicis = np.concatenate([av.inici[self.columnes], np.tile(av.ultima_inici, mida)])
+        fins = np.concatenate([av.fi[self.columnes], np.tile(av.ultima_fi, mida)])
+        ordinals = np.concatenate([av.ordinal[self.columnes], np.tile(av.ultima_ordinal, mida)])
+        ordre = np.lexsort((inicis, ws, files))
+        files, ws = files[ordre], ws[ordre]
+        inicis, fins, ordinals = inicis[ordre], fins[ordre], ordinals[ordre]
+        mateix = (files[1:] == files[:-1]) & (ws[1:] == ws[:-1])
+        resultat = (files[1:][mateix], inicis[1:][mateix], fins[:-1][mateix],
+                    ordinals[1:][mateix] == ordinals[:-1][mateix])
+        self._cache['parelles'] = resultat
+        return resultat
+
+    def alguna(self, files_violacio):
+        """Vector booleà per individu: té alguna violació"""
+        marca = np.zeros(self.matriu.shape[0], dtype=bool)
+        marca[files_violacio] = True
+        return marca
+
+
+# ==================== NUCLIS VECTORIALS ====================
+
+def _proporcio_violacions(lot: _Lot, viola) -> 'np.ndarray':
+    """100 * (1 - violacions / assignacions), 100 si no hi ha assignacions"""
+    total = lot.num_assignacions
+    violacions = np.bincount(lot.files[viola], minlength=lot.matriu.shape[0])
+    return np.where(total == 0, 100.0, 100 * (1 - violacions / np.maximum(total, 1)))
+
+
+def _nucli_grup_T(lot):
+    return _proporcio_violacions(lot, lot.av.no_grup_t[lot.w])
+
+
+def _nucli_sense_descans(lot):
+    return _proporcio_violacions(lot, lot.av.descans[lot.av.dia[lot.columnes], lot.w])
+
+
+def _nucli_formacio(lot):
+    return _proporcio_violacions(lot, lot.av.viola_formacio[lot.columnes, lot.w])
+
+
+def _nucli_linia(lot):
+    return _proporcio_violacions(lot, lot.av.viola_linia[lot.columnes, lot.w])
+
+
+def _nucli_hores_anuals(lot):
+    av = lot.av
+    present = lot.comptador() > 0
+    hores = av.hores_realitzades + lot.per_treballador(av.durada[lot.columnes])
+    violacions = (present & (hores > av.max_hores_ampliables)).sum(axis=1)
+    bonus = (present & (hores <= av.max_hores_ampliables) & (hores <= av.max_hores_anuals)).sum(axis=1)
+    total = present.sum(axis=1)
+    base = np.maximum(total, 1)
+    score = np.minimum(100, 100 * (1 - violacions / base) + (bonus / base) * 10)
+    return np.where(total == 0, 100.0, score)
+
+
+def _nucli_unica_per_dia(lot):
+    files, _, _, mateix_dia = lot.parelles()
+    return np.where(lot.alguna(files[mateix_dia]), 0, 100)
+
+
+def _nucli_solapaments(lot):
+    files, inicis, fins_anteriors, mateix_dia = lot.parelles()
+    return np.where(lot.alguna(files[mateix_dia & (fins_anteriors > inicis)]), 0, 100)
+
+
+def _nucli_descans_12h(lot):
+    files, inicis, fins_anteriors, _ = lot.parelles()
+    return np.where(lot.alguna(files[inicis - fins_anteriors < DESCANS_MINIM_MINUTS]), 0, 100)
+
+
+def _nucli_dies_consecutius(lot):
+    av = lot.av
+    mida = lot.matriu.shape[0]
+    treballa = np.broadcast_to(av.dies_historic, (mida,) + av.dies_historic.shape).copy()
+    treballa[lot.files, lot.w, av.eix_dia[lot.columnes]] = True
+    # Longitud de la ratxa que acaba a cada dia
+    acumulat = np.cumsum(treballa, axis=2)
+    reinici = np.maximum.accumulate(np.where(treballa, 0, acumulat), axis=2)
+    ratxa_maxima = (acumulat - reinici).max(axis=2, initial=1)
+    present = lot.comptador() > 0
+    exces = np.where(present, np.maximum(ratxa_maxima - 9, 0), 0).sum(axis=1)
+    total = present.sum(axis=1)
+    score = np.maximum(0, 100 - (exces / np.maximum(total * 5, 1) * 100))
+    return np.where(total == 0, 100.0, score)
+
+
+def _nucli_divendres(lot):
+    return np.where(lot.alguna(lot.files[lot.av.viola_divendres[lot.columnes, lot.w]]), 0, 100)
+
+
+def _equitat(lot, canvi, historic):
+    canvis = np.zeros((lot.matriu.shape[0], len(lot.av.ids_treballadors)), dtype=np.int64)
+    es_canvi = canvi[lot.columnes, lot.w]
+    np.add.at(canvis, (lot.files[es_canvi], lot.w[es_canvi]), 1)
+    present = canvis > 0
+    valors = np.where(present, canvis + historic, 0)
+    n = present.sum(axis=1)
+    base = np.maximum(n, 1)
+    mitjana = valors.sum(axis=1) / base
+    variancia = np.where(present, (valors - mitjana[:, None]) ** 2, 0).sum(axis=1) / base
+    score = np.maximum(0, 100 - (variancia ** 0.5 / 3 * 100))
+    return np.where(n == 0, 100.0, score)
+
+
+def _nucli_equitat_zona(lot):
+    return _equitat(lot, lot.av.canvi_zona, lot.av.canvis_zona_historic)
+
+
+def _nucli_equitat_torn(lot):
+    return _equitat(lot, lot.av.canvi_torn, lot.av.canvis_torn_historic)
+
+
+def _nucli_cobertura(lot):
+    av = lot.av
+    if len(av.necessitats) == 0:
+        return np.full(lot.matriu.shape[0], 100.0)
+    coberta = np.zeros((lot.matriu.shape[0], len(av.necessitats_per_clau)), dtype=bool)
+    coberta[lot.files, av.clau[lot.columnes]] = True
+    return 100 * ((coberta * av.necessitats_per_clau).sum(axis=1) / len(av.necessitats))
+
+
+def _nucli_distribucio(lot):
+    comptador = lot.comptador()
+    present = comptador > 0
+    n = present.sum(axis=1)
+    base = np.maximum(n, 1)
+    mitjana = comptador.sum(axis=1) / base
+    desviacio = np.where(present, np.abs(comptador - mitjana[:, None]), 0).sum(axis=1) / base
+    score = np.maximum(0, 100 - (desviacio * 10))
+    return np.where(n == 0, 100.0, score)
+
+
+# Restriccions amb nucli vectorial (funció -> nucli)
+NUCLIS_VECTORIALS = {
+    c.restriccio_grup_T: _nucli_grup_T,
+    c.restriccio_sense_descans: _nucli_sense_descans,
+    c.restriccio_formacio_requerida: _nucli_formacio,
+    c.restriccio_linia_correcta: _nucli_linia,
+    c.restriccio_hores_anuals: _nucli_hores_anuals,
+    c.restriccio_unica_assignacio_per_dia_rigida: _nucli_unica_per_dia,
+    c.restriccio_sense_solapaments_rigida: _nucli_solapaments,
+    c.restriccio_dies_consecutius: _nucli_dies_consecutius,
+    c.restriccio_descans_minim_12h_rigida: _nucli_descans_12h,
+    c.restriccio_divendres_cap_setmana_rigida: _nucli_divendres,
+    c.restriccio_equitat_canvis_zona: _nucli_equitat_zona,
+    c.restriccio_equitat_canvis_torn: _nucli_equitat_torn,
+    c.restriccio_cobertura_completa: _nucli_cobertura,
+    c.restriccio_distribucio_equilibrada: _nucli_distribucio,
+}
@@ -0,0 +1,248 @@
+# benchmark_ag.py - MESURA DEL COST PER FILL DE L'ALGORISME GENÈTIC
+
+import argparse
+import random
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from data_loader import DataLoader
+from data_structures import Assignacio
+from genetic_algorithm import AlgorismeGenetic
+from main import configura_restriccions
+
+
+class _ValidesaBase:
+    """
+    Còpia congelada de evalua_validesa i reparacio de la versió inicial (sobre llistes
+    d'Assignacio, amb el bucle de cobertura assignacions × necessitats i la comprovació
+    de 12h que ordena les assignacions del treballador a cada candidat). Només s'han fet
+    dos canvis perquè pugui funcionar: la formació es compara per intersecció (la
+    necessitat en porta un conjunt) i el servei de la necessitat es pren del model.
+    """
+
+    def __init__(self, ag: AlgorismeGenetic):
+        self.ag = ag
+
+    def _compleix_descans_12h(self, treb_id: str, data_nova, hora_inici_nova,
+                              assignacions_actuals: List[Assignacio]) -> bool:
+        historic = self.ag.estadistiques.get_historic(treb_id)
+        ultimes_assignacions = []
+        if historic and historic.assignacions_any:
+            ultimes_assignacions.extend(historic.assignacions_any[-10:])
+        ultimes_assignacions.extend([a for a in assignacions_actuals if a.treballador_id == treb_id])
+        if not ultimes_assignacions:
+            return True
+        ultimes_assignacions.sort(key=lambda a: (a.data, a.hora_inici))
+        inici_nova = datetime.combine(data_nova, hora_inici_nova)
+        for assign_anterior in reversed(ultimes_assignacions):
+            if (data_nova - assign_anterior.data).days > 2:
+                continue
+            fi_anterior = assign_anterior.hora_fi_real()
+            if not isinstance(fi_anterior, datetime):
+                fi_anterior = datetime.combine(assign_anterior.data, fi_anterior)
+            if (inici_nova - fi_anterior).total_seconds() / 3600 < 12:
+                return False
+        return True
+
+    def evalua_validesa(self, solucio: List[Assignacio]) -> float:
+        penalitzacio = 0.0
+        treballador_dia = {}
+        for assign in solucio:
+            key = (assign.treballador_id, assign.data)
+            if key in treballador_dia:
+                penalitzacio += 50.0
+            else:
+                treballador_dia[key] = True
+        torn_data = {}
+        for assign in solucio:
+            key = (assign.torn_id, assign.data)
+            if key in torn_data:
+                penalitzacio += 50.0
+            else:
+                torn_data[key] = True
+        necessitats_cobertes = set()
+        for assign in solucio:
+            for nec in self.ag.necessitats:
+                if nec.servei == assign.torn_id and nec.data == assign.data:
+                    necessitats_cobertes.add((nec.servei, nec.data))
+        penalitzacio += (len(self.ag.necessitats) - len(necessitats_cobertes)) * 20.0
+        return penalitzacio
+
+    def reparacio(self, solucio: List[Assignacio]) -> List[Assignacio]:
+        ag = self.ag
+        vistes_torn_data = {}
+        treballador_dia_vistes = {}
+        solucio_sense_duplicats = []
+        for assign in solucio:
+            key_torn = (assign.torn_id, assign.data)
+            key_treb = (assign.treballador_id, assign.data)
+            if key_torn in vistes_torn_data or key_treb in treballador_dia_vistes:
+                continue
+            solucio_sense_duplicats.append(assign)
+            vistes_torn_data[key_torn] = assign
+            treballador_dia_vistes[key_treb] = assign
+
+        necessitats_descobertes = [nec for nec in ag.necessitats
+                                   if (nec.servei, nec.data) not in vistes_torn_data]
+        for nec in necessitats_descobertes:
+            candidats_ordenats = []
+            for treb_id, treb in ag.treballadors_grup_t.items():
+                key_treb = (treb_id, nec.data)
+                if key_treb in treballador_dia_vistes:
+                    continue
+                if treb.te_descans(nec.data):
+                    continue
+                if treb.linia != nec.linia:
+                    continue
+                if not nec.formacio.intersection(treb.habilitacions):
+                    continue
+                prioritat = 0
+                if not treb.es_canvi_zona(nec.zona):
+                    prioritat += 10
+                if not treb.es_canvi_torn(nec.torn):
+                    prioritat += 10
+                if treb.esta_dins_limit_estandard():
+                    prioritat += 5
+                candidats_ordenats.append((treb_id, prioritat))
+            if not candidats_ordenats:
+                continue
+            candidats_ordenats.sort(key=lambda x: x[1], reverse=True)
+            servei = ag.serveis_necessitat[ag.index_necessitat[(nec.servei, nec.data)]]
+            if servei is None:
+                continue
+            for treb_id, _ in candidats_ordenats:
+                if not self._compleix_descans_12h(treb_id, nec.data, servei.hora_inici, solucio_sense_duplicats):
+                    continue
+                treb = ag.treballadors_grup_t[treb_id]
+                nova_assign = Assignacio(
+                    treballador_id=treb_id, torn_id=nec.servei, data=nec.data,
+                    hora_inici=servei.hora_inici, hora_fi=servei.hora_fi,
+                    durada_hores=servei.durada_hores(),
+                    es_canvi_zona=treb.es_canvi_zona(nec.zona),
+                    es_canvi_torn=treb.es_canvi_torn(nec.torn)
+                )
+                solucio_sense_duplicats.append(nova_assign)
+                treballador_dia_vistes[(treb_id, nec.data)] = nova_assign
+                vistes_torn_data[(nec.servei, nec.data)] = nova_assign
+                break
+        return solucio_sense_duplicats
+
+
+def _fill_pipeline_antic(ag: AlgorismeGenetic, base: _ValidesaBase, tasca: Tuple) -> Tuple[List[Assignacio], float]:
+    """
+    Pipeline de fills de la versió inicial (validesa, reparació condicional, revalidació
+    i segona reparació) amb la còpia congelada de _ValidesaBase. L'encreuament i la
+    mutació són els actuals, de manera que només es compara el pas de validesa i reparació
+    """
+    _, pare1, pare2, prob_mut, llavor = tasca
+    rng = random.Random(llavor)
+    fill = ag.encreuament(pare1, pare2, rng)
+    fill = ag.mutacio(fill, prob_mutacio=prob_mut, rng=rng)
+    solucio = ag.decodifica(fill)
+    validesa_penalty = base.evalua_validesa(solucio)
+    if validesa_penalty > 50:
+        solucio = base.reparacio(solucio)
+        validesa_penalty = base.evalua_validesa(solucio)
+    solucio = base.reparacio(solucio)
+    return solucio, validesa_penalty
+
+
+def mesura_fills(ag: AlgorismeGenetic, num_fills: int = 200, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Crea num_fills fills a partir d'una població inicial amb el pipeline de la versió
+    inicial i amb l'actual (mateixos pares i llavors) i en mesura el temps per fill,
+    separant la construcció (encreuament, mutació, validesa i reparació) de l'avaluació
+    completa, que en el pipeline actual aprofita els índexs de la construcció.
+    """
+    poblacio = ag.genera_poblacio_inicial()
+    rng = random.Random(seed)
+    tasques = [
+        ('fill', ag.seleccio_torneig(poblacio, rng=rng), ag.seleccio_torneig(poblacio, rng=rng),
+         0.1, rng.getrandbits(63))
+        for _ in range(num_fills)
+    ]
+    # Escalfa la memòria cau d'assignacions perquè no afavoreixi el segon pipeline
+    for genoma, _ in poblacio:
+        ag._avalua(genoma)
+
+    base = _ValidesaBase(ag)
+
+    def avalua_antic(construit):
+        solucio, _ = construit
+        return ag.restriccions.evalua_solucio(solucio, ag.treballadors, ag.torns, ag.necessitats,
+                                              ag.calendari, ag.estadistiques)
+
+    def avalua_actual(construit):
+        genoma, validesa_penalty, indexos = construit
+        return ag._puntua(genoma, ag._avalua(genoma, indexos), validesa_penalty)
+
+    resultats = {}
+    for nom, construeix, avalua in (('inicial', lambda t: _fill_pipeline_antic(ag, base, t), avalua_antic),
+                                    ('actual', ag._construeix, avalua_actual)):
+        ag.cache_fitness.entrades.clear()
+        inici = perf_counter()
+        construits = [construeix(t) for t in tasques]
+        mig = perf_counter()
+        for construit in construits:
+            avalua(construit)
+        fi = perf_counter()
+        resultats[nom] = {
+            'ms_construccio_per_fill': (mig - inici) * 1000.0 / num_fills,
+            'ms_avaluacio_per_fill': (fi - mig) * 1000.0 / num_fills,
+            'ms_per_fill': (fi - inici) * 1000.0 / num_fills
+        }
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesura el cost per fill de l'algorisme genètic")
+    parser.add_argument('--db', default='treballadors.db', help='Base de dades SQLite')
+    parser.add_argument('--start-date', help='Data inicial (YYYY-MM-DD)')
+    parser.add_argument('--end-date', help='Data final (YYYY-MM-DD)')
+    parser.add_argument('--fills', type=int, default=200, help='Nombre de fills a mesurar')
+    parser.add_argument('--poblacio', type=int, default=50, help='Mida de la població inicial')
+    parser.add_argument('--seed', type=int, default=1, help='Llavor aleatòria')
+    args = parser.parse_args()
+
+    data_loader = DataLoader(args.db)
+    torns = data_loader.carrega_torns()
+    calendari = data_loader.carrega_calendari()
+    treballadors = data_loader.carrega_treballadors()
+    estadistiques = data_loader.carrega_historic(treballadors)
+    necessitats = data_loader.carrega_necessitats_cobertura()
+    data_loader.close()
+
+    if args.start_date:
+        inici = datetime.strptime(args.start_date, '%Y-%m-%d').date()
+        necessitats = [n for n in necessitats if n.data >= inici]
+    if args.end_date:
+        fi = datetime.strptime(args.end_date, '%Y-%m-%d').date()
+        necessitats = [n for n in necessitats if n.data <= fi]
+    if not necessitats:
+        print("⚠️  No hi ha necessitats de cobertura per mesurar")
+        return
+
+    ag = AlgorismeGenetic(
+        treballadors=treballadors, torns=torns, necessitats=necessitats, calendari=calendari,
+        restriccions=configura_restriccions(), estadistiques=estadistiques,
+        mida_poblacio=args.poblacio, seed=args.seed
+    )
+
+    print(f"\n⏱️  Mesurant {args.fills} fills ({len(necessitats)} necessitats)...")
+    resultats = mesura_fills(ag, args.fills, args.seed)
+    for nom, temps in resultats.items():
+        print(f"   {nom:>9}: {temps['ms_per_fill']:.2f} ms/fill "
+              f"(construcció {temps['ms_construccio_per_fill']:.2f} ms, "
+              f"avaluació {temps['ms_avaluacio_per_fill']:.2f} ms)")
+    for camp, nom in (('ms_construccio_per_fill', 'Construcció'), ('ms_per_fill', 'Total per fill')):
+        guany = resultats['inicial'][camp] / max(resultats['actual'][camp], 1e-9)
+        print(f"   → {nom} {guany:.2f}x més ràpid")
+    # El que queda és sobretot el cos de les restriccions (l'avaluació no canvia entre pipelines)
+    actual = resultats['actual']
+    print(f"   → Avaluació: {100.0 * actual['ms_avaluacio_per_fill'] / max(actual['ms_per_fill'], 1e-9):.0f}% "
+          f"del cost actual per fill")
+
+
+if __name__ == '__main__':
+    main()
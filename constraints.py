@@ -1,64 +1,392 @@
 # constraints.py - ACTUALITZAT amb NOVES RESTRICCIONS
 
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional, Tuple, TYPE_CHECKING
 from data_structures import (
-    Assignacio, Treballador, Torn, NecessitatCobertura, 
+    Assignacio, Treballador, Torn, NecessitatCobertura,
     DiaCalendari, EstadistiquesGlobals
 )
+from abc import ABC, abstractmethod
 from collections import defaultdict
+import bisect
 from datetime import timedelta, datetime, date
+from functools import cached_property, wraps
+from time import perf_counter_ns
+import math
+
+if TYPE_CHECKING:
+    from avaluacio_vectorial import AvaluadorVectorial
+
+# Nivells de restricció: una rígida es compleix (100) o no; les flexibles puntuen de 0 a 100
+NIVELL_RIGID = 'rigid'
+NIVELL_FLEXIBLE = 'flexible'
+NIVELLS = (NIVELL_RIGID, NIVELL_FLEXIBLE)
+
+# Cubetes de l'histograma de latències per octava (resolució d'un ~9%)
+CUBETES_OCTAVA = 8
+
+
+class PerfilRestriccio:
+    """
+    Crides, temps acumulat i errors d'una restricció. Les latències es guarden en un
+    histograma logarítmic: es poden sumar entre processos i en surten els percentils.
+    """
+    __slots__ = ('crides', 'ns', 'errors', 'histograma')
 
-class RestriccionManager:
     def __init__(self):
+        self.crides = 0
+        self.ns = 0
+        self.errors = 0
+        self.histograma: Dict[int, int] = {}
+
+    def registra(self, ns: int, error: bool):
+        self.crides += 1
+        self.ns += ns
+        if error:
+            self.errors += 1
+        cubeta = int(math.log2(ns) * CUBETES_OCTAVA) if ns > 0 else 0
+        self.histograma[cubeta] = self.histograma.get(cubeta, 0) + 1
+
+
+def _percentil_histograma(histograma: Dict[int, int], fraccio: float) -> float:
+    """Cota superior (ns) de la cubeta on cau el percentil demanat"""
+    total = sum(histograma.values())
+    acumulat = 0
+    for cubeta in sorted(histograma):
+        acumulat += histograma[cubeta]
+        if acumulat >= fraccio * total:
+            return 2 ** ((cubeta + 1) / CUBETES_OCTAVA)
+    return 0.0
+
+
+class RestriccionManager:
+    def __init__(self, perfilat: bool = False):
         self.restriccions = []
-    
-    def afegeix_restriccio(self, funcio, pes: float, nom: str):
-        """Afegeix una nova restricció al sistema"""
+        # Perfil per restricció (temps, crides, errors); prou barat per deixar-lo actiu
+        self.perfilat = perfilat
+        self.perfil: Dict[str, PerfilRestriccio] = {}
+        self._problema = None  # context del problema de l'última avaluació (es reutilitza)
+        self._selectivitat = []  # per restricció: [avaluacions, violacions]
+        # Comptadors per nivell (s'agreguen entre processos com els de la cache de fitness)
+        self.comptadors = {
+            'individus_avaluats': 0,
+            'individus_dominats': 0,
+            'avaluacions_rigides': 0,
+            'violacions_rigides': 0,
+            'avaluacions_flexibles': 0,
+            'omeses_flexibles': 0
+        }
+
+    def __getstate__(self):
+        # El context del problema no viatja als processos: cadascun el reconstrueix
+        estat = self.__dict__.copy()
+        estat['_problema'] = None
+        return estat
+
+    def afegeix_restriccio(self, funcio, pes: float, nom: str,
+                           nivell: Optional[str] = None, cost: Optional[float] = None):
+        """
+        Afegeix una nova restricció al sistema. La funció pot tenir la signatura
+        clàssica (assignacions, treballadors, torns, necessitats, calendari, estadistiques)
+        o rebre un ContextSolucio si està decorada amb @restriccio_contextual.
+        El nivell (rígid o flexible) i el cost relatiu, si no s'indiquen, són els que
+        declara la funció amb el decorador (per defecte flexible i 1.0).
+        """
+        nivell = nivell or getattr(funcio, 'nivell', NIVELL_FLEXIBLE)
+        if nivell not in NIVELLS:
+            raise ValueError(f"Nivell de restricció desconegut: {nivell}")
         self.restriccions.append({
             'funcio': funcio,
             'pes': pes,
-            'nom': nom
+            'nom': nom,
+            'nivell': nivell,
+            'cost': cost if cost is not None else getattr(funcio, 'cost', 1.0)
         })
-    
+        self._selectivitat.append([0, 0])
+
+    def context_problema(self, treballadors: Dict[str, Treballador],
+                         torns: Dict[str, Torn],
+                         necessitats: List[NecessitatCobertura],
+                         calendari: Dict,
+                         estadistiques: EstadistiquesGlobals = None) -> '_ContextAvaluacio':
+        """
+        Context amb les dades del problema (mapa de necessitats, última assignació de
+        l'històric...). Es construeix un sol cop per execució: mentre les dades siguin
+        els mateixos objectes es reutilitza el de l'avaluació anterior.
+        """
+        problema = self._problema
+        if (problema is None or problema.treballadors is not treballadors
+                or problema.torns is not torns or problema.necessitats is not necessitats
+                or problema.calendari is not calendari or problema.estadistiques is not estadistiques):
+            problema = _ContextAvaluacio(treballadors, torns, necessitats, calendari, estadistiques)
+            self._problema = problema
+        return problema
+
     def evalua_solucio(self, assignacions: List[Assignacio],
                        treballadors: Dict[str, Treballador],
                        torns: Dict[str, Torn],
                        necessitats: List[NecessitatCobertura],
                        calendari: Dict,
-                       estadistiques: EstadistiquesGlobals = None) -> Dict:
+                       estadistiques: EstadistiquesGlobals = None,
+                       rapid: bool = False) -> Dict:
         """
         Retorna un diccionari amb el score total i scores individuals
+        (en mode ràpid, vegeu evalua_context)
+        """
+        problema = self.context_problema(treballadors, torns, necessitats, calendari, estadistiques)
+        return self.evalua_context(ContextSolucio(problema, assignacions), rapid)
+
+    def ordre_rigides(self) -> List[int]:
         """
+        Índexs de les restriccions rígides de la més barata i selectiva a la menys:
+        cost relatiu dividit per la taxa de violació observada (amb suavitzat de Laplace)
+        """
+        rigides = [i for i, r in enumerate(self.restriccions) if r['nivell'] == NIVELL_RIGID]
+        return sorted(rigides, key=lambda i: self.restriccions[i]['cost'] * (self._selectivitat[i][0] + 2)
+                      / (self._selectivitat[i][1] + 1))
+
+    def _avalua_una(self, restriccio: Dict, ctx: 'ContextSolucio') -> Dict:
+        """Detall d'una restricció (score 0 i l'error si la funció falla)"""
+        inici = perf_counter_ns() if self.perfilat else 0
+        try:
+            score = avalua_restriccio(restriccio['funcio'], ctx)
+            detall = {
+                'score': score,
+                'pes': restriccio['pes'],
+                'ponderat': score * restriccio['pes']
+            }
+        except Exception as e:
+            print(f"Error en {restriccio['nom']}: {e}")
+            detall = {
+                'score': 0,
+                'pes': restriccio['pes'],
+                'ponderat': 0,
+                'error': str(e)
+            }
+        if self.perfilat:
+            perfil = self.perfil.get(restriccio['nom'])
+            if perfil is None:
+                perfil = self.perfil[restriccio['nom']] = PerfilRestriccio()
+            perfil.registra(perf_counter_ns() - inici, 'error' in detall)
+        return detall
+
+    def evalua_context(self, ctx: 'ContextSolucio', rapid: bool = False) -> Dict:
+        """
+        Avalua les restriccions sobre el context d'una solució: primer les rígides
+        (vegeu ordre_rigides) i després les flexibles. Una rígida es compleix si retorna 100.
+        En mode ràpid, si alguna rígida és violada l'individu queda dominat: no s'avaluen
+        les flexibles i el total és la puntuació parcial del nivell rígid, una cota inferior
+        del total exacte (tots els scores són dins [0, 100]) que no depèn de l'ordre
+        d'avaluació i manté la graduació entre individus dominats. El resultat porta
+        'dominada': True i 'cota_superior' (la parcial més el màxim de les flexibles omeses).
+        """
+        comptadors = self.comptadors
+        comptadors['individus_avaluats'] += 1
+        detalls: List[Optional[Dict]] = [None] * len(self.restriccions)
+
+        dominada = False
+        for i in self.ordre_rigides():
+            detalls[i] = self._avalua_una(self.restriccions[i], ctx)
+            comptadors['avaluacions_rigides'] += 1
+            self._selectivitat[i][0] += 1
+            if detalls[i]['score'] < 100:
+                comptadors['violacions_rigides'] += 1
+                self._selectivitat[i][1] += 1
+                dominada = rapid
+
+        if dominada:
+            comptadors['individus_dominats'] += 1
+            parcial = 0
+            maxim_omeses = 0
+            detall_scores = {}
+            for restriccio, detall in zip(self.restriccions, detalls):
+                if detall is None:
+                    comptadors['omeses_flexibles'] += 1
+                    maxim_omeses += 100 * restriccio['pes']
+                    detall = {'score': 0, 'pes': restriccio['pes'], 'ponderat': 0, 'omesa': True}
+                parcial += detall['ponderat']
+                detall_scores[restriccio['nom']] = detall
+            return {
+                'total': parcial,
+                'detall': detall_scores,
+                'dominada': True,
+                'cota_superior': parcial + maxim_omeses
+            }
+
         score_total = 0
         detall_scores = {}
-        
-        for restriccio in self.restriccions:
-            try:
-                score = restriccio['funcio'](
-                    assignacions, treballadors, torns, 
-                    necessitats, calendari, estadistiques
-                )
-                score_ponderat = score * restriccio['pes']
-                score_total += score_ponderat
-                detall_scores[restriccio['nom']] = {
-                    'score': score,
-                    'pes': restriccio['pes'],
-                    'ponderat': score_ponderat
-                }
-            except Exception as e:
-                print(f"Error en {restriccio['nom']}: {e}")
-                detall_scores[restriccio['nom']] = {
-                    'score': 0,
-                    'pes': restriccio['pes'],
-                    'ponderat': 0,
-                    'error': str(e)
-                }
-        
+        for i, restriccio in enumerate(self.restriccions):
+            if detalls[i] is None:
+                detalls[i] = self._avalua_una(restriccio, ctx)
+                comptadors['avaluacions_flexibles'] += 1
+            # Suma en l'ordre de registre: el total no depèn de l'ordre d'avaluació
+            score_total += detalls[i]['ponderat']
+            detall_scores[restriccio['nom']] = detalls[i]
+
         return {
             'total': score_total,
             'detall': detall_scores
         }
 
+    def registra_lot(self, resultats: List[Dict], temps_ns: Dict[str, int]):
+        """
+        Suma als comptadors i al perfil una generació avaluada en lot (backend numpy).
+        Al lot s'avaluen totes les restriccions per a tots els individus: no hi ha
+        dominats ni flexibles omeses. El temps de cada restricció (temps_ns, nom -> ns
+        del lot sencer) es reparteix a parts iguals entre els individus.
+        """
+        mida = len(resultats)
+        if not mida:
+            return
+        comptadors = self.comptadors
+        comptadors['individus_avaluats'] += mida
+        for i, restriccio in enumerate(self.restriccions):
+            nom = restriccio['nom']
+            if restriccio['nivell'] == NIVELL_RIGID:
+                violacions = sum(1 for r in resultats if r['detall'][nom]['score'] < 100)
+                comptadors['avaluacions_rigides'] += mida
+                comptadors['violacions_rigides'] += violacions
+                self._selectivitat[i][0] += mida
+                self._selectivitat[i][1] += violacions
+            else:
+                comptadors['avaluacions_flexibles'] += mida
+            if self.perfilat:
+                perfil = self.perfil.get(nom)
+                if perfil is None:
+                    perfil = self.perfil[nom] = PerfilRestriccio()
+                ns = temps_ns.get(nom, 0) // mida
+                for r in resultats:
+                    perfil.registra(ns, 'error' in r['detall'][nom])
+
+    def instantania(self) -> Dict:
+        """
+        Foto plana de tots els comptadors (nivells i perfil). Les claus del perfil són
+        (nom, camp) o (nom, cubeta); la diferència entre dues fotos es pot sumar a un
+        altre gestor amb afegeix_comptadors (agregació entre processos)
+        """
+        foto = dict(self.comptadors)
+        for nom, perfil in self.perfil.items():
+            foto[(nom, 'crides')] = perfil.crides
+            foto[(nom, 'ns')] = perfil.ns
+            foto[(nom, 'errors')] = perfil.errors
+            for cubeta, n in perfil.histograma.items():
+                foto[(nom, cubeta)] = n
+        return foto
+
+    def increment(self, abans: Dict) -> Dict:
+        """Diferència entre la instantània actual i la foto abans (per sumar-la a un altre gestor)"""
+        return {clau: valor - abans.get(clau, 0) for clau, valor in self.instantania().items()}
+
+    def afegeix_comptadors(self, delta: Dict):
+        """Suma l'increment d'una altra instantània (d'un altre procés) als comptadors"""
+        for clau, valor in delta.items():
+            if not valor:
+                continue
+            if isinstance(clau, tuple):
+                nom, camp = clau
+                perfil = self.perfil.get(nom)
+                if perfil is None:
+                    perfil = self.perfil[nom] = PerfilRestriccio()
+                if isinstance(camp, int):
+                    perfil.histograma[camp] = perfil.histograma.get(camp, 0) + valor
+                else:
+                    setattr(perfil, camp, getattr(perfil, camp) + valor)
+            elif clau in self.comptadors:
+                self.comptadors[clau] += valor
+
+    def resum_perfil(self, abans: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Temps per restricció des de la foto abans (o des de l'inici), de la que
+        consumeix més temps a la que menys: crides, temps total, mitjana, p95 i errors
+        """
+        abans = abans or {}
+        files = []
+        for nom, perfil in self.perfil.items():
+            crides = perfil.crides - abans.get((nom, 'crides'), 0)
+            if crides <= 0:
+                continue
+            ns = perfil.ns - abans.get((nom, 'ns'), 0)
+            histograma = {cubeta: n - abans.get((nom, cubeta), 0)
+                          for cubeta, n in perfil.histograma.items()}
+            files.append((nom, crides, ns, perfil.errors - abans.get((nom, 'errors'), 0),
+                          _percentil_histograma(histograma, 0.95)))
+
+        ns_total = sum(fila[2] for fila in files) or 1
+        return {
+            nom: {
+                'crides': crides,
+                'temps_total_ms': round(ns / 1e6, 3),
+                'percentatge': round(100.0 * ns / ns_total, 1),
+                'mitjana_us': round(ns / crides / 1e3, 2),
+                'p95_us': round(p95 / 1e3, 2),
+                'errors': errors
+            }
+            for nom, crides, ns, errors, p95 in sorted(files, key=lambda fila: -fila[2])
+        }
+
+    def resum_nivells(self, abans: Optional[Dict[str, int]] = None) -> Dict:
+        """Avaluacions per nivell (des de la foto abans dels comptadors, si es dona)"""
+        abans = abans or {}
+        c = {clau: valor - abans.get(clau, 0) for clau, valor in self.comptadors.items()}
+        return {
+            'individus': c['individus_avaluats'],
+            'dominats': c['individus_dominats'],
+            NIVELL_RIGID: {
+                'restriccions': sum(1 for r in self.restriccions if r['nivell'] == NIVELL_RIGID),
+                'avaluacions': c['avaluacions_rigides'],
+                'violacions': c['violacions_rigides']
+            },
+            NIVELL_FLEXIBLE: {
+                'restriccions': sum(1 for r in self.restriccions if r['nivell'] == NIVELL_FLEXIBLE),
+                'avaluacions': c['avaluacions_flexibles'],
+                'omeses': c['omeses_flexibles']
+            }
+        }
+
+    def crea_estat(self, assignacions: List[Assignacio],
+                   treballadors: Dict[str, Treballador],
+                   torns: Dict[str, Torn],
+                   necessitats: List[NecessitatCobertura],
+                   calendari: Dict,
+                   estadistiques: EstadistiquesGlobals = None) -> 'EstatAvaluacio':
+        """
+        Crea l'estat d'avaluació incremental d'una solució.
+        El score inicial s'obté amb estat.resultat()
+        """
+        ctx = self.context_problema(treballadors, torns, necessitats, calendari, estadistiques)
+        estat = EstatAvaluacio(self.restriccions, ctx)
+        estat.aplica([(None, a) for a in assignacions])
+        return estat
+
+    def evalua_delta(self, estat: 'EstatAvaluacio',
+                     canvis: List[Tuple[Optional[Assignacio], Optional[Assignacio]]]) -> Dict:
+        """
+        Aplica els canvis (assignació antiga, assignació nova) a l'estat i retorna
+        el nou score amb el mateix format que evalua_solucio. Només es recalculen
+        els agregats dels treballadors i dies afectats. Per desfer un moviment
+        s'apliquen els canvis invertits en ordre invers.
+        """
+        estat.aplica(canvis)
+        return estat.resultat()
+
+    def crea_avaluador_vectorial(self, ids_treballadors: List[str],
+                                 necessitats: List[NecessitatCobertura],
+                                 serveis_necessitat: List,
+                                 treballadors: Dict[str, Treballador],
+                                 torns: Dict[str, Torn],
+                                 calendari: Dict,
+                                 estadistiques: EstadistiquesGlobals = None,
+                                 decodifica=None) -> 'AvaluadorVectorial':
+        """
+        Backend alternatiu amb numpy: avalua una població sencera codificada com a
+        matriu (individu × necessitat) d'índexs de ids_treballadors (-1 = sense assignar).
+        decodifica(fila) -> List[Assignacio] s'usa per a les restriccions sense nucli vectorial.
+        Cada lot avaluat se suma als comptadors per nivell i al perfil d'aquest gestor.
+        """
+        from avaluacio_vectorial import AvaluadorVectorial
+        return AvaluadorVectorial(self.restriccions, ids_treballadors, necessitats,
+                                  serveis_necessitat, treballadors, torns, calendari,
+                                  estadistiques, decodifica, gestor=self)
+
 # ---------------------------
 # Helpers
 # ---------------------------
@@ -68,6 +396,8 @@ def _to_date(d):
     Accepta un objecte que pot ser datetime.date o datetime.datetime o ja date.
     Retorna un datetime.date.
     """
+    if type(d) is date:  # cas habitual
+        return d
     if isinstance(d, date) and not isinstance(d, datetime):
         return d
     if isinstance(d, datetime):
@@ -84,508 +414,1195 @@ def _to_date(d):
             return None
 
 
+# ============= CONTEXT D'AVALUACIÓ =============
+
+class _ContextAvaluacio:
+    """Dades del problema compartides per totes les avaluacions d'una execució"""
+
+    def __init__(self, treballadors, torns, necessitats, calendari, estadistiques):
+        self.treballadors = treballadors
+        self.torns = torns
+        self.necessitats = necessitats
+        self.calendari = calendari
+        self.estadistiques = estadistiques
+        self._ultimes = {}
+        self._dates_historic = {}
+
+    @cached_property
+    def necessitats_map(self) -> Dict[Tuple[str, date], NecessitatCobertura]:
+        """(servei, data) -> necessitat"""
+        return {(nec.servei, nec.data): nec for nec in self.necessitats}
+
+    def ultima_assignacio(self, treb_id: str):
+        """Última assignació de l'històric d'un treballador (o None)"""
+        if treb_id not in self._ultimes:
+            ultima = None
+            if self.estadistiques:
+                hist = self.estadistiques.get_historic(treb_id)
+                if hist and getattr(hist, 'ultima_assignacio', None):
+                    ultima = hist.ultima_assignacio
+            self._ultimes[treb_id] = ultima
+        return self._ultimes[treb_id]
+
+    def dates_historic(self, treb_id: str) -> List[date]:
+        """Dates treballades segons l'històric de l'any d'un treballador"""
+        if treb_id not in self._dates_historic:
+            dates = []
+            if self.estadistiques:
+                historic = self.estadistiques.get_historic(treb_id)
+                dates = [a.data for a in historic.assignacions_any]
+            self._dates_historic[treb_id] = dates
+        return self._dates_historic[treb_id]
+
+
+class ContextSolucio:
+    """
+    Context d'avaluació d'un individu: les seves assignacions, les dades del problema
+    i els agrupaments que comparteixen diverses restriccions. Cada agrupament es
+    calcula el primer cop que una restricció el demana, tret que qui crea el context
+    ja el tingui construït i el passi (ha de ser idèntic al que es calcularia).
+    """
+
+    def __init__(self, problema: _ContextAvaluacio, assignacions: List[Assignacio],
+                 per_treballador: Dict[str, List[Assignacio]] = None,
+                 per_treballador_dia: Dict[Tuple[str, Optional[date]], List[Assignacio]] = None,
+                 hores_per_treballador: Dict[str, float] = None):
+        self.problema = problema
+        self.assignacions = assignacions
+        self.treballadors = problema.treballadors
+        self.torns = problema.torns
+        self.necessitats = problema.necessitats
+        self.calendari = problema.calendari
+        self.estadistiques = problema.estadistiques
+        # Agrupaments precalculats: ocupen el lloc de la cached_property corresponent
+        if per_treballador is not None:
+            self.per_treballador = per_treballador
+        if per_treballador_dia is not None:
+            self.per_treballador_dia = per_treballador_dia
+        if hores_per_treballador is not None:
+            self.hores_per_treballador = hores_per_treballador
+
+    @property
+    def necessitats_map(self) -> Dict[Tuple[str, date], NecessitatCobertura]:
+        return self.problema.necessitats_map
+
+    def ultima_assignacio(self, treb_id: str):
+        return self.problema.ultima_assignacio(treb_id)
+
+    def dates_historic(self, treb_id: str) -> List[date]:
+        return self.problema.dates_historic(treb_id)
+
+    @cached_property
+    def per_treballador(self) -> Dict[str, List[Assignacio]]:
+        """treb_id -> assignacions ordenades per data i hora d'inici"""
+        per_treb = defaultdict(list)
+        for a in self.assignacions:
+            per_treb[a.treballador_id].append(a)
+        for assigns in per_treb.values():
+            try:
+                assigns.sort(key=lambda a: (_to_date(a.data), a.hora_inici))
+            except Exception:
+                pass  # dates no normalitzables: les restriccions ho detecten en ordenar
+        return dict(per_treb)
+
+    @cached_property
+    def per_treballador_dia(self) -> Dict[Tuple[str, Optional[date]], List[Assignacio]]:
+        """(treb_id, data normalitzada) -> assignacions del dia (data None si no es pot normalitzar)"""
+        per_dia = defaultdict(list)
+        for a in self.assignacions:
+            per_dia[(a.treballador_id, _to_date(a.data))].append(a)
+        return dict(per_dia)
+
+    @cached_property
+    def hores_per_treballador(self) -> Dict[str, float]:
+        """treb_id -> hores assignades en aquesta solució"""
+        hores = defaultdict(float)
+        for a in self.assignacions:
+            hores[a.treballador_id] += a.durada_hores
+        return dict(hores)
+
+    @cached_property
+    def te_dates_invalides(self) -> bool:
+        """Cert si alguna assignació té una data que no es pot normalitzar"""
+        return any(d is None for _, d in self.per_treballador_dia)
+
+
+def restriccio_contextual(funcio=None, *, nivell: str = NIVELL_FLEXIBLE, cost: float = 1.0):
+    """
+    Decorador per a restriccions amb la signatura funcio(ctx: ContextSolucio) -> float.
+    La funció decorada es pot continuar cridant amb la signatura clàssica
+    (assignacions, treballadors, torns, necessitats, calendari, estadistiques).
+    Opcionalment declara el nivell (rígid o flexible) i el cost relatiu d'avaluació:
+    @restriccio_contextual(nivell=NIVELL_RIGID, cost=2.0)
+    """
+    if funcio is None:
+        return lambda f: restriccio_contextual(f, nivell=nivell, cost=cost)
+
+    @wraps(funcio)
+    def adaptada(assignacions, treballadors, torns, necessitats, calendari, estadistiques=None):
+        problema = _ContextAvaluacio(treballadors, torns, necessitats, calendari, estadistiques)
+        return funcio(ContextSolucio(problema, assignacions))
+    adaptada.avalua_context = funcio
+    adaptada.nivell = nivell
+    adaptada.cost = cost
+    return adaptada
+
+
+def avalua_restriccio(funcio, ctx: ContextSolucio) -> float:
+    """Avalua una restricció sobre el context; les de signatura clàssica s'hi adapten"""
+    contextual = getattr(funcio, 'avalua_context', None)
+    if contextual is not None:
+        return contextual(ctx)
+    return funcio(ctx.assignacions, ctx.treballadors, ctx.torns,
+                  ctx.necessitats, ctx.calendari, ctx.estadistiques)
+
+
 # ============= RESTRICCIONS CRÍTIQUES =============
 
-def restriccio_grup_T(assignacions: List[Assignacio],
-                     treballadors: Dict[str, Treballador],
-                     torns: Dict[str, Torn],
-                     necessitats: List[NecessitatCobertura],
-                     calendari: Dict,
-                     estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_grup_T(ctx: ContextSolucio) -> float:
     """
     CRÍTICA: Només treballadors del grup T poden fer substitucions
     """
     violations = 0
-    total = len(assignacions)
-    
+    total = len(ctx.assignacions)
+
     if total == 0:
         return 100
-    
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         if treballador.grup != 'T':
             violations += 1
-    
+
     return 100 * (1 - violations / total)
 
 
-def restriccio_sense_descans(assignacions: List[Assignacio],
-                            treballadors: Dict[str, Treballador],
-                            torns: Dict[str, Torn],
-                            necessitats: List[NecessitatCobertura],
-                            calendari: Dict,
-                            estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_sense_descans(ctx: ContextSolucio) -> float:
     """
     CRÍTICA: Els treballadors NO poden treballar els seus dies de descans
     """
     violations = 0
-    total = len(assignacions)
-    
+    total = len(ctx.assignacions)
+
     if total == 0:
         return 100
-    
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         if treballador.te_descans(assign.data):
             violations += 1
-    
+
     return 100 * (1 - violations / total)
 
 
-def restriccio_formacio_requerida(assignacions: List[Assignacio],
-                                  treballadors: Dict[str, Treballador],
-                                  torns: Dict[str, Torn],
-                                  necessitats: List[NecessitatCobertura],
-                                  calendari: Dict,
-                                  estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_formacio_requerida(ctx: ContextSolucio) -> float:
     """
     El treballador ha de tenir la formació/habilitació necessària
     """
-    necessitats_map = {(nec.servei, nec.data): nec for nec in necessitats}
-    
+    necessitats_map = ctx.necessitats_map
+
     violations = 0
-    total = len(assignacions)
-    
+    total = len(ctx.assignacions)
+
     if total == 0:
         return 100
-    
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         key = (assign.torn_id, assign.data)
-        
+
         if key in necessitats_map:
             nec = necessitats_map[key]
             if not nec.formacio.intersection(treballador.habilitacions):
                 violations += 1
-    
+
     return 100 * (1 - violations / total)
 
 
-def restriccio_linia_correcta(assignacions: List[Assignacio],
-                              treballadors: Dict[str, Treballador],
-                              torns: Dict[str, Torn],
-                              necessitats: List[NecessitatCobertura],
-                              calendari: Dict,
-                              estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_linia_correcta(ctx: ContextSolucio) -> float:
     """
     El treballador ha d'estar habilitat per la línia del torn
     """
-    necessitats_map = {(nec.servei, nec.data): nec for nec in necessitats}
-    
+    necessitats_map = ctx.necessitats_map
+
     violations = 0
-    total = len(assignacions)
-    
+    total = len(ctx.assignacions)
+
     if total == 0:
         return 100
-    
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         key = (assign.torn_id, assign.data)
-        
+
         if key in necessitats_map:
             nec = necessitats_map[key]
             if treballador.linia != nec.linia:
                 violations += 1
-    
+
     return 100 * (1 - violations / total)
 
 
-def restriccio_hores_anuals(assignacions: List[Assignacio],
-                           treballadors: Dict[str, Treballador],
-                           torns: Dict[str, Torn],
-                           necessitats: List[NecessitatCobertura],
-                           calendari: Dict,
-                           estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_hores_anuals(ctx: ContextSolucio) -> float:
     """
     CRÍTICA: Els treballadors no poden superar les 1.605h anuals
     BONUS: Prioritzar treballadors que encara estiguin dins les 1.218h estàndard
     """
-    hores_per_treballador = defaultdict(float)
-    
-    # Sumem les hores d'aquesta solució
-    for assign in assignacions:
-        hores_per_treballador[assign.treballador_id] += assign.durada_hores
-    
+    # Hores d'aquesta solució per treballador
+    hores_per_treballador = ctx.hores_per_treballador
+
     violations = 0
     bonus_dins_estandard = 0
-    total = len(set(a.treballador_id for a in assignacions))
-    
+    total = len(hores_per_treballador)
+
     if total == 0:
         return 100
-    
+
     for treb_id in hores_per_treballador:
-        treballador = treballadors[treb_id]
+        treballador = ctx.treballadors[treb_id]
         hores_totals = treballador.hores_anuals_realitzades + hores_per_treballador[treb_id]
-        
+
         # Violació crítica: supera el màxim ampliable
         if hores_totals > treballador.max_hores_ampliables:
             violations += 1
         # Bonus: està dins l'estàndard
         elif hores_totals <= treballador.max_hores_anuals:
             bonus_dins_estandard += 1
-    
+
     # Score base: no violar el màxim
     score_base = 100 * (1 - violations / total) if total > 0 else 100
-    
+
     # Bonus: prioritzar treballadors dins l'estàndard (fins a +10 punts)
     bonus = (bonus_dins_estandard / total) * 10 if total > 0 else 0
-    
+
     return min(100, score_base + bonus)
 
 
 # ============= RESTRICCIONS DE DESCANSOS I HORARIS =============
 
-def restriccio_unica_assignacio_per_dia_rigida(assignacions: List[Assignacio],
-                                              treballadors: Dict[str, Treballador],
-                                              torns: Dict[str, Torn],
-                                              necessitats: List[NecessitatCobertura],
-                                              calendari: Dict,
-                                              estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual(nivell=NIVELL_RIGID, cost=1.0)
+def restriccio_unica_assignacio_per_dia_rigida(ctx: ContextSolucio) -> float:
     """
     RÍGIDA: Assegura que cada treballador tingui com a màxim UNA assignació per dia (independentment
     de l'hora o solapaments). Si es detecta qualsevol treballador amb >1 assignació en el mateix dia,
     retorna 0 per invalidar la solució.
-    Aquesta funció normalitza la data amb _to_date() per evitar problemes de tipus datetime/date.
+    Les dates es normalitzen amb _to_date() per evitar problemes de tipus datetime/date.
     """
-    assigns_per_treb_dia = defaultdict(set)  # (treb_id -> set(dates))
-    for a in assignacions:
-        treb = a.treballador_id
-        d = _to_date(a.data)
-        if d is None:
-            # no podem determinar la data correctament => considerem violació
+    # no podem determinar la data correctament => considerem violació
+    if ctx.te_dates_invalides:
+        return 0
+    for assigns in ctx.per_treballador_dia.values():
+        if len(assigns) > 1:
             return 0
-        # Si ja existeix la mateixa data, violació
-        if d in assigns_per_treb_dia[treb]:
-            return 0
-        assigns_per_treb_dia[treb].add(d)
 
     # També comprovem l'última assignació de l'històric (si existeix): no es pot assignar el mateix dia
-    if estadistiques:
-        for treb_id in list(assigns_per_treb_dia.keys()):
-            hist = estadistiques.get_historic(treb_id)
-            if hist and getattr(hist, 'ultima_assignacio', None):
-                ultima = hist.ultima_assignacio
-                ultima_data = _to_date(ultima.data)
-                if ultima_data in assigns_per_treb_dia[treb_id]:
-                    return 0
+    for treb_id in ctx.per_treballador:
+        ultima = ctx.ultima_assignacio(treb_id)
+        if ultima is not None and (treb_id, _to_date(ultima.data)) in ctx.per_treballador_dia:
+            return 0
 
     return 100
 
-def restriccio_sense_solapaments_rigida(assignacions, treballadors, torns, necessitats, calendari, estadistiques=None):
+@restriccio_contextual(nivell=NIVELL_RIGID, cost=1.5)
+def restriccio_sense_solapaments_rigida(ctx: ContextSolucio) -> float:
     """
     RÍGIDA: Un treballador no pot tenir dos torns el mateix dia.
     Si es detecta solapament, retorna 0 immediatament.
     """
-    # Agrupem per treballador i dia (normalitzat)
-    assigns_per_treb_dia = defaultdict(list)
+    if ctx.te_dates_invalides:
+        return 0
 
-    for assign in assignacions:
-        d = _to_date(assign.data)
-        if d is None:
+    for (treb_id, d), assigns in ctx.per_treballador_dia.items():
+        # Afegim l'última assignació de l'històric si és del mateix dia
+        ultima = ctx.ultima_assignacio(treb_id)
+        if ultima is not None and _to_date(ultima.data) == d:
+            assigns = [ultima] + assigns
+        if _hi_ha_solapament(assigns):
             return 0
-        assigns_per_treb_dia[(assign.treballador_id, d)].append(assign)
-
-    # Afegim històric d'última assignació si cal
-    if estadistiques:
-        for (treb_id, d), lst in list(assigns_per_treb_dia.items()):
-            hist = estadistiques.get_historic(treb_id)
-            if hist and getattr(hist, 'ultima_assignacio', None):
-                ultima = hist.ultima_assignacio
-                ultima_d = _to_date(ultima.data)
-                if ultima_d == d:
-                    lst.insert(0, ultima)
-
-    for (treb_id, d), assigns in assigns_per_treb_dia.items():
-        if len(assigns) < 2:
-            continue
-        # Ordenem per hora d'inici
-        assigns_ordenades = sorted(assigns, key=lambda a: (a.data, a.hora_inici))
-        for i in range(1, len(assigns_ordenades)):
-            a1 = assigns_ordenades[i - 1]
-            a2 = assigns_ordenades[i]
-            fi1 = a1.hora_fi_real()
-            inici2 = datetime.combine(_to_date(a2.data), a2.hora_inici)
-            # conversió fi1: assumim retorn datetime; si no, proveir fallback
-            if isinstance(fi1, datetime):
-                pass
-            else:
-                # si fi1 és hora (time), crear datetime amb la mateixa data
-                fi1 = datetime.combine(_to_date(a1.data), fi1)
-            # Comprovació de no-solapament
-            if not (fi1 <= inici2):
-                return 0
     return 100
 
-def restriccio_dies_consecutius(assignacions: List[Assignacio],
-                               treballadors: Dict[str, Treballador],
-                               torns: Dict[str, Torn],
-                               necessitats: List[NecessitatCobertura],
-                               calendari: Dict,
-                               estadistiques: EstadistiquesGlobals = None) -> float:
+
+def _hi_ha_solapament(assigns: List[Assignacio]) -> bool:
+    """Comprova si les assignacions d'un treballador en un mateix dia se solapen"""
+    if len(assigns) < 2:
+        return False
+    # Ordenem per hora d'inici
+    assigns_ordenades = sorted(assigns, key=lambda a: (a.data, a.hora_inici))
+    for i in range(1, len(assigns_ordenades)):
+        a1 = assigns_ordenades[i - 1]
+        a2 = assigns_ordenades[i]
+        fi1 = a1.hora_fi_real()
+        inici2 = datetime.combine(_to_date(a2.data), a2.hora_inici)
+        # conversió fi1: assumim retorn datetime; si no, proveir fallback
+        if isinstance(fi1, datetime):
+            pass
+        else:
+            # si fi1 és hora (time), crear datetime amb la mateixa data
+            fi1 = datetime.combine(_to_date(a1.data), fi1)
+        # Comprovació de no-solapament
+        if not (fi1 <= inici2):
+            return True
+    return False
+
+@restriccio_contextual(cost=3.0)
+def restriccio_dies_consecutius(ctx: ContextSolucio) -> float:
     """
     IMPORTANT: Màxim 9 dies consecutius treballats
     """
-    # Agrupem per treballador
-    assigns_per_treb = defaultdict(list)
-    for a in assignacions:
-        assigns_per_treb[a.treballador_id].append(a.data)
-    
-    # Afegim les dates de l'històric si existeix
-    if estadistiques:
-        for treb_id in assigns_per_treb:
-            historic = estadistiques.get_historic(treb_id)
-            assigns_per_treb[treb_id].extend([a.data for a in historic.assignacions_any])
-    
     violations = 0
-    total = len(assigns_per_treb)
-    
+    total = len(ctx.per_treballador)
+
     if total == 0:
         return 100
-    
-    for treb_id, dates in assigns_per_treb.items():
-        dates_ordenades = sorted(set(dates))
-        
-        consecutius = 1
-        max_consecutius = 1
-        
-        for i in range(1, len(dates_ordenades)):
-            if (dates_ordenades[i] - dates_ordenades[i-1]).days == 1:
-                consecutius += 1
-                max_consecutius = max(max_consecutius, consecutius)
-            else:
-                consecutius = 1
-        
-        if max_consecutius > 9:
-            violations += (max_consecutius - 9)
-    
+
+    for treb_id, assigns in ctx.per_treballador.items():
+        # Dates de la solució i de l'històric
+        dates = [a.data for a in assigns]
+        dates.extend(ctx.dates_historic(treb_id))
+        violations += _exces_dies_consecutius(dates)
+
     # Penalitzem proporcionalment
     max_violations = total * 5  # Assumim màxim 5 dies d'excés
     score = max(0, 100 - (violations / max_violations * 100)) if max_violations > 0 else 100
-    
+
     return score
 
 
-def restriccio_descans_minim_12h_rigida(assignacions: List[Assignacio],
-                                        treballadors: Dict[str, Treballador],
-                                        torns: Dict[str, Torn],
-                                        necessitats: List[NecessitatCobertura],
-                                        calendari: Dict,
-                                        estadistiques: EstadistiquesGlobals = None) -> float:
+def _exces_dies_consecutius(dates) -> int:
+    """Retorna quants dies supera el màxim de 9 dies consecutius la ratxa més llarga"""
+    dates_ordenades = sorted(set(dates))
+
+    consecutius = 1
+    max_consecutius = 1
+
+    for i in range(1, len(dates_ordenades)):
+        if (dates_ordenades[i] - dates_ordenades[i-1]).days == 1:
+            consecutius += 1
+            max_consecutius = max(max_consecutius, consecutius)
+        else:
+            consecutius = 1
+
+    return max_consecutius - 9 if max_consecutius > 9 else 0
+
+
+@restriccio_contextual(nivell=NIVELL_RIGID, cost=3.0)
+def restriccio_descans_minim_12h_rigida(ctx: ContextSolucio) -> float:
     """
     RÍGIDA: Mínim 12 hores de descans entre torns consecutius.
     Si hi ha una sola violació, retorna 0.
-    Aquesta versió normalitza dates i comprova l'última assignació d'històric.
+    Les dates es normalitzen i es comprova també l'última assignació d'històric.
     """
-    assigns_per_treb = defaultdict(list)
-    for a in assignacions:
-        assigns_per_treb[a.treballador_id].append(a)
-
-    for treb_id, assigns in assigns_per_treb.items():
+    for treb_id, assigns in ctx.per_treballador.items():
         # afegim última assignació de l'històric (si existeix)
-        if estadistiques:
-            hist = estadistiques.get_historic(treb_id)
-            if hist and getattr(hist, 'ultima_assignacio', None):
-                assigns = [hist.ultima_assignacio] + assigns
+        ultima = ctx.ultima_assignacio(treb_id)
+        if ultima is not None:
+            assigns = [ultima] + assigns
 
-        # Ordenem per data + hora d'inici (ús de la data normalitzada per evitar inconsistències)
-        try:
-            assigns_ordenades = sorted(assigns, key=lambda a: (_to_date(a.data), a.hora_inici))
-        except Exception:
-            # si no es pot ordenar correctament, considerem la solució invàlida
+        if _viola_descans_12h(assigns):
             return 0
-
-        for i in range(1, len(assigns_ordenades)):
-            a1 = assigns_ordenades[i - 1]
-            a2 = assigns_ordenades[i]
-            fi_a1 = a1.hora_fi_real()
-            # assegurar que fi_a1 és datetime
-            if not isinstance(fi_a1, datetime):
-                fi_a1 = datetime.combine(_to_date(a1.data), fi_a1)
-            inici_a2 = datetime.combine(_to_date(a2.data), a2.hora_inici)
-            hores_descans = (inici_a2 - fi_a1).total_seconds() / 3600.0
-            if hores_descans < 12:
-                return 0
     return 100
 
 
-def restriccio_divendres_cap_setmana_rigida(assignacions: List[Assignacio],
-                                            treballadors: Dict[str, Treballador],
-                                            torns: Dict[str, Torn],
-                                            necessitats: List[NecessitatCobertura],
-                                            calendari: Dict,
-                                            estadistiques: EstadistiquesGlobals = None) -> float:
+def _viola_descans_12h(assigns: List[Assignacio]) -> bool:
+    """Comprova si entre alguna parella d'assignacions consecutives hi ha menys de 12h"""
+    # Ordenem per data + hora d'inici (ús de la data normalitzada per evitar inconsistències)
+    try:
+        assigns_ordenades = sorted(assigns, key=lambda a: (_to_date(a.data), a.hora_inici))
+    except Exception:
+        # si no es pot ordenar correctament, considerem la solució invàlida
+        return True
+
+    for i in range(1, len(assigns_ordenades)):
+        if _hores_descans(assigns_ordenades[i - 1], assigns_ordenades[i]) < 12:
+            return True
+    return False
+
+
+def _hores_descans(a1: Assignacio, a2: Assignacio) -> float:
+    """Hores entre el final d'a1 i l'inici d'a2 (a1 és l'anterior en l'ordre per data i hora)"""
+    fi_a1 = a1.hora_fi_real()
+    # assegurar que fi_a1 és datetime
+    if not isinstance(fi_a1, datetime):
+        fi_a1 = datetime.combine(_to_date(a1.data), fi_a1)
+    inici_a2 = datetime.combine(_to_date(a2.data), a2.hora_inici)
+    return (inici_a2 - fi_a1).total_seconds() / 3600.0
+
+
+@restriccio_contextual(nivell=NIVELL_RIGID, cost=1.0)
+def restriccio_divendres_cap_setmana_rigida(ctx: ContextSolucio) -> float:
     """
     RÍGIDA: Si un treballador té descans dissabte i diumenge,
     el divendres no pot acabar més tard de les 22:00h.
     Si hi ha violació, retorna 0.
     """
-    for a in assignacions:
-        d = _to_date(a.data)
-        if d is None:
+    for a in ctx.assignacions:
+        if _viola_divendres(a, ctx.treballadors):
             return 0
-        # només divendres
-        if d.weekday() != 4:
-            continue
-        treballador = treballadors.get(a.treballador_id)
-        if not treballador:
-            return 0
-        dissabte = d + timedelta(days=1)
-        diumenge = d + timedelta(days=2)
-        # Si té descans dissabte i diumenge (segons la funció te_descans)
-        try:
-            te_descans_dissabte = treballador.te_descans(dissabte)
-            te_descans_diumenge = treballador.te_descans(diumenge)
-        except Exception:
-            # en cas d'errors amb el model Treballador, considerem violació
-            return 0
-
-        if te_descans_dissabte and te_descans_diumenge:
-            # si creua mitjanit o acaba després de 22:00 -> violació
-            if a.hora_fi < a.hora_inici:
-                return 0
-            if a.hora_fi.hour > 22 or (a.hora_fi.hour == 22 and a.hora_fi.minute > 0):
-                return 0
     return 100
 
 
+def _viola_divendres(a: Assignacio, treballadors: Dict[str, Treballador]) -> bool:
+    """Comprova si una assignació de divendres acaba massa tard abans d'un cap de setmana de descans"""
+    d = _to_date(a.data)
+    if d is None:
+        return True
+    # només divendres
+    if d.weekday() != 4:
+        return False
+    treballador = treballadors.get(a.treballador_id)
+    if not treballador:
+        return True
+    dissabte = d + timedelta(days=1)
+    diumenge = d + timedelta(days=2)
+    # Si té descans dissabte i diumenge (segons la funció te_descans)
+    try:
+        te_descans_dissabte = treballador.te_descans(dissabte)
+        te_descans_diumenge = treballador.te_descans(diumenge)
+    except Exception:
+        # en cas d'errors amb el model Treballador, considerem violació
+        return True
+
+    if te_descans_dissabte and te_descans_diumenge:
+        # si creua mitjanit o acaba després de 22:00 -> violació
+        if a.hora_fi < a.hora_inici:
+            return True
+        if a.hora_fi.hour > 22 or (a.hora_fi.hour == 22 and a.hora_fi.minute > 0):
+            return True
+    return False
+
+
 # ============= RESTRICCIONS D'EQUITAT =============
 
-def restriccio_equitat_canvis_zona(assignacions: List[Assignacio],
-                                   treballadors: Dict[str, Treballador],
-                                   torns: Dict[str, Torn],
-                                   necessitats: List[NecessitatCobertura],
-                                   calendari: Dict,
-                                   estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual(cost=2.0)
+def restriccio_equitat_canvis_zona(ctx: ContextSolucio) -> float:
     """
     BONUS: Distribució equitativa dels canvis de zona entre treballadors
     Objectiu: minimitzar la desviació estàndard
     """
-    necessitats_map = {(nec.servei, nec.data): nec for nec in necessitats}
-    
+    necessitats_map = ctx.necessitats_map
+
     canvis_per_treballador = defaultdict(int)
-    
+
     # Comptem els canvis en aquesta solució
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         key = (assign.torn_id, assign.data)
-        
+
         if key in necessitats_map:
             nec = necessitats_map[key]
             if treballador.es_canvi_zona(nec.zona):
                 canvis_per_treballador[assign.treballador_id] += 1
-    
+
     # Afegim els canvis de l'històric
     for treb_id in canvis_per_treballador:
-        canvis_per_treballador[treb_id] += treballadors[treb_id].canvis_zona
-    
+        canvis_per_treballador[treb_id] += ctx.treballadors[treb_id].canvis_zona
+
     if not canvis_per_treballador:
         return 100
-    
+
     # Calculem desviació estàndard
     valors = list(canvis_per_treballador.values())
     mitjana = sum(valors) / len(valors)
     variancia = sum((v - mitjana) ** 2 for v in valors) / len(valors)
     desviacio = variancia ** 0.5
-    
+
     # Normalitzem: desviació 0 = 100, desviació >3 = 0
     score = max(0, 100 - (desviacio / 3 * 100))
-    
+
     return score
 
 
-def restriccio_equitat_canvis_torn(assignacions: List[Assignacio],
-                                   treballadors: Dict[str, Treballador],
-                                   torns: Dict[str, Torn],
-                                   necessitats: List[NecessitatCobertura],
-                                   calendari: Dict,
-                                   estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual(cost=2.0)
+def restriccio_equitat_canvis_torn(ctx: ContextSolucio) -> float:
     """
     BONUS: Distribució equitativa dels canvis de torn entre treballadors
     Objectiu: minimitzar la desviació estàndard
     """
-    necessitats_map = {(nec.servei, nec.data): nec for nec in necessitats}
-    
+    necessitats_map = ctx.necessitats_map
+
     canvis_per_treballador = defaultdict(int)
-    
+
     # Comptem els canvis en aquesta solució
-    for assign in assignacions:
-        treballador = treballadors[assign.treballador_id]
+    for assign in ctx.assignacions:
+        treballador = ctx.treballadors[assign.treballador_id]
         key = (assign.torn_id, assign.data)
-        
+
         if key in necessitats_map:
             nec = necessitats_map[key]
             if treballador.es_canvi_torn(nec.torn):
                 canvis_per_treballador[assign.treballador_id] += 1
-    
+
     # Afegim els canvis de l'històric
     for treb_id in canvis_per_treballador:
-        canvis_per_treballador[treb_id] += treballadors[treb_id].canvis_torn
-    
+        canvis_per_treballador[treb_id] += ctx.treballadors[treb_id].canvis_torn
+
     if not canvis_per_treballador:
         return 100
-    
+
     # Calculem desviació estàndard
     valors = list(canvis_per_treballador.values())
     mitjana = sum(valors) / len(valors)
     variancia = sum((v - mitjana) ** 2 for v in valors) / len(valors)
     desviacio = variancia ** 0.5
-    
+
     # Normalitzem: desviació 0 = 100, desviació >3 = 0
     score = max(0, 100 - (desviacio / 3 * 100))
-    
+
     return score
 
 
-def restriccio_cobertura_completa(assignacions: List[Assignacio],
-                                  treballadors: Dict[str, Treballador],
-                                  torns: Dict[str, Torn],
-                                  necessitats: List[NecessitatCobertura],
-                                  calendari: Dict,
-                                  estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_cobertura_completa(ctx: ContextSolucio) -> float:
     """
     Totes les necessitats de cobertura han d'estar assignades
     """
-    assignacions_set = set((a.torn_id, a.data) for a in assignacions)
-    
+    assignacions_set = set((a.torn_id, a.data) for a in ctx.assignacions)
+
     cobertes = 0
-    total_necessitats = len(necessitats)
-    
+    total_necessitats = len(ctx.necessitats)
+
     if total_necessitats == 0:
         return 100
-    
-    for nec in necessitats:
+
+    for nec in ctx.necessitats:
         key = (nec.servei, nec.data)
         if key in assignacions_set:
             cobertes += 1
-    
+
     return 100 * (cobertes / total_necessitats)
 
 
-def restriccio_distribucio_equilibrada(assignacions: List[Assignacio],
-                                       treballadors: Dict[str, Treballador],
-                                       torns: Dict[str, Torn],
-                                       necessitats: List[NecessitatCobertura],
-                                       calendari: Dict,
-                                       estadistiques: EstadistiquesGlobals = None) -> float:
+@restriccio_contextual
+def restriccio_distribucio_equilibrada(ctx: ContextSolucio) -> float:
     """
     Evitar que uns treballadors tinguin moltes assignacions i altres poques
     """
-    assignacions_per_treballador = defaultdict(int)
-    
-    for assign in assignacions:
-        assignacions_per_treballador[assign.treballador_id] += 1
-    
-    if not assignacions_per_treballador:
+    if not ctx.per_treballador:
         return 100
-    
-    valors = list(assignacions_per_treballador.values())
+
+    valors = [len(assigns) for assigns in ctx.per_treballador.values()]
     mitjana = sum(valors) / len(valors)
     desviacio = sum(abs(v - mitjana) for v in valors) / len(valors)
-    
+
     # Normalitzem: menys desviació = millor score
     # Assumim que més de 5 de desviació és molt dolent
     score = max(0, 100 - (desviacio * 10))
-    
+
     return score
 
 
+
+
+# ============= AVALUACIÓ INCREMENTAL =============
+
+class _AgregatRestriccio(ABC):
+    """
+    Agregats parcials d'una restricció que es poden actualitzar
+    assignació a assignació. score() ha de coincidir amb la funció original.
+    """
+
+    def __init__(self, ctx: _ContextAvaluacio):
+        self.ctx = ctx
+
+    @abstractmethod
+    def afegeix(self, a: Assignacio):
+        ...
+
+    @abstractmethod
+    def elimina(self, a: Assignacio):
+        ...
+
+    @abstractmethod
+    def score(self) -> float:
+        ...
+
+
+class _AgregatPerAssignacio(_AgregatRestriccio):
+    """Restriccions del tipus 100 * (1 - violacions / assignacions)"""
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.total = 0
+        self.violacions = 0
+
+    @abstractmethod
+    def viola(self, a: Assignacio) -> bool:
+        ...
+
+    def afegeix(self, a):
+        v = self.viola(a)
+        self.total += 1
+        self.violacions += v
+
+    def elimina(self, a):
+        v = self.viola(a)
+        self.total -= 1
+        self.violacions -= v
+
+    def score(self):
+        if self.total == 0:
+            return 100
+        return 100 * (1 - self.violacions / self.total)
+
+
+class _AgregatGrupT(_AgregatPerAssignacio):
+    def viola(self, a):
+        return self.ctx.treballadors[a.treballador_id].grup != 'T'
+
+
+class _AgregatSenseDescans(_AgregatPerAssignacio):
+    def viola(self, a):
+        return self.ctx.treballadors[a.treballador_id].te_descans(a.data)
+
+
+class _AgregatFormacio(_AgregatPerAssignacio):
+    def viola(self, a):
+        treballador = self.ctx.treballadors[a.treballador_id]
+        nec = self.ctx.necessitats_map.get((a.torn_id, a.data))
+        return nec is not None and not nec.formacio.intersection(treballador.habilitacions)
+
+
+class _AgregatLinia(_AgregatPerAssignacio):
+    def viola(self, a):
+        treballador = self.ctx.treballadors[a.treballador_id]
+        nec = self.ctx.necessitats_map.get((a.torn_id, a.data))
+        return nec is not None and treballador.linia != nec.linia
+
+
+class _AgregatHoresAnuals(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.num_assignacions = defaultdict(int)  # treb_id -> assignacions
+        self.hores = defaultdict(float)  # treb_id -> suma d'hores (acumulada)
+        self.estat_treb = {}  # treb_id -> 'violacio' | 'bonus' | None
+        self.violacions = 0
+        self.bonus = 0
+
+    def _reclassifica(self, treb_id):
+        anterior = self.estat_treb.pop(treb_id, None)
+        if anterior == 'violacio':
+            self.violacions -= 1
+        elif anterior == 'bonus':
+            self.bonus -= 1
+        if not self.num_assignacions[treb_id]:
+            # Sense assignacions la suma torna a 0 exacte (no arrossega error d'arrodoniment)
+            del self.num_assignacions[treb_id]
+            del self.hores[treb_id]
+            return
+        treballador = self.ctx.treballadors[treb_id]
+        hores_totals = treballador.hores_anuals_realitzades + self.hores[treb_id]
+        nou = None
+        if hores_totals > treballador.max_hores_ampliables:
+            nou = 'violacio'
+            self.violacions += 1
+        elif hores_totals <= treballador.max_hores_anuals:
+            nou = 'bonus'
+            self.bonus += 1
+        self.estat_treb[treb_id] = nou
+
+    def afegeix(self, a):
+        self.num_assignacions[a.treballador_id] += 1
+        self.hores[a.treballador_id] += a.durada_hores
+        self._reclassifica(a.treballador_id)
+
+    def elimina(self, a):
+        self.num_assignacions[a.treballador_id] -= 1
+        self.hores[a.treballador_id] -= a.durada_hores
+        self._reclassifica(a.treballador_id)
+
+    def score(self):
+        total = len(self.estat_treb)
+        if total == 0:
+            return 100
+        score_base = 100 * (1 - self.violacions / total)
+        bonus = (self.bonus / total) * 10
+        return min(100, score_base + bonus)
+
+
+class _AgregatUnicaPerDia(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.comptador = defaultdict(int)  # (treb_id, data) -> nombre d'assignacions
+        self.dates_invalides = 0
+        self.violacions = 0
+
+    def _violacions_clau(self, treb_id, d) -> int:
+        n = self.comptador.get((treb_id, d), 0)
+        if n == 0:
+            return 0
+        v = 1 if n > 1 else 0
+        ultima = self.ctx.ultima_assignacio(treb_id)
+        if ultima is not None and _to_date(ultima.data) == d:
+            v += 1
+        return v
+
+    def _actualitza(self, a, delta):
+        d = _to_date(a.data)
+        if d is None:
+            self.dates_invalides += delta
+            return
+        clau = (a.treballador_id, d)
+        self.violacions -= self._violacions_clau(*clau)
+        self.comptador[clau] += delta
+        if self.comptador[clau] == 0:
+            del self.comptador[clau]
+        self.violacions += self._violacions_clau(*clau)
+
+    def afegeix(self, a):
+        self._actualitza(a, 1)
+
+    def elimina(self, a):
+        self._actualitza(a, -1)
+
+    def score(self):
+        return 0 if self.dates_invalides or self.violacions else 100
+
+
+class _AgregatSolapaments(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.per_treb_dia = defaultdict(list)  # (treb_id, data) -> [Assignacio]
+        self.claus_amb_solapament = set()
+        self.dates_invalides = 0
+
+    def _recalcula(self, clau):
+        assigns = self.per_treb_dia.get(clau)
+        self.claus_amb_solapament.discard(clau)
+        if not assigns:
+            self.per_treb_dia.pop(clau, None)
+            return
+        ultima = self.ctx.ultima_assignacio(clau[0])
+        if ultima is not None and _to_date(ultima.data) == clau[1]:
+            assigns = [ultima] + assigns
+        if _hi_ha_solapament(assigns):
+            self.claus_amb_solapament.add(clau)
+
+    def afegeix(self, a):
+        d = _to_date(a.data)
+        if d is None:
+            self.dates_invalides += 1
+            return
+        clau = (a.treballador_id, d)
+        self.per_treb_dia[clau].append(a)
+        self._recalcula(clau)
+
+    def elimina(self, a):
+        d = _to_date(a.data)
+        if d is None:
+            self.dates_invalides -= 1
+            return
+        clau = (a.treballador_id, d)
+        self.per_treb_dia[clau].remove(a)
+        self._recalcula(clau)
+
+    def score(self):
+        return 0 if self.dates_invalides or self.claus_amb_solapament else 100
+
+
+class _RatxesTreballador:
+    """
+    Dies treballats d'un treballador (solució + històric) com a ordinals amb multiplicitat
+    i el nombre de ratxes de cada llargada. Afegir o treure un dia només recorre la ratxa
+    on cau aquest dia.
+    """
+
+    def __init__(self, dates_historic):
+        self.dies: Dict[int, int] = defaultdict(int)  # ordinal -> multiplicitat
+        self.ratxes: Dict[int, int] = defaultdict(int)  # llargada -> nombre de ratxes
+        for d in dates_historic:
+            self.afegeix(d.toordinal())
+
+    def _llargada(self, dia: int, pas: int) -> int:
+        """Dies consecutius treballats a partir de dia (exclòs) en la direcció pas"""
+        n = 0
+        while (dia + pas * (n + 1)) in self.dies:
+            n += 1
+        return n
+
+    def _mou_ratxa(self, llargada: int, delta: int):
+        if llargada:
+            self.ratxes[llargada] += delta
+            if not self.ratxes[llargada]:
+                del self.ratxes[llargada]
+
+    def afegeix(self, dia: int):
+        self.dies[dia] += 1
+        if self.dies[dia] == 1:
+            esquerra, dreta = self._llargada(dia, -1), self._llargada(dia, 1)
+            self._mou_ratxa(esquerra, -1)
+            self._mou_ratxa(dreta, -1)
+            self._mou_ratxa(esquerra + dreta + 1, 1)
+
+    def elimina(self, dia: int):
+        self.dies[dia] -= 1
+        if not self.dies[dia]:
+            del self.dies[dia]
+            esquerra, dreta = self._llargada(dia, -1), self._llargada(dia, 1)
+            self._mou_ratxa(esquerra + dreta + 1, -1)
+            self._mou_ratxa(esquerra, 1)
+            self._mou_ratxa(dreta, 1)
+
+    def exces(self) -> int:
+        """Com _exces_dies_consecutius: dies que la ratxa més llarga supera els 9"""
+        maxima = max(self.ratxes, default=1)
+        return maxima - 9 if maxima > 9 else 0
+
+
+class _AgregatDiesConsecutius(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.ratxes: Dict[str, _RatxesTreballador] = {}  # es creen amb l'històric el primer cop
+        self.num_dates = defaultdict(int)  # treb_id -> assignacions de la solució
+        self.exces = {}  # treb_id -> dies d'excés
+        self.violacions = 0
+
+    def _actualitza(self, a, delta):
+        treb_id = a.treballador_id
+        ratxes = self.ratxes.get(treb_id)
+        if ratxes is None:
+            ratxes = self.ratxes[treb_id] = _RatxesTreballador(self.ctx.dates_historic(treb_id))
+        if delta > 0:
+            ratxes.afegeix(a.data.toordinal())
+        else:
+            ratxes.elimina(a.data.toordinal())
+        self.num_dates[treb_id] += delta
+
+        self.violacions -= self.exces.pop(treb_id, 0)
+        if not self.num_dates[treb_id]:
+            del self.num_dates[treb_id]
+            return
+        exces = ratxes.exces()
+        self.exces[treb_id] = exces
+        self.violacions += exces
+
+    def afegeix(self, a):
+        self._actualitza(a, 1)
+
+    def elimina(self, a):
+        self._actualitza(a, -1)
+
+    def score(self):
+        total = len(self.exces)
+        if total == 0:
+            return 100
+        max_violations = total * 5
+        return max(0, 100 - (self.violacions / max_violations * 100))
+
+
+class _AgregatDescans12h(_AgregatRestriccio):
+    """
+    Assignacions de cada treballador ordenades per (data, hora d'inici) amb bisect i
+    nombre de parelles consecutives amb menys de 12h de descans. Cada canvi només
+    revisa les parelles veïnes de la posició on s'insereix o s'elimina.
+    """
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.ordenades = {}  # treb_id -> [(data, hora_inici, ordre, Assignacio)]
+        self.num_assignacions = defaultdict(int)  # treb_id -> assignacions de la solució
+        self.parelles = defaultdict(int)  # treb_id -> parelles consecutives amb < 12h
+        self.ordre = 0  # desempat estable (l'última de l'històric va primer, ordre -1)
+
+    def _viola(self, llista, i) -> int:
+        """1 si la parella (i-1, i) de la llista té menys de 12h de descans"""
+        if i <= 0 or i >= len(llista):
+            return 0
+        return 1 if _hores_descans(llista[i - 1][3], llista[i][3]) < 12 else 0
+
+    def _llista(self, treb_id):
+        llista = self.ordenades.get(treb_id)
+        if llista is None:
+            llista = self.ordenades[treb_id] = []
+            ultima = self.ctx.ultima_assignacio(treb_id)
+            if ultima is not None:
+                llista.append((_to_date(ultima.data), ultima.hora_inici, -1, ultima))
+        return llista
+
+    def afegeix(self, a):
+        treb_id = a.treballador_id
+        llista = self._llista(treb_id)
+        self.ordre += 1
+        element = (_to_date(a.data), a.hora_inici, self.ordre, a)
+        i = bisect.bisect(llista, element[:3])
+        delta = -self._viola(llista, i)  # la parella que se separa (i-1, i)
+        llista.insert(i, element)
+        delta += self._viola(llista, i) + self._viola(llista, i + 1)
+        self.parelles[treb_id] += delta
+        self.num_assignacions[treb_id] += 1
+
+    def elimina(self, a):
+        treb_id = a.treballador_id
+        llista = self.ordenades[treb_id]
+        clau = (_to_date(a.data), a.hora_inici)
+        i = bisect.bisect_left(llista, clau)
+        while llista[i][3] is not a and llista[i][3] != a:
+            i += 1
+        delta = -(self._viola(llista, i) + self._viola(llista, i + 1))
+        del llista[i]
+        delta += self._viola(llista, i)
+        self.parelles[treb_id] += delta
+        self.num_assignacions[treb_id] -= 1
+        if not self.num_assignacions[treb_id]:
+            del self.num_assignacions[treb_id]
+            del self.ordenades[treb_id]
+            del self.parelles[treb_id]
+
+    def score(self):
+        return 0 if any(self.parelles.values()) else 100
+
+
+class _AgregatDivendres(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.violacions = 0
+
+    def afegeix(self, a):
+        self.violacions += _viola_divendres(a, self.ctx.treballadors)
+
+    def elimina(self, a):
+        self.violacions -= _viola_divendres(a, self.ctx.treballadors)
+
+    def score(self):
+        return 0 if self.violacions else 100
+
+
+class _AgregatEquitat(_AgregatRestriccio):
+    """Desviació estàndard dels canvis (solució + històric) dels treballadors amb algun canvi"""
+
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.canvis = defaultdict(int)  # treb_id -> canvis en aquesta solució
+        self.n = 0
+        self.suma = 0
+        self.suma_quadrats = 0
+
+    @abstractmethod
+    def es_canvi(self, treballador: Treballador, nec: NecessitatCobertura) -> bool:
+        ...
+
+    @abstractmethod
+    def canvis_historic(self, treballador: Treballador) -> int:
+        ...
+
+    def _actualitza(self, a, delta):
+        treballador = self.ctx.treballadors[a.treballador_id]
+        nec = self.ctx.necessitats_map.get((a.torn_id, a.data))
+        if nec is None or not self.es_canvi(treballador, nec):
+            return
+        base = self.canvis_historic(treballador)
+        anterior = self.canvis[a.treballador_id]
+        if anterior > 0:
+            v = anterior + base
+            self.n -= 1
+            self.suma -= v
+            self.suma_quadrats -= v * v
+        nou = anterior + delta
+        if nou > 0:
+            v = nou + base
+            self.n += 1
+            self.suma += v
+            self.suma_quadrats += v * v
+            self.canvis[a.treballador_id] = nou
+        else:
+            del self.canvis[a.treballador_id]
+
+    def afegeix(self, a):
+        self._actualitza(a, 1)
+
+    def elimina(self, a):
+        self._actualitza(a, -1)
+
+    def score(self):
+        if self.n == 0:
+            return 100
+        variancia = max(0, self.n * self.suma_quadrats - self.suma * self.suma) / (self.n * self.n)
+        desviacio = variancia ** 0.5
+        return max(0, 100 - (desviacio / 3 * 100))
+
+
+class _AgregatEquitatZona(_AgregatEquitat):
+    def es_canvi(self, treballador, nec):
+        return treballador.es_canvi_zona(nec.zona)
+
+    def canvis_historic(self, treballador):
+        return treballador.canvis_zona
+
+
+class _AgregatEquitatTorn(_AgregatEquitat):
+    def es_canvi(self, treballador, nec):
+        return treballador.es_canvi_torn(nec.torn)
+
+    def canvis_historic(self, treballador):
+        return treballador.canvis_torn
+
+
+class _AgregatCobertura(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.necessitats_per_clau = defaultdict(int)
+        for nec in ctx.necessitats:
+            self.necessitats_per_clau[(nec.servei, nec.data)] += 1
+        self.assignacions_per_clau = defaultdict(int)
+        self.cobertes = 0
+
+    def afegeix(self, a):
+        clau = (a.torn_id, a.data)
+        self.assignacions_per_clau[clau] += 1
+        if self.assignacions_per_clau[clau] == 1:
+            self.cobertes += self.necessitats_per_clau.get(clau, 0)
+
+    def elimina(self, a):
+        clau = (a.torn_id, a.data)
+        self.assignacions_per_clau[clau] -= 1
+        if self.assignacions_per_clau[clau] == 0:
+            del self.assignacions_per_clau[clau]
+            self.cobertes -= self.necessitats_per_clau.get(clau, 0)
+
+    def score(self):
+        total_necessitats = len(self.ctx.necessitats)
+        if total_necessitats == 0:
+            return 100
+        return 100 * (self.cobertes / total_necessitats)
+
+
+class _AgregatDistribucio(_AgregatRestriccio):
+    def __init__(self, ctx):
+        super().__init__(ctx)
+        self.per_treb = defaultdict(int)  # treb_id -> assignacions
+        self.histograma = defaultdict(int)  # assignacions -> nombre de treballadors
+
+    def _actualitza(self, treb_id, delta):
+        anterior = self.per_treb[treb_id]
+        if anterior:
+            self.histograma[anterior] -= 1
+            if self.histograma[anterior] == 0:
+                del self.histograma[anterior]
+        nou = anterior + delta
+        if nou:
+            self.per_treb[treb_id] = nou
+            self.histograma[nou] += 1
+        else:
+            del self.per_treb[treb_id]
+
+    def afegeix(self, a):
+        self._actualitza(a.treballador_id, 1)
+
+    def elimina(self, a):
+        self._actualitza(a.treballador_id, -1)
+
+    def score(self):
+        n = len(self.per_treb)
+        if n == 0:
+            return 100
+        mitjana = sum(v * f for v, f in self.histograma.items()) / n
+        desviacio = sum(abs(v - mitjana) * f for v, f in self.histograma.items()) / n
+        return max(0, 100 - (desviacio * 10))
+
+
+# Restriccions que es poden avaluar de manera incremental (funció -> agregat)
+AGREGATS_INCREMENTALS = {
+    restriccio_grup_T: _AgregatGrupT,
+    restriccio_sense_descans: _AgregatSenseDescans,
+    restriccio_formacio_requerida: _AgregatFormacio,
+    restriccio_linia_correcta: _AgregatLinia,
+    restriccio_hores_anuals: _AgregatHoresAnuals,
+    restriccio_unica_assignacio_per_dia_rigida: _AgregatUnicaPerDia,
+    restriccio_sense_solapaments_rigida: _AgregatSolapaments,
+    restriccio_dies_consecutius: _AgregatDiesConsecutius,
+    restriccio_descans_minim_12h_rigida: _AgregatDescans12h,
+    restriccio_divendres_cap_setmana_rigida: _AgregatDivendres,
+    restriccio_equitat_canvis_zona: _AgregatEquitatZona,
+    restriccio_equitat_canvis_torn: _AgregatEquitatTorn,
+    restriccio_cobertura_completa: _AgregatCobertura,
+    restriccio_distribucio_equilibrada: _AgregatDistribucio,
+}
+
+
+class EstatAvaluacio:
+    """
+    Estat incremental d'una solució: les assignacions actuals i els agregats
+    parcials de cada restricció registrada. Les restriccions sense agregat
+    es recalculen sencers sobre les assignacions actuals.
+    """
+
+    def __init__(self, restriccions: List[Dict], ctx: _ContextAvaluacio):
+        self.restriccions = restriccions
+        self.ctx = ctx
+        self.assignacions = defaultdict(int)  # Assignacio -> multiplicitat
+        self.agregats = []
+        for restriccio in restriccions:
+            classe = AGREGATS_INCREMENTALS.get(restriccio['funcio'])
+            self.agregats.append(classe(ctx) if classe else None)
+
+    def llista_assignacions(self) -> List[Assignacio]:
+        """Assignacions actuals en forma de llista (per a les restriccions no incrementals)"""
+        llista = []
+        for a, n in self.assignacions.items():
+            llista.extend([a] * n)
+        return llista
+
+    def _per_cada_agregat(self, metode: str, a: Assignacio):
+        for i, agregat in enumerate(self.agregats):
+            if agregat is None:
+                continue
+            try:
+                getattr(agregat, metode)(a)
+            except (TypeError, ValueError, AttributeError, KeyError) as e:
+                # Dades d'assignació mal formades: l'agregat queda inconsistent i a partir
+                # d'ara la restricció es recalcula sencera (i reporta l'error a resultat())
+                print(f"Error en {self.restriccions[i]['nom']} ({metode} incremental): {e}")
+                self.agregats[i] = None
+
+    def aplica(self, canvis: List[Tuple[Optional[Assignacio], Optional[Assignacio]]]):
+        """Aplica una llista de canvis (assignació antiga, assignació nova); None = cap"""
+        for antiga, nova in canvis:
+            if antiga is not None:
+                if self.assignacions.get(antiga, 0) == 0:
+                    raise ValueError(f"L'assignació {antiga} no forma part de l'estat")
+                self.assignacions[antiga] -= 1
+                if self.assignacions[antiga] == 0:
+                    del self.assignacions[antiga]
+                self._per_cada_agregat('elimina', antiga)
+            if nova is not None:
+                self.assignacions[nova] += 1
+                self._per_cada_agregat('afegeix', nova)
+
+    def resultat(self) -> Dict:
+        """Score total i detall per restricció, amb el mateix format que evalua_solucio"""
+        score_total = 0
+        detall_scores = {}
+        ctx_solucio = None
+
+        for restriccio, agregat in zip(self.restriccions, self.agregats):
+            try:
+                if agregat is not None:
+                    score = agregat.score()
+                else:
+                    if ctx_solucio is None:
+                        ctx_solucio = ContextSolucio(self.ctx, self.llista_assignacions())
+                    score = avalua_restriccio(restriccio['funcio'], ctx_solucio)
+                score_ponderat = score * restriccio['pes']
+                score_total += score_ponderat
+                detall_scores[restriccio['nom']] = {
+                    'score': score,
+                    'pes': restriccio['pes'],
+                    'ponderat': score_ponderat
+                }
+            except Exception as e:
+                print(f"Error en {restriccio['nom']}: {e}")
+                detall_scores[restriccio['nom']] = {
+                    'score': 0,
+                    'pes': restriccio['pes'],
+                    'ponderat': 0,
+                    'error': str(e)
+                }
+
+        return {
+            'total': score_total,
+            'detall': detall_scores
+        }
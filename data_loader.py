@@ -3,14 +3,21 @@
 import sqlite3
 import csv
 import re
+import sys
 from typing import List, Dict, Tuple, Set, Optional
 from datetime import time, date, datetime
 from data_structures import (
     Torn, ServeiTorn, DiaCalendari, Treballador,
-    NecessitatCobertura, HistoricTreballador, EstadistiquesGlobals
+    NecessitatCobertura, HistoricTreballador, EstadistiquesGlobals,
+    HorariServei, minuts_absoluts, MINUTS_DIA
 )
 
 
+def _interna(valor):
+    """Interna les cadenes que es repeteixen molt (ids, línies, zones, torns) per compartir-les"""
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
 class DataLoader:
     def __init__(self, db_path: str = 'treballadors.db'):
         """
@@ -105,7 +112,7 @@ class DataLoader:
         for row in self.cursor.fetchall():
             row_dict = dict(zip(columns, row))
             
-            torn_id = row_dict['Torn']
+            torn_id = _interna(row_dict['Torn'])
             linia = row_dict.get('Línia', '')
             zona = row_dict.get('Zona', '')
             
@@ -182,21 +189,50 @@ class DataLoader:
         return calendari
     
     @staticmethod
-    def troba_servei_per_data(torn: Torn, data: date,
-                               calendari: Dict[date, DiaCalendari]) -> ServeiTorn:
+    def construeix_taula_serveis(torns: Dict[str, Torn], calendari: Dict[date, DiaCalendari],
+                                 dates: Optional[Set[date]] = None) -> Dict[Tuple[str, date], HorariServei]:
         """
-        Troba quin servei (S1/S2/S3/S4) del torn aplica per una data concreta
+        Precalcula (torn_id, data) -> HorariServei per a totes les dates del calendari
+        (o només les de dates). Cada torn s'indexa un sol cop per codi de servei, de
+        manera que resoldre l'horari d'una necessitat és una sola consulta.
+        Les parelles sense servei per al codi del dia no hi són.
         """
-        if data not in calendari:
-            raise ValueError(f"Data {data} no trobada al calendari")
-        
-        codi_dia = calendari[data].servei_bv
-        
-        for num_servei, servei in torn.serveis.items():
-            if codi_dia in servei.codis_servei:
-                return servei
-        
-        raise ValueError(f"Codi servei {codi_dia} no trobat al torn {torn.id}")
+        servei_per_codi = {
+            torn_id: {codi: servei for servei in torn.serveis.values() for codi in servei.codis_servei}
+            for torn_id, torn in torns.items()
+        }
+        taula = {}
+        for data, dia in calendari.items():
+            if dates is not None and data not in dates:
+                continue
+            for torn_id, serveis in servei_per_codi.items():
+                servei = serveis.get(dia.servei_bv)
+                if servei is None:
+                    continue
+                inici = minuts_absoluts(data, servei.hora_inici)
+                fi = minuts_absoluts(data, servei.hora_fi)
+                if servei.hora_fi < servei.hora_inici:
+                    fi += MINUTS_DIA
+                taula[(torn_id, data)] = HorariServei(servei, inici, fi, servei.durada_hores())
+        return taula
+
+    @staticmethod
+    def necessitats_sense_servei(necessitats: List[NecessitatCobertura], torns: Dict[str, Torn],
+                                 calendari: Dict[date, DiaCalendari],
+                                 taula: Dict[Tuple[str, date], HorariServei]) -> List[Tuple[NecessitatCobertura, str]]:
+        """Retorna les necessitats que no tenen horari a la taula, amb el motiu"""
+        sense_servei = []
+        for nec in necessitats:
+            if (nec.servei, nec.data) in taula:
+                continue
+            if nec.servei not in torns:
+                motiu = f"Torn {nec.servei} desconegut"
+            elif nec.data not in calendari:
+                motiu = f"Data {nec.data} no trobada al calendari"
+            else:
+                motiu = f"Codi servei {calendari[nec.data].servei_bv} no trobat al torn {nec.servei}"
+            sense_servei.append((nec, motiu))
+        return sense_servei
     
     def carrega_descansos_dies(self) -> Dict[str, Set[date]]:
         """
@@ -256,7 +292,7 @@ class DataLoader:
         for row in self.cursor.fetchall():
             row_dict = dict(zip(columns, row))
             
-            treballador_id = str(row_dict['id'])
+            treballador_id = _interna(str(row_dict['id']))
             
             # Obtenim els descansos d'aquest treballador
             dates_descans = descansos_treballadors.get(treballador_id, set())
@@ -274,7 +310,7 @@ class DataLoader:
                 torn_assignat=row_dict.get('rotacio', row_dict.get('torn', '')),
                 zona=row_dict.get('zona', ''),
                 habilitacions=habilitacions,
-                linia=row_dict.get('línia', ''),
+                linia=_interna(row_dict.get('línia', '')),
                 categoria=row_dict.get('categoria', ''),
                 grup=row_dict.get('grup', ''),
                 denominacio=row_dict.get('denominació', ''),
@@ -304,12 +340,16 @@ class DataLoader:
         
         columns = [description[0] for description in self.cursor.description]
 
+        # Totes les necessitats d'un mateix dia comparteixen l'objecte date
+        dates: Dict[date, date] = {}
+
         for row in self.cursor.fetchall():
             row_dict = dict(zip(columns, row))
 
             data = datetime.strptime(row_dict['data'], '%Y-%m-%d').date()
+            data = dates.setdefault(data, data)
 
-            torn_val = row_dict.get('rotacio', row_dict.get('torn', ''))
+            torn_val = _interna(row_dict.get('rotacio', row_dict.get('torn', '')))
 
             # ⭐ AFEGEIX AQUEST BLOC NOU ⭐
             formacio_str = str(row_dict.get('formacio', '')).strip()
@@ -318,12 +358,12 @@ class DataLoader:
                 formacions_set = set(f.strip() for f in formacio_str.replace('+', ',').split(',') if f.strip())
 
             necessitat = NecessitatCobertura(
-                servei=row_dict.get('servei', ''),
+                servei=_interna(row_dict.get('servei', '')),
                 residencia=row_dict.get('residencia', ''),
                 torn=torn_val,
                 formacio=formacions_set,  # ⭐ CANVIAT ⭐
-                linia=row_dict.get('linia', ''),
-                zona=row_dict.get('zona', ''),
+                linia=_interna(row_dict.get('linia', '')),
+                zona=_interna(row_dict.get('zona', '')),
                 motiu=row_dict.get('motiu_no_cobert', ''),
                 data=data
             )
@@ -475,7 +515,8 @@ class DataLoader:
                 
                 linia = necessitat.linia if necessitat else ''
                 zona = necessitat.zona if necessitat else ''
-                formacio = necessitat.formacio if necessitat else ''
+                # La formació és un conjunt: es desa com a text separat per comes (com es llegeix)
+                formacio = ','.join(sorted(necessitat.formacio)) if necessitat else ''
                 
                 self.cursor.execute(insert_query, (
                     assign.data.strftime('%Y-%m-%d'),
@@ -513,6 +554,46 @@ class DataLoader:
             return False
 
 
+    def carrega_assignacions_grup_T(self) -> list:
+        """
+        Carrega les assignacions de l'última execució des de la taula assig_grup_T
+        (punt de partida de la replanificació incremental)
+        """
+        if self.cursor is None or self.conn is None:
+            if not self.connect():
+                raise RuntimeError("No s'ha pogut connectar a la base de dades")
+        
+        from data_structures import Assignacio
+        
+        assignacions = []
+        
+        try:
+            query = 'SELECT * FROM assig_grup_T'
+            self.cursor.execute(query)
+            
+            columns = [description[0] for description in self.cursor.description]
+            
+            for row in self.cursor.fetchall():
+                row_dict = dict(zip(columns, row))
+                
+                assignacions.append(Assignacio(
+                    treballador_id=str(row_dict['treballador_id']),
+                    torn_id=row_dict['torn'],
+                    data=datetime.strptime(row_dict['data'], '%Y-%m-%d').date(),
+                    hora_inici=datetime.strptime(row_dict['hora_inici'], '%H:%M').time(),
+                    hora_fi=datetime.strptime(row_dict['hora_fi'], '%H:%M').time(),
+                    durada_hores=float(row_dict['durada_hores']),
+                    es_canvi_zona=bool(row_dict.get('es_canvi_zona', 0)),
+                    es_canvi_torn=bool(row_dict.get('es_canvi_torn', 0))
+                ))
+            
+            print(f" ✓ Assignacions anteriors carregades: {len(assignacions)}")
+        
+        except sqlite3.Error as e:
+            print(f" ⚠️ Error carregant assignacions anteriors: {e}")
+        
+        return assignacions
+
     def compta_registres_assig_grup_T(self) -> int:
         """
         Compta el nombre de registres actuals a assig_grup_T
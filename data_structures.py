@@ -1,11 +1,35 @@
 # data_structures.py - SIMPLIFICAT AMB DATES DIRECTES
 
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
-from typing import List, Dict, Set, Optional
+from typing import List, Dict, Set, Optional, Tuple
 from datetime import datetime, time, date, timedelta
 
 
-@dataclass
+MINUTS_DIA = 24 * 60
+DESCANS_MINIM_MINUTS = 12 * 60
+
+
+def minuts_absoluts(data: date, hora: time) -> int:
+    """Converteix una data i una hora a minuts absoluts (des de l'ordinal de la data)"""
+    return data.toordinal() * MINUTS_DIA + hora.hour * 60 + hora.minute
+
+
+def normalitza_torn(nom: str) -> str:
+    """Normalitza el nom d'un torn per comparar-lo ('Matí ' -> 'mati')"""
+    return nom.strip().lower().replace('í', 'i')
+
+
+def torn_per_hora(hora: int) -> str:
+    """Nom normalitzat del torn segons l'hora d'inici"""
+    if hora < 12:
+        return 'mati'
+    if hora >= 20:
+        return 'nit'
+    return 'tarda'
+
+
+@dataclass(slots=True)
 class Treballador:
     id: str
     nom: str
@@ -30,6 +54,15 @@ class Treballador:
     canvis_zona: int = 0  # Nombre de vegades que ha treballat fora de la seva zona
     canvis_torn: int = 0  # Nombre de vegades que ha treballat en torn diferent
 
+    # Perfil de torn normalitzat (es calcula un sol cop a la creació)
+    opcions_torn: frozenset = field(init=False, repr=False, compare=False)
+    _canvis_torn: Dict[str, bool] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.opcions_torn = frozenset(
+            normalitza_torn(p) for p in self.torn_assignat.split(',') if p.strip()
+        )
+
     def te_descans(self, data: date) -> bool:
         """Comprova si el treballador té descans en una data"""
         return data in self.dates_descans
@@ -53,7 +86,7 @@ class Treballador:
         """Comprova si treballar en aquesta zona seria un canvi"""
         return self.zona != zona
 
-    def es_canvi_torn(self, torn: str) -> bool:
+    def es_canvi_torn(self, torn) -> bool:
         """Comprova si treballar en aquest torn seria un canvi"""
         # La propietat `torn_assignat` pot contenir valors com:
         # 'Mati', 'Tarda', 'Nit', 'Matí,Nit', 'Tarda, Nit', etc.
@@ -61,69 +94,52 @@ class Treballador:
         # - una string amb el nom del torn ('Matí', 'Tarda', 'Nit', o combinacions)
         # - un objecte amb atribut `hora_inici` (ServeiTorn o Assignacio)
         # - un objecte `time` amb l'hora d'inici
-
-        def normalize(s: str) -> str:
-            return s.strip().lower().replace('í', 'i').replace('\u00A0', ' ')
-
-        # Conjunt d'opcions del treballador (normalitzat)
-        treballador_opts = set(p.strip().lower().replace('í', 'i') for p in self.torn_assignat.split(',') if p.strip())
-
-        # Determina el nom del torn segons el paràmetre
-        torn_nom = None
-        from datetime import time as _time
-
         if isinstance(torn, str):
-            # Si la cadena conté múltiples opcions, comprovem la intersecció
-            parts = [p.strip().lower().replace('í', 'i') for p in torn.split(',') if p.strip()]
-            if parts:
-                # Si hi ha superposició entre les opcions del torn i les del treballador,
-                # considerem que NO és canvi
-                if treballador_opts.intersection(parts):
-                    return False
-                # En cas contrari, comparem amb la primera opció del torn
-                torn_nom = parts[0]
-        elif isinstance(torn, _time):
-            h = torn.hour
-            if h < 12:
-                torn_nom = 'mati'
-            elif h >= 20:
-                torn_nom = 'nit'
-            else:
-                torn_nom = 'tarda'
+            # Els noms de torn es repeteixen molt: el resultat es memoritza per nom
+            canvi = self._canvis_torn.get(torn)
+            if canvi is None:
+                canvi = self._canvi_torn_nom(torn)
+                self._canvis_torn[torn] = canvi
+            return canvi
+
+        if isinstance(torn, time):
+            hora = torn
+        elif hasattr(torn, 'hora_inici'):
+            hora = torn.hora_inici
         else:
-            # Objecte amb possible atribut hora_inici
-            hora = None
-            if hasattr(torn, 'hora_inici'):
-                hora = getattr(torn, 'hora_inici')
-            elif hasattr(torn, 'hora'):
-                hora = getattr(torn, 'hora')
-
-            if hora is not None:
-                if isinstance(hora, _time):
-                    h = hora.hour
-                else:
-                    try:
-                        h = int(str(hora).split(':')[0])
-                    except Exception:
-                        h = None
-
-                if h is not None:
-                    if h < 12:
-                        torn_nom = 'mati'
-                    elif h >= 20:
-                        torn_nom = 'nit'
-                    else:
-                        torn_nom = 'tarda'
+            hora = getattr(torn, 'hora', None)
+
+        h = None
+        if isinstance(hora, time):
+            h = hora.hour
+        elif hora is not None:
+            try:
+                h = int(str(hora).split(':')[0])
+            except Exception:
+                h = None
 
         # Si no hem pogut deduir el nom, fem comparació directa amb la cadena original
-        if not torn_nom:
-            return normalize(self.torn_assignat) != normalize(str(torn))
+        if h is None:
+            return self._canvi_torn_literal(str(torn))
 
         # Finalment, comprovem si el torn determinat està entre les opcions del treballador
-        return torn_nom not in treballador_opts
+        return torn_per_hora(h) not in self.opcions_torn
 
+    def _canvi_torn_nom(self, torn: str) -> bool:
+        """es_canvi_torn per a un nom de torn (pot contenir diverses opcions separades per comes)"""
+        parts = [normalitza_torn(p) for p in torn.split(',') if p.strip()]
+        if not parts:
+            return self._canvi_torn_literal(torn)
+        # Si hi ha superposició entre les opcions del torn i les del treballador, NO és canvi
+        return not self.opcions_torn.intersection(parts)
 
-@dataclass
+    def _canvi_torn_literal(self, torn: str) -> bool:
+        """Comparació directa amb la cadena original (quan no es pot deduir el nom del torn)"""
+        return (normalitza_torn(self.torn_assignat).replace('\u00A0', ' ') !=
+                normalitza_torn(torn).replace('\u00A0', ' '))
+
+
+@dataclass(slots=True)
 class Torn:
     """Representa un torn amb els seus múltiples serveis"""
     id: str  # AAL1, AAL2, ABO0...
@@ -132,7 +148,7 @@ class Torn:
     serveis: Dict[int, 'ServeiTorn']  # {1: ServeiTorn, 2: ServeiTorn...}
 
 
-@dataclass
+@dataclass(slots=True)
 class ServeiTorn:
     """Un servei dins d'un torn (S1, S2, S3, S4)"""
     num_servei: int  # 1, 2, 3, 4
@@ -156,7 +172,16 @@ class ServeiTorn:
         return total_minuts / 60.0
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class HorariServei:
+    """Servei que aplica a un torn en una data concreta, amb l'interval ja calculat"""
+    servei: ServeiTorn
+    inici: int  # Minuts absoluts
+    fi: int  # Minuts absoluts (fi > inici, també si creua mitjanit)
+    durada_hores: float
+
+
+@dataclass(slots=True)
 class DiaCalendari:
     data: date
     servei_bv: str  # '000', '100', '504'...
@@ -177,8 +202,9 @@ class DiaCalendari:
         return self.data.weekday() == 6
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Assignacio:
+    """Assignació d'un treballador a un torn en una data (immutable: el hash de la clau es desa)"""
     treballador_id: str
     torn_id: str
     data: date
@@ -188,11 +214,23 @@ class Assignacio:
     es_canvi_zona: bool = False  # Si és fora de la seva zona
     es_canvi_torn: bool = False  # Si és fora del seu torn habitual
     apunt_data: Optional[datetime] = None  # Timestamp de quan es va apuntar l'assignació al historic
+    _hash: int = field(init=False, repr=False, compare=False)  # Hash de la clau, calculat un sol cop
+
+    def __post_init__(self):
+        object.__setattr__(self, '_hash', hash((self.treballador_id, self.torn_id, self.data)))
 
     def __hash__(self):
-        return hash((self.treballador_id, self.torn_id, self.data))
+        return self._hash
+
+    def __reduce__(self):
+        # El hash de les cadenes depèn de PYTHONHASHSEED (diferent a cada procés amb spawn):
+        # en desempaquetar es reconstrueix amb __init__ perquè es torni a calcular
+        return (Assignacio, (self.treballador_id, self.torn_id, self.data, self.hora_inici, self.hora_fi,
+                             self.durada_hores, self.es_canvi_zona, self.es_canvi_torn, self.apunt_data))
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (self.treballador_id == other.treballador_id and
                 self.torn_id == other.torn_id and
                 self.data == other.data)
@@ -205,8 +243,63 @@ class Assignacio:
             dt += timedelta(days=1)
         return dt
 
+    def interval_minuts(self) -> Tuple[int, int]:
+        """Retorna (inici, fi) en minuts absoluts (considerant creuar mitjanit)"""
+        inici = minuts_absoluts(self.data, self.hora_inici)
+        fi = minuts_absoluts(self.data, self.hora_fi)
+        if self.hora_fi < self.hora_inici:
+            fi += MINUTS_DIA
+        return inici, fi
+
 
 @dataclass
+class TimelineTreballador:
+    """
+    Intervals de treball d'un treballador en minuts absoluts, ordenats per inici.
+    Opcionalment es recolza en una timeline base (p.ex. l'històric) que no es modifica.
+    """
+    inicis: List[int] = field(default_factory=list)
+    fins: List[int] = field(default_factory=list)
+    base: Optional['TimelineTreballador'] = None
+
+    def __len__(self) -> int:
+        return len(self.inicis)
+
+    def afegeix(self, inici: int, fi: int):
+        """Afegeix un interval mantenint l'ordre"""
+        pos = bisect_right(self.inicis, inici)
+        self.inicis.insert(pos, inici)
+        self.fins.insert(pos, fi)
+
+    def elimina(self, inici: int, fi: int) -> bool:
+        """Elimina un interval (no toca la base). Retorna False si no hi era"""
+        pos = bisect_left(self.inicis, inici)
+        while pos < len(self.inicis) and self.inicis[pos] == inici:
+            if self.fins[pos] == fi:
+                del self.inicis[pos]
+                del self.fins[pos]
+                return True
+            pos += 1
+        return False
+
+    def te_lloc(self, inici: int, fi: int, descans: int = DESCANS_MINIM_MINUTS) -> bool:
+        """
+        Comprova que cap interval toqui [inici - descans, fi + descans],
+        és a dir, que hi ha el descans mínim abans i després del nou interval
+        """
+        limit_inferior = inici - descans
+        j = bisect_left(self.inicis, fi + descans) - 1
+        # Cap torn dura més d'un dia: els que comencen abans no poden arribar al límit
+        while j >= 0 and self.inicis[j] > limit_inferior - MINUTS_DIA:
+            if self.fins[j] > limit_inferior:
+                return False
+            j -= 1
+        if self.base is not None:
+            return self.base.te_lloc(inici, fi, descans)
+        return True
+
+
+@dataclass(slots=True)
 class NecessitatCobertura:
     """Representa un torn que necessita ser cobert"""
     servei: str  # Codi del servei (AIG2, AML1...)
@@ -1,17 +1,159 @@
 # genetic_algorithm.py - CORREGIT AMB REPARACIÓ INTEL·LIGENT
 
+import gzip
+import hashlib
+import os
+import pickle
 import random
-from typing import List, Dict, Tuple
-from datetime import datetime
+import time
+from array import array
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, asdict
+from datetime import date
+from typing import List, Dict, Tuple, Optional
 from data_structures import (
-    Assignacio, Treballador, Torn, NecessitatCobertura, 
-    DiaCalendari, ServeiTorn, EstadistiquesGlobals
+    Assignacio, Treballador, Torn, NecessitatCobertura,
+    DiaCalendari, EstadistiquesGlobals,
+    TimelineTreballador, HorariServei
 )
-from constraints import RestriccionManager
-from data_loader import DataLoader
+from constraints import RestriccionManager, ContextSolucio, NIVELL_RIGID, NIVELL_FLEXIBLE
+from model_assignacio import (
+    ModelAssignacio, LlibreTreballadors, Genoma, SENSE_ASSIGNAR, CANVI_ZONA, CANVI_TORN
+)
+
+TOPOLOGIES_MIGRACIO = ('anell', 'complet')
+
+# Capçalera dels fitxers de checkpoint (canvia si canvia el format)
+CAPCALERA_CHECKPOINT = b'AGCKPT01'
+BACKENDS_AVALUACIO = ('python', 'numpy')
+MODES_SEMBRA = ('aleatoria', 'aparellament')
+
+# Criteris que poden aturar una execució (clau -> descripció per al resum)
+MOTIUS_ATURADA = {
+    'generacions': "s'han completat totes les generacions",
+    'temps': "s'ha esgotat el límit de temps",
+    'score_objectiu': "s'ha arribat al score objectiu",
+    'estancament': "massa generacions sense millora",
+    'cobertura_maxima': "s'ha arribat a la cobertura màxima possible",
+}
+
+
+class IndexosIndividu:
+    """
+    Índexs d'un individu en construcció: llibre de treballadors, timelines i registre
+    treballador-dia {(w, data)}. L'encreuament els crea i la mutació, la reparació i la
+    cerca local els actualitzen en lloc de reconstruir-los; l'avaluació en treu que el
+    genoma no té duplicats de treballador-dia.
+    """
+    __slots__ = ('llibre', 'timelines', 'ocupats')
+
+    def __init__(self, num_treballadors: int):
+        self.llibre = LlibreTreballadors(num_treballadors)
+        self.timelines: Dict[int, TimelineTreballador] = {}
+        self.ocupats = set()
+
+
+class CacheFitness:
+    """
+    Cache LRU dels resultats d'avaluació indexada pel genoma (canònic: un gen per necessitat).
+    Els duplicats i els fills idèntics a individus ja avaluats no es tornen a avaluar.
+    """
+
+    def __init__(self, capacitat: int = 500):
+        self.capacitat = capacitat
+        self.entrades: 'OrderedDict[bytes, Dict]' = OrderedDict()
+        self.encerts = 0
+        self.errors = 0
+
+    def obte(self, genoma: Genoma) -> Optional[Dict]:
+        """Retorna una còpia del resultat guardat (o None) i actualitza els comptadors"""
+        if self.capacitat <= 0:
+            self.errors += 1
+            return None
+        clau = genoma.tobytes()
+        resultat = self.entrades.get(clau)
+        if resultat is None:
+            self.errors += 1
+            return None
+        self.entrades.move_to_end(clau)
+        self.encerts += 1
+        return dict(resultat)
+
+    def guarda(self, genoma: Genoma, resultat: Dict):
+        """Guarda el resultat i descarta l'entrada menys usada si cal"""
+        if self.capacitat <= 0:
+            return
+        self.entrades[genoma.tobytes()] = dict(resultat)
+        self.entrades.move_to_end(genoma.tobytes())
+        while len(self.entrades) > self.capacitat:
+            self.entrades.popitem(last=False)
+
+    def resum(self) -> Dict:
+        """Comptadors d'encerts i errors per al resum de l'execució"""
+        consultes = self.encerts + self.errors
+        return {
+            'encerts': self.encerts,
+            'errors': self.errors,
+            'taxa_encert': self.encerts / consultes if consultes else 0.0,
+            'entrades': len(self.entrades),
+            'capacitat': self.capacitat
+        }
+
+
+@dataclass
+class EstadistiquesCerca:
+    """Comptadors de la cerca local memètica (s'agreguen entre processos)"""
+    fills: int = 0
+    moviments: int = 0
+    acceptats_reassignacio: int = 0
+    acceptats_intercanvi: int = 0
+    millora_total: float = 0.0
+    temps_ms: float = 0.0
+
+    def resum(self) -> Dict:
+        """Millora que aporta la cerca local, per al resum de l'execució"""
+        acceptats = self.acceptats_reassignacio + self.acceptats_intercanvi
+        return {
+            'fills': self.fills,
+            'moviments_avaluats': self.moviments,
+            'moviments_acceptats': acceptats,
+            'acceptats_reassignacio': self.acceptats_reassignacio,
+            'acceptats_intercanvi': self.acceptats_intercanvi,
+            'millora_total': self.millora_total,
+            'millora_per_fill': self.millora_total / self.fills if self.fills else 0.0,
+            'millora_per_moviment_acceptat': self.millora_total / acceptats if acceptats else 0.0,
+            'temps_ms_per_fill': self.temps_ms / self.fills if self.fills else 0.0
+        }
+
+
+@dataclass
+class CriterisAturada:
+    """Criteris per acabar l'execució abans d'esgotar les generacions (None = desactivat)"""
+    limit_temps: Optional[float] = None  # Segons de rellotge des de l'inici de l'execució
+    score_objectiu: Optional[float] = None  # Score total a partir del qual n'hi ha prou
+    max_sense_millora: Optional[int] = None  # Generacions seguides sense millorar el millor global
+    cobertura_maxima: bool = False  # Aturar quan el millor cobreix totes les necessitats cobribles
 
-class AlgorismeGenetic:
-    def __init__(self, 
+
+@dataclass
+class EstatIlla:
+    """Estat d'una subpoblació del model d'illes (viatja entre processos a cada època)"""
+    index: int
+    llavor: int
+    prob_mut_base: float  # Cada illa té la seva pròpia pauta de mutació
+    prob_mut_max: float
+    poblacio: List[Tuple[Genoma, Dict]] = field(default_factory=list)
+    millor: Optional[Tuple[Genoma, Dict]] = None
+    generacions_sense_millora: int = 0
+    generacions: int = 0
+    migrants_acceptats: int = 0
+    rng_estat: Optional[tuple] = None
+    comptadors: Dict[str, float] = field(default_factory=dict)  # Cache i cerca local de l'illa
+
+
+class AlgorismeGenetic(ModelAssignacio):
+    def __init__(self,
                  treballadors: Dict[str, Treballador],
                  torns: Dict[str, Torn],
                  necessitats: List[NecessitatCobertura],
@@ -19,131 +161,177 @@ class AlgorismeGenetic:
                  restriccions: RestriccionManager,
                  estadistiques: EstadistiquesGlobals,
                  mida_poblacio: int = 50,
-                 exclude_map: Dict = None):
-        self.treballadors = treballadors
-        self.torns = torns
-        self.necessitats = necessitats
-        self.calendari = calendari
+                 exclude_map: Dict = None,
+                 workers: int = 1,
+                 seed: Optional[int] = None,
+                 mida_cache: int = 500,
+                 backend_avaluacio: str = 'python',
+                 cerca_local: bool = False,
+                 max_moviments_cerca: int = 40,
+                 max_ms_cerca: float = 25.0,
+                 sembra: str = 'aleatoria',
+                 solucio_previa: Optional[List[Assignacio]] = None,
+                 fraccio_previa: float = 0.2,
+                 taula_serveis: Optional[Dict[Tuple[str, date], HorariServei]] = None,
+                 avaluacio_rapida: bool = False):
+        # Model precalculat (elegibilitat, horaris, timelines, canvis i marges d'hores)
+        super().__init__(treballadors, torns, necessitats, calendari, estadistiques,
+                         exclude_map=exclude_map, taula_serveis=taula_serveis)
         self.restriccions = restriccions
-        self.estadistiques = estadistiques
         self.mida_poblacio = mida_poblacio
 
-        # exclude_map: opcional, map de date -> set(treballador_id) per excloure
-        self.exclude_map = exclude_map or {}
+        # workers: nombre de processos per crear i avaluar fills (1 = sèrie)
+        self.workers = max(1, workers)
+        # Generador aleatori mestre: amb la mateixa llavor, el resultat és idèntic
+        # independentment del nombre de workers
+        self.seed = seed
+        self.rng = random.Random(seed)
 
-        # Filtrem només treballadors del grup T
-        self.treballadors_grup_t = {
-            tid: t for tid, t in treballadors.items() if t.grup == 'T'
-        }
+        # Resum de l'última execució (illes, cache, etc.)
+        self.resum_execucio: Dict = {}
 
-        print(f"   Treballadors grup T disponibles: {len(self.treballadors_grup_t)}")
-
-        # Creem un índex ràpid de necessitats per facilitar la cerca
-        self.necessitats_per_data = {}
-        for nec in necessitats:
-            if nec.data not in self.necessitats_per_data:
-                self.necessitats_per_data[nec.data] = []
-            self.necessitats_per_data[nec.data].append(nec)
-    
-    def _compleix_descans_12h(self, treb_id: str, data_nova, hora_inici_nova, 
-                              assignacions_actuals: List[Assignacio]) -> bool:
-        """
-        Verifica que hi hagi 12h de descans des de l'última assignació
-        """
-        # Comprovem amb l'històric
-        historic = self.estadistiques.get_historic(treb_id)
-        
-        ultimes_assignacions = []
-        if historic and historic.assignacions_any:
-            ultimes_assignacions.extend(historic.assignacions_any[-10:])  # Últimes 10
-        
-        # Afegim assignacions actuals d'aquest treballador
-        ultimes_assignacions.extend([a for a in assignacions_actuals if a.treballador_id == treb_id])
-        
-        if not ultimes_assignacions:
-            return True
-        
-        # Ordenem per data
-        ultimes_assignacions.sort(key=lambda a: (a.data, a.hora_inici))
-        
-        inici_nova = datetime.combine(data_nova, hora_inici_nova)
-        
-        # Comprovem només amb les assignacions properes en el temps
-        for assign_anterior in reversed(ultimes_assignacions):
-            # Si l'assignació anterior és més de 2 dies abans, no cal comprovar
-            if (data_nova - assign_anterior.data).days > 2:
-                continue
-                
-            fi_anterior = assign_anterior.hora_fi_real()
-            if not isinstance(fi_anterior, datetime):
-                fi_anterior = datetime.combine(assign_anterior.data, fi_anterior)
-            
-            hores_descans = (inici_nova - fi_anterior).total_seconds() / 3600
-            
-            if hores_descans < 12:
-                return False
-        
-        return True
-    
-    def genera_solucio_aleatoria(self) -> List[Assignacio]:
+        # Cache LRU de fitness (una per procés; els comptadors s'agreguen al procés principal)
+        self.cache_fitness = CacheFitness(mida_cache)
+
+        # Fase memètica opcional: cerca local sobre cada fill amb pressupost de moviments i temps
+        # (el límit de temps fa que el resultat pugui dependre de la velocitat de la màquina)
+        self.cerca_local = cerca_local
+        self.max_moviments_cerca = max_moviments_cerca
+        self.max_ms_cerca = max_ms_cerca
+        self.estadistiques_cerca = EstadistiquesCerca()
+
+        # Construcció dels individus nous: 'aleatoria' (voraç per ordre de necessitat)
+        # o 'aparellament' (aparellament màxim per dia, cobertura màxima des de l'inici)
+        if sembra not in MODES_SEMBRA:
+            raise ValueError(f"Mode de sembra desconegut: {sembra}")
+        self.sembra = sembra
+
+        # Backend d'avaluació: 'python' (un individu cada cop) o 'numpy' (tota la generació en lot)
+        if backend_avaluacio not in BACKENDS_AVALUACIO:
+            raise ValueError(f"Backend d'avaluació desconegut: {backend_avaluacio}")
+        self.backend_avaluacio = backend_avaluacio
+        self.avaluador_lot = None
+        if backend_avaluacio == 'numpy':
+            self.avaluador_lot = restriccions.crea_avaluador_vectorial(
+                self.ids_grup_t, necessitats, self.serveis_necessitat,
+                treballadors, torns, calendari, estadistiques, self.decodifica
+            )
+
+        # Mode d'avaluació ràpid: els individus que violen una restricció rígida no
+        # s'avaluen sencers (el backend 'numpy' avalua sempre el lot complet)
+        self.avaluacio_rapida = avaluacio_rapida
+        self._comptadors_avaluacio: Dict = {}
+
+        # Arrencada en calent: la solució anterior projectada sobre les necessitats actuals
+        # sembra una part de la població inicial (una còpia exacta i còpies mutades)
+        self.genoma_previ: Optional[Genoma] = None
+        self.num_individus_previs = 0
+        if solucio_previa:
+            self.genoma_previ, projectades = self.projecta_solucio(solucio_previa)
+            self.num_individus_previs = min(self.mida_poblacio,
+                                            max(1, round(fraccio_previa * self.mida_poblacio)))
+            self.resum_execucio['solucio_previa'] = {
+                'assignacions': len(solucio_previa),
+                'projectades': projectades,
+                'descartades': len(solucio_previa) - projectades,
+                'individus': self.num_individus_previs
+            }
+
+    # ==================== AVALUACIÓ ====================
+
+    def _avalua(self, genoma: Genoma, indexos: 'IndexosIndividu' = None) -> Dict:
+        """
+        Avalua un genoma amb el gestor de restriccions (o el recupera de la cache).
+        Amb els índexs de construcció, el context d'avaluació es munta sense agrupar ni ordenar
+        """
+        resultat = self.cache_fitness.obte(genoma)
+        if resultat is None:
+            if indexos is None:
+                resultat = self.restriccions.evalua_solucio(
+                    self.decodifica(genoma), self.treballadors, self.torns,
+                    self.necessitats, self.calendari, self.estadistiques,
+                    rapid=self.avaluacio_rapida
+                )
+            else:
+                resultat = self.restriccions.evalua_context(
+                    self._context_solucio(genoma), rapid=self.avaluacio_rapida
+                )
+            self.cache_fitness.guarda(genoma, resultat)
+        return resultat
+
+    def _context_solucio(self, genoma: Genoma) -> ContextSolucio:
+        """
+        Context d'avaluació d'un genoma sense duplicats de treballador-dia (el que garanteixen
+        els IndexosIndividu): cada (treballador, dia) té una sola assignació i, recorrent les
+        necessitats en ordre cronològic, les llistes per treballador ja surten ordenades.
+        """
+        assignacio = self._assignacio
+        per_posicio = [assignacio(i, w) if w != SENSE_ASSIGNAR else None for i, w in enumerate(genoma)]
+        assignacions = [a for a in per_posicio if a is not None]
+        per_treballador_dia = {}
+        hores = defaultdict(float)
+        for a in assignacions:
+            per_treballador_dia[(a.treballador_id, a.data)] = [a]
+            hores[a.treballador_id] += a.durada_hores
+        per_treballador = defaultdict(list)
+        for i in self.ordre_cronologic:
+            a = per_posicio[i]
+            if a is not None:
+                per_treballador[a.treballador_id].append(a)
+        problema = self.restriccions.context_problema(
+            self.treballadors, self.torns, self.necessitats, self.calendari, self.estadistiques
+        )
+        return ContextSolucio(problema, assignacions, per_treballador=dict(per_treballador),
+                              per_treballador_dia=per_treballador_dia, hores_per_treballador=dict(hores))
+
+    # ==================== OPERADORS ====================
+
+    def _avalua_lot(self, genomes: List[Genoma]) -> List[Dict]:
+        """Avalua una generació sencera amb el backend vectorial (només els que no són a la cache)"""
+        resultats = [self.cache_fitness.obte(g) for g in genomes]
+        pendents = [k for k, r in enumerate(resultats) if r is None]
+        if pendents:
+            nous = self.avaluador_lot.avalua_lot([genomes[k] for k in pendents])
+            for k, resultat in zip(pendents, nous):
+                self.cache_fitness.guarda(genomes[k], resultat)
+                resultats[k] = resultat
+        return resultats
+
+    def genera_solucio_aleatoria(self, rng: random.Random = None) -> Genoma:
         """
         Genera una solució inicial amb filtres intel·ligents i validacions rígides
         """
-        assignacions = []
+        rng = rng or self.rng
+        genoma = self.genoma_buit()
+        timelines: Dict[int, TimelineTreballador] = {}
+        llibre = LlibreTreballadors(len(self.ids_grup_t))
         # CONTROL RÍGID: Un treballador només pot tenir una assignació per dia
-        treballadors_per_dia = {}  # {(treballador_id, data): True}
-        
-        for necessitat in self.necessitats:
-            # Busquem el torn corresponent
-            if necessitat.servei not in self.torns:
-                continue
-            
-            torn = self.torns[necessitat.servei]
-            
-            # Intentem trobar l'horari correcte per aquesta data
-            try:
-                servei = DataLoader.troba_servei_per_data(
-                    torn, 
-                    necessitat.data, 
-                    self.calendari
-                )
-            except:
+        treballadors_per_dia = set()  # {(w, data)}
+
+        for idx_nec, necessitat in enumerate(self.necessitats):
+            # Horari resolt per aquesta necessitat (None si no és assignable)
+            servei = self.serveis_necessitat[idx_nec]
+            if servei is None:
                 continue
-            
+
             # Creem una llista de treballadors candidats (només grup T)
             candidats = []
 
-            for treb_id, treb in self.treballadors_grup_t.items():
+            # Els filtres estàtics (exclusions, descans, línia, formació) ja són a l'índex
+            for w in self.candidats_per_necessitat[idx_nec]:
                 # VALIDACIÓ RÍGIDA 1: No pot tenir ja una assignació aquest dia
-                if (treb_id, necessitat.data) in treballadors_per_dia:
-                    continue
-                
-                # Filtre 0: Excloem si en aquesta data el treballador ja tenia assignació (opció add_new_only)
-                if necessitat.data in self.exclude_map and treb_id in self.exclude_map[necessitat.data]:
-                    continue
-
-                # Filtre 1: No pot tenir descans
-                if treb.te_descans(necessitat.data):
-                    continue
-
-                # Filtre 2: Ha de ser de la mateixa línia
-                if treb.linia != necessitat.linia:
+                if (w, necessitat.data) in treballadors_per_dia:
                     continue
 
-                # Filtre 3: Ha de tenir la formació necessària
-                if not necessitat.formacio.intersection(treb.habilitacions):
-                    continue
-
-                # Filtre 4: No pot superar hores anuals màximes
-                hores_necessaries = servei.durada_hores()
-                if treb.hores_anuals_realitzades + hores_necessaries > treb.max_hores_ampliables:
+                # Filtre 4: No pot superar hores anuals màximes (històric + solució)
+                if not self._cap_hores(llibre, w, idx_nec):
                     continue
 
                 # VALIDACIÓ RÍGIDA 2: Ha de complir 12h de descans
-                if not self._compleix_descans_12h(treb_id, necessitat.data, servei.hora_inici, assignacions):
+                if not self._compleix_descans_12h(timelines, w, idx_nec):
                     continue
 
-                candidats.append(treb_id)
+                candidats.append(w)
 
             if not candidats:
                 continue
@@ -151,516 +339,1290 @@ class AlgorismeGenetic:
             # Prioritzem treballadors amb menys assignacions i dins hores estàndard
             candidats_prioritzats = []
 
-            for treb_id in candidats:
-                treb = self.treballadors_grup_t[treb_id]
+            for w in candidats:
                 prioritat = 0
 
                 # Bonus si està dins hores estàndard
-                if treb.esta_dins_limit_estandard():
+                if self._dins_estandard(llibre, w):
                     prioritat += 10
 
-                # Bonus si és la seva zona (menys canvis)
-                if not treb.es_canvi_zona(necessitat.zona):
+                # Bonus si és la seva zona i el seu torn (menys canvis)
+                canvis = self.canvis_necessitat[idx_nec][w]
+                if not canvis & CANVI_ZONA:
                     prioritat += 5
-
-                # Bonus si és el seu torn (menys canvis)
-                if not treb.es_canvi_torn(necessitat.torn):
+                if not canvis & CANVI_TORN:
                     prioritat += 5
 
                 # Penalització per cada assignació que ja té (equilibri)
-                num_assignacions = sum(1 for a in assignacions if a.treballador_id == treb_id)
-                prioritat -= num_assignacions * 2
+                prioritat -= llibre.assignacions[w] * 2
 
-                candidats_prioritzats.append((treb_id, prioritat))
+                candidats_prioritzats.append((w, prioritat))
 
             # Ordenem per prioritat i triem amb pes aleatori
             candidats_prioritzats.sort(key=lambda x: x[1], reverse=True)
 
             # Selecció estocàstica: més probabilitat pels millors
             pesos = [max(1, c[1]) for c in candidats_prioritzats[:10]]
-            treballador_escollit = random.choices(
-                [c[0] for c in candidats_prioritzats[:10]], 
-                weights=pesos, 
+            treballador_escollit = rng.choices(
+                [c[0] for c in candidats_prioritzats[:10]],
+                weights=pesos,
                 k=1
             )[0]
 
-            # Creem l'assignació
-            treb = self.treballadors_grup_t[treballador_escollit]
-
-            assignacio = Assignacio(
-                treballador_id=treballador_escollit,
-                torn_id=necessitat.servei,
-                data=necessitat.data,
-                hora_inici=servei.hora_inici,
-                hora_fi=servei.hora_fi,
-                durada_hores=servei.durada_hores(),
-                es_canvi_zona=treb.es_canvi_zona(necessitat.zona),
-                es_canvi_torn=treb.es_canvi_torn(necessitat.torn)
-            )
-
-            assignacions.append(assignacio)
+            # Assignem el gen
+            genoma[idx_nec] = treballador_escollit
+            self._timeline(timelines, treballador_escollit).afegeix(*self.intervals_necessitat[idx_nec])
+            self._afegeix_gen(llibre, idx_nec, treballador_escollit)
             # REGISTREM que aquest treballador ja té assignació aquest dia
-            treballadors_per_dia[(treballador_escollit, necessitat.data)] = True
-        
-        return assignacions
-    
-    def genera_poblacio_inicial(self) -> List[Tuple[List[Assignacio], Dict]]:
+            treballadors_per_dia.add((treballador_escollit, necessitat.data))
+
+        return genoma
+
+    def genera_solucio_aparellament(self, rng: random.Random = None) -> Genoma:
+        """
+        Genera una solució dia a dia: cada dia es resol com un aparellament bipartit màxim
+        (Hopcroft-Karp) entre les necessitats del dia i els treballadors elegibles que
+        compleixen les 12h de descans respecte dels dies anteriors i el límit d'hores.
+        L'ordre aleatori de necessitats i candidats desfà els empats i dona diversitat;
+        els candidats amb menys assignacions es proven primer (equitat).
+        """
+        rng = rng or self.rng
+        genoma = self.genoma_buit()
+        timelines: Dict[int, TimelineTreballador] = {}
+        llibre = LlibreTreballadors(len(self.ids_grup_t))
+
+        for data in sorted(self.cobribles_per_data):
+            necessitats_dia = self.cobribles_per_data[data][:]
+            rng.shuffle(necessitats_dia)
+
+            adjacencia = []
+            for idx_nec in necessitats_dia:
+                candidats = []
+                for w in self.candidats_per_necessitat[idx_nec]:
+                    if not self._cap_hores(llibre, w, idx_nec):
+                        continue
+                    if not self._compleix_descans_12h(timelines, w, idx_nec):
+                        continue
+                    candidats.append(w)
+                rng.shuffle(candidats)
+                candidats.sort(key=lambda w: llibre.assignacions[w])
+                adjacencia.append(candidats)
+
+            for idx_nec, w in zip(necessitats_dia, aparellament_maxim(adjacencia)):
+                if w == SENSE_ASSIGNAR:
+                    continue
+                genoma[idx_nec] = w
+                self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+                self._afegeix_gen(llibre, idx_nec, w)
+
+        return genoma
+
+    def projecta_solucio(self, assignacions: List[Assignacio]) -> Tuple[Genoma, int]:
+        """
+        Projecta una solució anterior (llista d'assignacions) sobre les necessitats actuals.
+        Es descarten els gens que ja no són factibles: necessitat o treballador inexistent,
+        treballador no elegible, segon torn el mateix dia, 12h de descans o límit d'hores.
+        Retorna el genoma i el nombre d'assignacions projectades.
+        """
+        genoma = self.genoma_buit()
+        timelines: Dict[int, TimelineTreballador] = {}
+        treballadors_per_dia = set()
+        llibre = LlibreTreballadors(len(self.ids_grup_t))
+        projectades = 0
+
+        for a in sorted(assignacions, key=lambda a: (a.data, a.hora_inici)):
+            idx_nec = self.index_necessitat.get((a.torn_id, a.data))
+            w = self.index_treballador.get(a.treballador_id)
+            if idx_nec is None or w is None or genoma[idx_nec] != SENSE_ASSIGNAR:
+                continue
+            if w not in self.conjunt_candidats[idx_nec] or (w, a.data) in treballadors_per_dia:
+                continue
+            if not self._cap_hores(llibre, w, idx_nec):
+                continue
+            if not self._compleix_descans_12h(timelines, w, idx_nec):
+                continue
+
+            genoma[idx_nec] = w
+            treballadors_per_dia.add((w, a.data))
+            self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+            self._afegeix_gen(llibre, idx_nec, w)
+            projectades += 1
+
+        return genoma, projectades
+
+    def _genera_solucio(self, rng: random.Random) -> Genoma:
+        """Genera un individu nou segons el mode de sembra"""
+        if self.sembra == 'aparellament':
+            return self.genera_solucio_aparellament(rng)
+        return self.genera_solucio_aleatoria(rng)
+
+    def genera_poblacio_inicial(self, pool: ProcessPoolExecutor = None) -> List[Tuple[Genoma, Dict]]:
         """Genera la població inicial amb diversitat"""
-        poblacio = []
-        
         print(f"   Generant població inicial de {self.mida_poblacio} individus...")
-        
+
+        if self.num_individus_previs:
+            print(f"   Sembrant {self.num_individus_previs} individus a partir de la solució anterior")
+        poblacio = self._processa(self._tasques_poblacio_inicial(self.rng), pool)
+
+        for i in range(9, self.mida_poblacio, 10):
+            print(f"      {i + 1}/{self.mida_poblacio} individus generats")
+
+        return poblacio
+
+    def _tasques_poblacio_inicial(self, rng: random.Random) -> List[Tuple]:
+        """Tasques de la població inicial: primer els individus de la solució anterior (si n'hi ha)"""
+        tasques = []
         for i in range(self.mida_poblacio):
-            solucio = self.genera_solucio_aleatoria()
-            
+            if i < self.num_individus_previs:
+                # Còpia exacta i còpies amb mutació creixent però moderada
+                prob_mutacio = 0.05 + (i / self.num_individus_previs * 0.15) if i > 0 else 0.0
+                tasques.append(('previ', rng.getrandbits(63), prob_mutacio))
+                continue
             # Afegim variació aleatòria progressiva
-            if i > 0:
-                prob_mutacio = 0.1 + (i / self.mida_poblacio * 0.3)
-                solucio = self.mutacio(solucio, prob_mutacio=prob_mutacio)
-            
-            resultat = self.restriccions.evalua_solucio(
-                solucio, self.treballadors, self.torns, 
-                self.necessitats, self.calendari, self.estadistiques
-            )
-            
-            poblacio.append((solucio, resultat))
-            
-            if (i + 1) % 10 == 0:
-                print(f"      {i + 1}/{self.mida_poblacio} individus generats")
-        
-        return poblacio
-    
-    def seleccio_torneig(self, poblacio: List[Tuple], 
-                         mida_torneig: int = 3) -> List[Assignacio]:
+            prob_mutacio = 0.1 + (i / self.mida_poblacio * 0.3) if i > 0 else 0.0
+            tasques.append(('nou', rng.getrandbits(63), prob_mutacio))
+        return tasques
+
+    def seleccio_torneig(self, poblacio: List[Tuple],
+                         mida_torneig: int = 3, rng: random.Random = None) -> Genoma:
         """Selecciona un individu per torneig"""
-        torneig = random.sample(poblacio, min(mida_torneig, len(poblacio)))
+        rng = rng or self.rng
+        torneig = rng.sample(poblacio, min(mida_torneig, len(poblacio)))
         return max(torneig, key=lambda x: x[1]['total'])[0]
-    
-    def encreuament(self, pare1: List[Assignacio], 
-                   pare2: List[Assignacio]) -> List[Assignacio]:
+
+    def encreuament(self, pare1: Genoma, pare2: Genoma, rng: random.Random = None,
+                    indexos: IndexosIndividu = None) -> Genoma:
         """
         Encreuament intel·ligent: manté assignacions per necessitat
         VALIDACIÓ: Assegura que no hi hagi duplicats de treballador-dia
+        Si es passen indexos (buits), s'hi construeixen els del fill
         """
-        if len(pare1) == 0 or len(pare2) == 0:
-            return pare1 if len(pare1) > 0 else pare2
-        
-        fill = []
-        treballadors_per_dia = {}  # Control de duplicats
-        
-        # Per cada necessitat, triem l'assignació del pare1 o pare2
-        for necessitat in self.necessitats:
-            assign_pare1 = None
-            assign_pare2 = None
-            
-            for a in pare1:
-                if a.torn_id == necessitat.servei and a.data == necessitat.data:
-                    assign_pare1 = a
-                    break
-            
-            for a in pare2:
-                if a.torn_id == necessitat.servei and a.data == necessitat.data:
-                    assign_pare2 = a
-                    break
-            
-            # Filtrem assignacions que violarien la restricció d'una per dia
+        rng = rng or self.rng
+        fill = self.genoma_buit()
+        if indexos is None:
+            indexos = IndexosIndividu(len(self.ids_grup_t))
+        treballadors_per_dia = indexos.ocupats  # Control de duplicats
+        llibre = indexos.llibre
+        timelines = indexos.timelines
+
+        # Per cada necessitat, triem el gen del pare1 o pare2 (mateixa posició)
+        for idx_nec, necessitat in enumerate(self.necessitats):
+            w1 = pare1[idx_nec]
+            w2 = pare2[idx_nec]
+
+            # Filtrem gens que violarien la restricció d'una per dia o el límit d'hores
             candidats = []
-            
-            if assign_pare1:
-                key = (assign_pare1.treballador_id, assign_pare1.data)
-                if key not in treballadors_per_dia:
-                    candidats.append(assign_pare1)
-            
-            if assign_pare2:
-                key = (assign_pare2.treballador_id, assign_pare2.data)
-                if key not in treballadors_per_dia:
-                    candidats.append(assign_pare2)
-            
+
+            if (w1 != SENSE_ASSIGNAR and (w1, necessitat.data) not in treballadors_per_dia
+                    and self._cap_hores(llibre, w1, idx_nec)):
+                candidats.append(w1)
+
+            if (w2 != SENSE_ASSIGNAR and (w2, necessitat.data) not in treballadors_per_dia
+                    and self._cap_hores(llibre, w2, idx_nec)):
+                candidats.append(w2)
+
             if not candidats:
                 continue
-            
+
             # Triem entre els candidats vàlids
             if len(candidats) == 1:
-                assignacio_triada = candidats[0]
+                triat = candidats[0]
             else:
                 # Avaluem quina és millor segons criteris d'equitat
-                assign_pare1, assign_pare2 = candidats[0], candidats[1]
-                treb1 = self.treballadors_grup_t.get(assign_pare1.treballador_id)
-                treb2 = self.treballadors_grup_t.get(assign_pare2.treballador_id)
-                
-                score1 = 0
-                score2 = 0
-                
-                if treb1:
-                    if treb1.esta_dins_limit_estandard():
-                        score1 += 2
-                    if not assign_pare1.es_canvi_zona:
-                        score1 += 1
-                    if not assign_pare1.es_canvi_torn:
-                        score1 += 1
-                
-                if treb2:
-                    if treb2.esta_dins_limit_estandard():
-                        score2 += 2
-                    if not assign_pare2.es_canvi_zona:
-                        score2 += 1
-                    if not assign_pare2.es_canvi_torn:
-                        score2 += 1
-                
+                scores = []
+                for w in candidats:
+                    canvis = self.canvis_necessitat[idx_nec][w]
+                    score = 0
+                    if self._dins_estandard(llibre, w):
+                        score += 2
+                    if not canvis & CANVI_ZONA:
+                        score += 1
+                    if not canvis & CANVI_TORN:
+                        score += 1
+                    scores.append(score)
+                score1, score2 = scores
+
                 # Selecció estocàstica basada en scores
                 if score1 + score2 > 0:
                     prob_pare1 = score1 / (score1 + score2)
-                    if random.random() < prob_pare1:
-                        assignacio_triada = assign_pare1
+                    if rng.random() < prob_pare1:
+                        triat = candidats[0]
                     else:
-                        assignacio_triada = assign_pare2
+                        triat = candidats[1]
                 else:
-                    assignacio_triada = random.choice([assign_pare1, assign_pare2])
-            
-            fill.append(assignacio_triada)
-            treballadors_per_dia[(assignacio_triada.treballador_id, assignacio_triada.data)] = True
-        
+                    triat = rng.choice(candidats)
+
+            fill[idx_nec] = triat
+            treballadors_per_dia.add((triat, necessitat.data))
+            self._afegeix_gen(llibre, idx_nec, triat)
+            self._timeline(timelines, triat).afegeix(*self.intervals_necessitat[idx_nec])
+
         return fill
-    
-    def mutacio(self, solucio: List[Assignacio], 
-                prob_mutacio: float = 0.1) -> List[Assignacio]:
+
+    def mutacio(self, solucio: Genoma, prob_mutacio: float = 0.1,
+                rng: random.Random = None, indexos: IndexosIndividu = None) -> Genoma:
         """
         Mutació: canvia algunes assignacions prioritzant l'equitat
         VALIDACIÓ: Assegura que no es creïn duplicats de treballador-dia
+        Amb els indexos de la solució (vegeu IndexosIndividu) no es reconstrueixen i s'actualitzen
         """
-        nova_solucio = []
-        # Control d'assignacions per treballador i dia
-        treballadors_per_dia = {}
-        
-        # Primer passem per totes les assignacions per registrar-les
-        for assign in solucio:
-            treballadors_per_dia[(assign.treballador_id, assign.data)] = assign
-        
-        for assign in solucio:
-            if random.random() < prob_mutacio:
-                # Busquem la necessitat corresponent
-                necessitat = None
-                for nec in self.necessitats:
-                    if nec.servei == assign.torn_id and nec.data == assign.data:
-                        necessitat = nec
-                        break
-                
-                if necessitat:
-                    # Busquem treballadors alternatius del grup T
-                    candidats = []
-                    
-                    for treb_id, treb in self.treballadors_grup_t.items():
-                        # Skip el treballador actual
-                        if treb_id == assign.treballador_id:
-                            continue
-                        
-                        # VALIDACIÓ RÍGIDA: No pot tenir ja una assignació aquest dia
-                        if (treb_id, necessitat.data) in treballadors_per_dia:
-                            continue
-                        
-                        # Excloem segons exclude_map
-                        if necessitat.data in self.exclude_map and treb_id in self.exclude_map[necessitat.data]:
-                            continue
-
-                        if treb.te_descans(necessitat.data):
-                            continue
-                        if treb.linia != necessitat.linia:
-                            continue
-                        if not necessitat.formacio.intersection(treb.habilitacions):
-                            continue
-                        
-                        # Comprovem hores disponibles
-                        if treb.hores_disponibles() < assign.durada_hores:
-                            continue
-                        
-                        # VALIDACIÓ RÍGIDA: Ha de complir 12h de descans
-                        if not self._compleix_descans_12h(treb_id, necessitat.data, assign.hora_inici, nova_solucio):
-                            continue
-                        
-                        candidats.append(treb_id)
-                    
-                    if candidats:
-                        # Triem un nou treballador
-                        nou_treballador = random.choice(candidats)
-                        treb = self.treballadors_grup_t[nou_treballador]
-                        
-                        # ACTUALITZEM el registre
-                        treballadors_per_dia.pop((assign.treballador_id, assign.data), None)
-                        
-                        nova_assignacio = Assignacio(
-                            treballador_id=nou_treballador,
-                            torn_id=assign.torn_id,
-                            data=assign.data,
-                            hora_inici=assign.hora_inici,
-                            hora_fi=assign.hora_fi,
-                            durada_hores=assign.durada_hores,
-                            es_canvi_zona=treb.es_canvi_zona(necessitat.zona),
-                            es_canvi_torn=treb.es_canvi_torn(necessitat.torn)
-                        )
-                        
-                        treballadors_per_dia[(nou_treballador, necessitat.data)] = nova_assignacio
-                        nova_solucio.append(nova_assignacio)
-                    else:
-                        nova_solucio.append(assign)
-                else:
-                    nova_solucio.append(assign)
-            else:
-                nova_solucio.append(assign)
-        
+        rng = rng or self.rng
+        nova_solucio = solucio[:]
+        if indexos is not None:
+            timelines, llibre, treballadors_per_dia = indexos.timelines, indexos.llibre, indexos.ocupats
+        else:
+            timelines = self._timelines_solucio(nova_solucio)
+            llibre = self._llibre(nova_solucio)
+            # Control d'assignacions per treballador i dia
+            treballadors_per_dia = set()
+
+            # Primer passem per totes les assignacions per registrar-les
+            for idx_nec, w in enumerate(nova_solucio):
+                if w != SENSE_ASSIGNAR:
+                    treballadors_per_dia.add((w, self.necessitats[idx_nec].data))
+
+        for idx_nec, w_actual in enumerate(solucio):
+            if w_actual == SENSE_ASSIGNAR or rng.random() >= prob_mutacio:
+                continue
+
+            necessitat = self.necessitats[idx_nec]
+
+            # Busquem treballadors alternatius del grup T
+            candidats = []
+
+            for w in self.candidats_per_necessitat[idx_nec]:
+                # Skip el treballador actual
+                if w == w_actual:
+                    continue
+
+                # VALIDACIÓ RÍGIDA: No pot tenir ja una assignació aquest dia
+                if (w, necessitat.data) in treballadors_per_dia:
+                    continue
+
+                # Comprovem hores disponibles (històric + solució)
+                if not self._cap_hores(llibre, w, idx_nec):
+                    continue
+
+                # VALIDACIÓ RÍGIDA: Ha de complir 12h de descans
+                if not self._compleix_descans_12h(timelines, w, idx_nec):
+                    continue
+
+                candidats.append(w)
+
+            if candidats:
+                # Triem un nou treballador i ACTUALITZEM el registre
+                nou_treballador = rng.choice(candidats)
+                treballadors_per_dia.discard((w_actual, necessitat.data))
+                treballadors_per_dia.add((nou_treballador, necessitat.data))
+                nova_solucio[idx_nec] = nou_treballador
+                self._elimina_gen(llibre, idx_nec, w_actual)
+                self._afegeix_gen(llibre, idx_nec, nou_treballador)
+                interval = self.intervals_necessitat[idx_nec]
+                timelines[w_actual].elimina(*interval)
+                self._timeline(timelines, nou_treballador).afegeix(*interval)
+
         return nova_solucio
-    
-    def evalua_validesa(self, solucio: List[Assignacio]) -> float:
+
+    def evalua_validesa(self, solucio: Genoma) -> float:
         """
         Retorna una penalització basada en violacions de restriccions.
         Serveix per guiar l'AG cap a solucions més vàlides.
         Penalitzacions més altes = solucions pitjors.
         """
         penalitzacio = 0.0
-        
+
         # Penalització per duplicats de treballador-dia
-        treballador_dia = {}
-        duplicats_treb_dia = 0
-        for assign in solucio:
-            key = (assign.treballador_id, assign.data)
+        # (els duplicats de torn-data no són possibles: hi ha un sol gen per necessitat)
+        treballador_dia = set()
+        cobertes = 0
+        for idx_nec, w in enumerate(solucio):
+            if w == SENSE_ASSIGNAR:
+                continue
+            cobertes += 1
+            key = (w, self.necessitats[idx_nec].data)
             if key in treballador_dia:
-                duplicats_treb_dia += 1
                 penalitzacio += 50.0
             else:
-                treballador_dia[key] = True
-        
-        # Penalització per duplicats de torn-data
-        torn_data = {}
-        duplicats_torn_data = 0
-        for assign in solucio:
-            key = (assign.torn_id, assign.data)
-            if key in torn_data:
-                duplicats_torn_data += 1
-                penalitzacio += 50.0
-            else:
-                torn_data[key] = True
-        
+                treballador_dia.add(key)
+
         # Penalització per necessitats descobertes
-        necessitats_cobertes = set()
-        for assign in solucio:
-            for nec in self.necessitats:
-                if nec.servei == assign.torn_id and nec.data == assign.data:
-                    necessitats_cobertes.add((nec.servei, nec.data))
-        
-        necessitats_descobertes = len(self.necessitats) - len(necessitats_cobertes)
+        necessitats_descobertes = len(self.necessitats) - cobertes
         penalitzacio += necessitats_descobertes * 20.0
-        
+
         return penalitzacio
-    
-    def reparacio(self, solucio: List[Assignacio]) -> List[Assignacio]:
-        """
-        Repara una solució de manera intel·ligent:
-        1. Elimina duplicats mantenint els millors
-        2. Intenta reasignar les necessitats descobertes
-        3. Aplica estratègia de reparació progressiva
-        """
-        # Pas 1: Identificar i resoldre duplicats de torn-data
-        vistes_torn_data = {}  # {(torn_id, data): assignacio}
-        treballador_dia_vistes = {}  # {(treballador_id, data): assignacio}
-        solucio_sense_duplicats = []
-        duplicats_eliminats = []
-        
-        for assign in solucio:
-            key_torn = (assign.torn_id, assign.data)
-            key_treb = (assign.treballador_id, assign.data)
-            
-            # Prioritat 1: Evitem duplicats de torn-data (crític)
-            if key_torn in vistes_torn_data:
-                duplicats_eliminats.append(assign)
-                continue
-            
-            # Prioritat 2: Evitem duplicats de treballador-dia
-            if key_treb in treballador_dia_vistes:
-                duplicats_eliminats.append(assign)
+
+    def reparacio(self, solucio: Genoma) -> Genoma:
+        """Repara una solució (vegeu repara_i_valida)"""
+        return self.repara_i_valida(solucio)[0]
+
+    def repara_i_valida(self, solucio: Genoma, indexos: IndexosIndividu = None) -> Tuple[Genoma, float]:
+        """
+        Repara una solució en una sola passada i en calcula la validesa:
+        1. Elimina duplicats treballador-dia i els gens que superen el límit d'hores
+        2. Intenta cobrir les necessitats descobertes
+        Les timelines, el llibre i el registre treballador-dia es construeixen un sol cop
+        i serveixen per a tots dos passos. Si es passen els indexos de la solució (que ja
+        garanteixen el pas 1), es reaprofiten i s'actualitzen. Retorna el genoma reparat i la
+        penalització que evalua_validesa donaria sobre el resultat (només descobertes).
+        """
+        genoma = solucio[:]
+        if indexos is not None:
+            treballador_dia_vistes, llibre, timelines = indexos.ocupats, indexos.llibre, indexos.timelines
+            descobertes = [idx_nec for idx_nec, w in enumerate(genoma) if w == SENSE_ASSIGNAR]
+        else:
+            # Pas 1: Identificar i resoldre duplicats de treballador-dia i excés d'hores
+            indexos = IndexosIndividu(len(self.ids_grup_t))
+            treballador_dia_vistes, llibre, timelines = indexos.ocupats, indexos.llibre, indexos.timelines
+            descobertes = []
+
+            for idx_nec, w in enumerate(genoma):
+                if w == SENSE_ASSIGNAR:
+                    descobertes.append(idx_nec)
+                    continue
+                key_treb = (w, self.necessitats[idx_nec].data)
+                if key_treb in treballador_dia_vistes or not self._cap_hores(llibre, w, idx_nec):
+                    genoma[idx_nec] = SENSE_ASSIGNAR
+                    descobertes.append(idx_nec)
+                    continue
+                treballador_dia_vistes.add(key_treb)
+                self._afegeix_gen(llibre, idx_nec, w)
+                self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+        cobertes = len(genoma) - len(descobertes)
+
+        # Pas 2: Intentem cobrir les necessitats descobertes
+        for idx_nec in descobertes:
+            if self.serveis_necessitat[idx_nec] is None:
                 continue
-            
-            solucio_sense_duplicats.append(assign)
-            vistes_torn_data[key_torn] = assign
-            treballador_dia_vistes[key_treb] = assign
-        
-        # Pas 2: Intentem cobrir les necessitats descobertes per duplicats
-        necessitats_descobertes = []
-        for nec in self.necessitats:
-            key = (nec.servei, nec.data)
-            if key not in vistes_torn_data:
-                necessitats_descobertes.append(nec)
-        
-        # Per cada necessitat descoberta, busquem un treballador lliure
-        reasignacions_exitoses = 0
-        for nec in necessitats_descobertes:
+            data = self.necessitats[idx_nec].data
+
             # Cercle de búsqueda prioritzat: primer candidats que tenien la necessitat
             candidats_ordenats = []
-            
-            for treb_id, treb in self.treballadors_grup_t.items():
-                key_treb = (treb_id, nec.data)
-                
-                # Saltem si ja té assignació aquest dia
-                if key_treb in treballador_dia_vistes:
-                    continue
-                
-                # Validacions bàsiques
-                if treb.te_descans(nec.data):
-                    continue
-                if treb.linia != nec.linia:
-                    continue
-                if nec.formacio not in treb.habilitacions:
+
+            # Les validacions bàsiques (descans, línia, formació) ja són a l'índex
+            for w in self.candidats_per_necessitat[idx_nec]:
+                # Saltem si ja té assignació aquest dia o no li queden hores
+                if (w, data) in treballador_dia_vistes or not self._cap_hores(llibre, w, idx_nec):
                     continue
-                
+
                 # Calculem prioritat: preferim treballadors que tenien aquesta necessitat
                 prioritat = 0
-                if not treb.es_canvi_zona(nec.zona):
+                canvis = self.canvis_necessitat[idx_nec][w]
+                if not canvis & CANVI_ZONA:
                     prioritat += 10
-                if not treb.es_canvi_torn(nec.torn):
+                if not canvis & CANVI_TORN:
                     prioritat += 10
-                if treb.esta_dins_limit_estandard():
+                if self._dins_estandard(llibre, w):
                     prioritat += 5
-                
-                candidats_ordenats.append((treb_id, prioritat))
-            
+
+                candidats_ordenats.append((w, prioritat))
+
             if not candidats_ordenats:
                 continue
-            
+
             # Ordenem per prioritat
             candidats_ordenats.sort(key=lambda x: x[1], reverse=True)
-            
+
             # Intentem els millors candidats
-            for treb_id, _ in candidats_ordenats:
-                try:
-                    servei = DataLoader.troba_servei_per_data(
-                        self.torns[nec.servei], nec.data, self.calendari
-                    )
-                    
-                    if not self._compleix_descans_12h(treb_id, nec.data, servei.hora_inici, solucio_sense_duplicats):
-                        continue
-                    
-                    treb = self.treballadors_grup_t[treb_id]
-                    
-                    nova_assign = Assignacio(
-                        treballador_id=treb_id,
-                        torn_id=nec.servei,
-                        data=nec.data,
-                        hora_inici=servei.hora_inici,
-                        hora_fi=servei.hora_fi,
-                        durada_hores=servei.durada_hores(),
-                        es_canvi_zona=treb.es_canvi_zona(nec.zona),
-                        es_canvi_torn=treb.es_canvi_torn(nec.torn)
-                    )
-                    
-                    solucio_sense_duplicats.append(nova_assign)
-                    treballador_dia_vistes[key_treb] = nova_assign
-                    vistes_torn_data[(nec.servei, nec.data)] = nova_assign
-                    reasignacions_exitoses += 1
-                    break  # Necessitat coberta, passem a la següent
-                
-                except:
+            for w, _ in candidats_ordenats:
+                if not self._compleix_descans_12h(timelines, w, idx_nec):
                     continue
-        
-        return solucio_sense_duplicats
-    
-    def executa(self, generacions: int = 100, 
-                verbose: bool = True) -> Tuple[List[Assignacio], Dict]:
-        """
-        Executa l'algorisme genètic amb reparació i evaluació de validesa integrades
-        """
-        poblacio = self.genera_poblacio_inicial()
-        
-        millor_global = max(poblacio, key=lambda x: x[1]['total'])
-        
+
+                genoma[idx_nec] = w
+                treballador_dia_vistes.add((w, data))
+                self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+                self._afegeix_gen(llibre, idx_nec, w)
+                cobertes += 1
+                break  # Necessitat coberta, passem a la següent
+
+        # Mateixa penalització que evalua_validesa: 20 per necessitat descoberta
+        return genoma, (len(self.necessitats) - cobertes) * 20.0
+
+    # ==================== EXECUCIÓ (SÈRIE O PARAL·LELA) ====================
+
+    def construeix_individu(self, tasca: Tuple) -> Tuple[Genoma, Optional[float]]:
+        """
+        Crea un individu (sense avaluar-lo) i retorna la penalització de validesa
+        que s'ha d'aplicar al seu score (None si no n'hi ha). Cada tasca porta
+        la seva pròpia llavor, de manera que el resultat no depèn del procés on s'executa.
+        - ('nou', llavor, prob_mutacio): individu de la població inicial
+        - ('previ', llavor, prob_mutacio): individu inicial a partir de la solució anterior
+        - ('fill', pare1, pare2, prob_mutacio, llavor): fill per encreuament
+        - ('reinici', llavor): individu nou per reiniciar la diversitat
+        """
+        genoma, validesa_penalty, _ = self._construeix(tasca)
+        return genoma, validesa_penalty
+
+    def _construeix(self, tasca: Tuple) -> Tuple[Genoma, Optional[float], Optional[IndexosIndividu]]:
+        """
+        Com construeix_individu, però retorna també els índexs amb què s'ha construït
+        l'individu (només els fills), perquè l'avaluació els pugui aprofitar
+        """
+        tipus = tasca[0]
+
+        if tipus == 'nou':
+            _, llavor, prob_mutacio = tasca
+            rng = random.Random(llavor)
+            solucio = self._genera_solucio(rng)
+            if prob_mutacio > 0:
+                solucio = self.mutacio(solucio, prob_mutacio=prob_mutacio, rng=rng)
+            return solucio, None, None
+
+        if tipus == 'previ':
+            _, llavor, prob_mutacio = tasca
+            rng = random.Random(llavor)
+            solucio = self.genoma_previ[:]
+            if prob_mutacio > 0:
+                solucio = self.mutacio(solucio, prob_mutacio=prob_mutacio, rng=rng)
+            # Les necessitats noves o que han perdut el treballador es cobreixen amb la reparació
+            return self.reparacio(solucio), None, None
+
+        if tipus == 'fill':
+            _, pare1, pare2, prob_mut, llavor = tasca
+            rng = random.Random(llavor)
+            # Els índexs del fill es construeixen a l'encreuament i els reaprofiten
+            # la mutació, la reparació, la cerca local i l'avaluació
+            indexos = IndexosIndividu(len(self.ids_grup_t))
+            fill = self.encreuament(pare1, pare2, rng, indexos)
+            fill = self.mutacio(fill, prob_mutacio=prob_mut, rng=rng, indexos=indexos)
+
+            # Reparació i penalització de validesa en una sola passada
+            fill, validesa_penalty = self.repara_i_valida(fill, indexos)
+
+            # Fase memètica: millora local del fill ja reparat
+            if self.cerca_local:
+                fill, cobertes = self.cerca_local_fill(fill, rng, indexos)
+                # Cada necessitat que la cerca local cobreix deixa de penalitzar (vegeu evalua_validesa)
+                validesa_penalty -= cobertes * 20.0
+            return fill, validesa_penalty, indexos
+
+        if tipus == 'reinici':
+            _, llavor = tasca
+            rng = random.Random(llavor)
+            sol = self._genera_solucio(rng)
+            sol = self.mutacio(sol, prob_mutacio=0.5, rng=rng)
+            return (*self.repara_i_valida(sol), None)
+
+        raise ValueError(f"Tipus de tasca desconegut: {tipus}")
+
+    # ==================== CERCA LOCAL (MEMÈTICA) ====================
+
+    def cerca_local_fill(self, genoma: Genoma, rng: random.Random = None,
+                         indexos: IndexosIndividu = None) -> Tuple[Genoma, int]:
+        """
+        Cerca local de primera millora: prova moviments aleatoris (reassignar una necessitat
+        a un altre candidat elegible o intercanviar els treballadors de dues necessitats del
+        mateix dia), els puntua amb l'avaluador incremental i accepta el primer que millora.
+        S'atura en esgotar max_moviments_cerca moviments avaluats o max_ms_cerca mil·lisegons.
+        Retorna el genoma millorat i quantes necessitats ha cobert de més (net).
+        Els indexos del genoma, si es passen, es reaprofiten i s'actualitzen amb els moviments acceptats.
+        """
+        rng = rng or self.rng
+        inici = time.perf_counter()
+        limit = inici + self.max_ms_cerca / 1000.0
+        genoma = genoma[:]
+
+        estat = self.restriccions.crea_estat(
+            self.decodifica(genoma), self.treballadors, self.torns,
+            self.necessitats, self.calendari, self.estadistiques
+        )
+        score_inicial = score = estat.resultat()['total']
+        if indexos is not None:
+            timelines, llibre, ocupats = indexos.timelines, indexos.llibre, indexos.ocupats
+        else:
+            timelines = self._timelines_solucio(genoma)
+            llibre = self._llibre(genoma)
+            ocupats = {(w, self.necessitats[i].data) for i, w in enumerate(genoma) if w != SENSE_ASSIGNAR}
+
+        stats = self.estadistiques_cerca
+        avaluats = 0
+        intents = 0
+        cobertes = 0
+        while (self.necessitats_cobribles and avaluats < self.max_moviments_cerca
+               and intents < self.max_moviments_cerca * 5 and time.perf_counter() < limit):
+            intents += 1
+            idx_nec = rng.choice(self.necessitats_cobribles)
+            if genoma[idx_nec] != SENSE_ASSIGNAR and rng.random() < 0.5:
+                tipus = 'intercanvi'
+                moviment = self._moviment_intercanvi(genoma, idx_nec, timelines, llibre, rng)
+            else:
+                tipus = 'reassignacio'
+                moviment = self._moviment_reassignacio(genoma, idx_nec, timelines, llibre, ocupats, rng)
+            if moviment is None:
+                continue
+
+            canvis = [(None if w_antic == SENSE_ASSIGNAR else self._assignacio(i, w_antic),
+                       self._assignacio(i, w_nou))
+                      for i, w_antic, w_nou in moviment]
+            avaluats += 1
+            resultat = self.restriccions.evalua_delta(estat, canvis)
+            if resultat['total'] > score + 1e-9:
+                score = resultat['total']
+                self._aplica_moviment(genoma, moviment, timelines, llibre, ocupats)
+                cobertes += sum((w_nou != SENSE_ASSIGNAR) - (w_antic != SENSE_ASSIGNAR)
+                                for _, w_antic, w_nou in moviment)
+                if tipus == 'intercanvi':
+                    stats.acceptats_intercanvi += 1
+                else:
+                    stats.acceptats_reassignacio += 1
+            else:
+                # Desfem el moviment a l'estat incremental
+                estat.aplica([(nova, antiga) for antiga, nova in reversed(canvis)])
+
+        stats.fills += 1
+        stats.moviments += avaluats
+        stats.millora_total += score - score_inicial
+        stats.temps_ms += (time.perf_counter() - inici) * 1000.0
+        return genoma, cobertes
+
+    def _moviment_reassignacio(self, genoma: Genoma, idx_nec: int,
+                               timelines: Dict[int, TimelineTreballador], llibre: LlibreTreballadors,
+                               ocupats: set, rng: random.Random) -> Optional[List[Tuple[int, int, int]]]:
+        """Reassigna (o cobreix) una necessitat amb un altre candidat que no treballi aquell dia"""
+        w_actual = genoma[idx_nec]
+        data = self.necessitats[idx_nec].data
+        candidats = [w for w in self.candidats_per_necessitat[idx_nec]
+                     if w != w_actual and (w, data) not in ocupats]
+        if not candidats:
+            return None
+        w = rng.choice(candidats)
+        if not self._cap_hores(llibre, w, idx_nec) or not self._compleix_descans_12h(timelines, w, idx_nec):
+            return None
+        return [(idx_nec, w_actual, w)]
+
+    def _moviment_intercanvi(self, genoma: Genoma, idx_nec: int,
+                             timelines: Dict[int, TimelineTreballador], llibre: LlibreTreballadors,
+                             rng: random.Random) -> Optional[List[Tuple[int, int, int]]]:
+        """Intercanvia els treballadors de dues necessitats del mateix dia si tots dos són elegibles"""
+        w1 = genoma[idx_nec]
+        parelles = [
+            j for j in self.cobribles_per_data[self.necessitats[idx_nec].data]
+            if j != idx_nec and genoma[j] != SENSE_ASSIGNAR and genoma[j] != w1
+            and genoma[j] in self.conjunt_candidats[idx_nec] and w1 in self.conjunt_candidats[j]
+        ]
+        if not parelles:
+            return None
+        j = rng.choice(parelles)
+        w2 = genoma[j]
+
+        # Cadascun deixa les hores de la seva necessitat i agafa les de l'altra
+        if (not self._cap_hores(llibre, w2, idx_nec, alliberades=self.durades_necessitat[j])
+                or not self._cap_hores(llibre, w1, j, alliberades=self.durades_necessitat[idx_nec])):
+            return None
+
+        # Comprovem el descans de 12h sense les assignacions que s'intercanvien
+        interval_i = self.intervals_necessitat[idx_nec]
+        interval_j = self.intervals_necessitat[j]
+        timelines[w1].elimina(*interval_i)
+        timelines[w2].elimina(*interval_j)
+        valid = (self._compleix_descans_12h(timelines, w2, idx_nec)
+                 and self._compleix_descans_12h(timelines, w1, j))
+        timelines[w1].afegeix(*interval_i)
+        timelines[w2].afegeix(*interval_j)
+        if not valid:
+            return None
+        return [(idx_nec, w1, w2), (j, w2, w1)]
+
+    def _aplica_moviment(self, genoma: Genoma, moviment: List[Tuple[int, int, int]],
+                         timelines: Dict[int, TimelineTreballador], llibre: LlibreTreballadors,
+                         ocupats: set):
+        """Aplica un moviment acceptat al genoma, a les timelines, al llibre i al registre treballador-dia"""
+        for i, w_antic, _ in moviment:
+            if w_antic != SENSE_ASSIGNAR:
+                timelines[w_antic].elimina(*self.intervals_necessitat[i])
+                self._elimina_gen(llibre, i, w_antic)
+                ocupats.discard((w_antic, self.necessitats[i].data))
+        for i, _, w_nou in moviment:
+            genoma[i] = w_nou
+            self._timeline(timelines, w_nou).afegeix(*self.intervals_necessitat[i])
+            self._afegeix_gen(llibre, i, w_nou)
+            ocupats.add((w_nou, self.necessitats[i].data))
+
+    # ==================== COMPTADORS ENTRE PROCESSOS ====================
+
+    def _comptadors(self) -> Dict[str, float]:
+        """Comptadors acumulats del procés (cache de fitness, cerca local i avaluació per nivells)"""
+        return {
+            'encerts_cache': self.cache_fitness.encerts,
+            'errors_cache': self.cache_fitness.errors,
+            **asdict(self.estadistiques_cerca),
+            **self.restriccions.instantania()
+        }
+
+    def _diferencia_comptadors(self, abans: Dict[str, float]) -> Dict[str, float]:
+        """Increment dels comptadors des de la foto abans"""
+        return {clau: valor - abans.get(clau, 0) for clau, valor in self._comptadors().items()}
+
+    def _afegeix_comptadors(self, delta: Dict[str, float]):
+        """Suma els comptadors d'un altre procés als d'aquest"""
+        self.cache_fitness.encerts += delta.get('encerts_cache', 0)
+        self.cache_fitness.errors += delta.get('errors_cache', 0)
+        for camp in fields(EstadistiquesCerca):
+            valor = getattr(self.estadistiques_cerca, camp.name) + delta.get(camp.name, 0)
+            setattr(self.estadistiques_cerca, camp.name, valor)
+        self.restriccions.afegeix_comptadors(delta)
+
+    def _resultat_exacte(self, individu: Tuple[Genoma, Dict]) -> Tuple[Genoma, Dict]:
+        """Reavalua sencer (sense mode ràpid) un individu que havia quedat dominat"""
+        genoma, resultat = individu
+        if not resultat.get('dominada'):
+            return individu
+        exacte = self.restriccions.evalua_solucio(
+            self.decodifica(genoma), self.treballadors, self.torns,
+            self.necessitats, self.calendari, self.estadistiques
+        )
+        return self._puntua(genoma, exacte, resultat.get('validesa_penalty'))
+
+    @staticmethod
+    def _puntua(genoma: Genoma, resultat: Dict,
+                validesa_penalty: Optional[float]) -> Tuple[Genoma, Dict]:
+        """Integra la penalització de validesa en el score total"""
+        if validesa_penalty is not None:
+            resultat['validesa_penalty'] = validesa_penalty
+            resultat['total'] -= validesa_penalty * 0.05  # Pes del 5%
+        return genoma, resultat
+
+    def executa_tasca(self, tasca: Tuple) -> Tuple[Genoma, Dict]:
+        """Crea i avalua un individu (vegeu construeix_individu)"""
+        genoma, validesa_penalty, indexos = self._construeix(tasca)
+        return self._puntua(genoma, self._avalua(genoma, indexos), validesa_penalty)
+
+    def _crea_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Crea el pool de processos (un per execució) amb el model de domini precarregat"""
+        if self.workers <= 1:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_inicialitza_worker,
+            initargs=(self,)
+        )
+
+    def _processa(self, tasques: List[Tuple],
+                  pool: ProcessPoolExecutor = None) -> List[Tuple[Genoma, Dict]]:
+        """Executa les tasques en sèrie o repartides en lots pel pool (mantenint l'ordre)"""
+        mida_lot = max(1, len(tasques) // (self.workers * 4))
+        if self.avaluador_lot is not None:
+            # Backend vectorial: es construeixen tots els individus i s'avaluen junts
+            if pool is None:
+                construits = [self.construeix_individu(t) for t in tasques]
+            else:
+                construits = []
+                for construit, delta in pool.map(_construeix_individu_worker, tasques, chunksize=mida_lot):
+                    self._afegeix_comptadors(delta)
+                    construits.append(construit)
+            resultats = self._avalua_lot([genoma for genoma, _ in construits])
+            return [self._puntua(genoma, resultat, validesa_penalty)
+                    for (genoma, validesa_penalty), resultat in zip(construits, resultats)]
+        if pool is None:
+            return [self.executa_tasca(t) for t in tasques]
+        individus = []
+        for individu, delta in pool.map(_executa_tasca_worker, tasques, chunksize=mida_lot):
+            self._afegeix_comptadors(delta)
+            individus.append(individu)
+        return individus
+
+    def __getstate__(self):
+        # Els workers reben el model de domini sense la cache d'assignacions
+        estat = self.__dict__.copy()
+        estat['_cache_assignacions'] = {}
+        estat['cache_fitness'] = CacheFitness(self.cache_fitness.capacitat)
+        estat['estadistiques_cerca'] = EstadistiquesCerca()
+        return estat
+
+    def _crea_fills(self, poblacio: List[Tuple[Genoma, Dict]], num_fills: int,
+                    prob_mut: float, rng: random.Random,
+                    pool: ProcessPoolExecutor = None) -> List[Tuple[Genoma, Dict]]:
+        """Selecciona els pares de tota la generació i crea els fills en lot"""
+        tasques = []
+        for _ in range(num_fills):
+            pare1 = self.seleccio_torneig(poblacio, rng=rng)
+            pare2 = self.seleccio_torneig(poblacio, rng=rng)
+            tasques.append(('fill', pare1, pare2, prob_mut, rng.getrandbits(63)))
+        return self._processa(tasques, pool)
+
+    def executa(self, generacions: int = 100,
+                verbose: bool = True,
+                criteris: CriterisAturada = None,
+                fitxer_checkpoint: Optional[str] = None,
+                interval_checkpoint: int = 10,
+                reprendre: bool = False) -> Tuple[List[Assignacio], Dict]:
+        """
+        Executa l'algorisme genètic amb reparació i evaluació de validesa integrades.
+        S'atura en esgotar les generacions o quan es compleix algun dels criteris.
+        Amb fitxer_checkpoint es desa l'estat cada interval_checkpoint generacions;
+        amb reprendre es continua des d'aquest fitxer si correspon a les mateixes dades.
+        """
+        inici = time.monotonic()
+        self._comptadors_avaluacio = self.restriccions.instantania()
+        criteris = criteris or CriterisAturada()
+        if verbose and self.workers > 1:
+            print(f"   Processos en paral·lel: {self.workers}")
+
+        checkpoint = None
+        if reprendre and fitxer_checkpoint:
+            checkpoint = self.carrega_checkpoint(fitxer_checkpoint, verbose)
+
+        pool = self._crea_pool()
+        try:
+            return self._executa(generacions, verbose, pool, criteris, inici,
+                                 fitxer_checkpoint, max(1, interval_checkpoint), checkpoint)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _motiu_aturada(self, criteris: CriterisAturada, millor: Tuple[Genoma, Dict],
+                       sense_millora: int, inici: float) -> Optional[str]:
+        """Retorna el criteri que obliga a aturar l'execució (o None si s'ha de continuar)"""
+        if criteris.score_objectiu is not None and millor[1]['total'] >= criteris.score_objectiu:
+            return 'score_objectiu'
+        if criteris.cobertura_maxima and self.num_cobertes(millor[0]) >= self.cota_cobertura:
+            return 'cobertura_maxima'
+        if criteris.max_sense_millora is not None and sense_millora >= criteris.max_sense_millora:
+            return 'estancament'
+        if criteris.limit_temps is not None and time.monotonic() - inici >= criteris.limit_temps:
+            return 'temps'
+        return None
+
+    def _imprimeix_avaluacio(self):
+        """Avaluacions per nivell de restricció (i individus dominats en mode ràpid)"""
+        nivells = self.resum_execucio['avaluacio']
+        rigides, flexibles = nivells[NIVELL_RIGID], nivells[NIVELL_FLEXIBLE]
+        print(f"   → Avaluacions: {nivells['individus']} individus ({nivells['dominats']} dominats) | "
+              f"rígides {rigides['avaluacions']} ({rigides['violacions']} violades) | "
+              f"flexibles {flexibles['avaluacions']} ({flexibles['omeses']} omeses)")
+
+    def _imprimeix_perfil(self):
+        """Temps per restricció, de la que en consumeix més a la que menys"""
+        perfil = self.resum_execucio.get('perfil_restriccions')
+        if not perfil:
+            return
+        print("   → Perfil de restriccions (temps total | % | crides | mitjana | p95 | errors):")
+        for nom, fila in perfil.items():
+            print(f"      {nom}: {fila['temps_total_ms']:.1f} ms | {fila['percentatge']:.1f}% | "
+                  f"{fila['crides']} | {fila['mitjana_us']:.1f} µs | {fila['p95_us']:.1f} µs | "
+                  f"{fila['errors']}")
+
+    def _imprimeix_cerca_local(self):
+        """Resum de la millora aportada per la fase memètica"""
+        if not self.cerca_local:
+            return
+        cerca = self.resum_execucio['cerca_local']
+        print(f"   → Cerca local: {cerca['fills']} fills | {cerca['moviments_acceptats']}/"
+              f"{cerca['moviments_avaluats']} moviments acceptats | "
+              f"millora mitjana {cerca['millora_per_fill']:.3f}/fill | "
+              f"{cerca['temps_ms_per_fill']:.1f} ms/fill")
+
+    def _registra_aturada(self, motiu: str, generacions: int, inici: float, verbose: bool):
+        """Guarda al resum el criteri que ha acabat l'execució"""
+        self.resum_execucio['aturada'] = {
+            'criteri': motiu,
+            'descripcio': MOTIUS_ATURADA[motiu],
+            'generacions': generacions,
+            'temps_segons': round(time.monotonic() - inici, 2),
+            'cota_cobertura': self.cota_cobertura
+        }
         if verbose:
-            print(f"\n   Millor individu inicial: {millor_global[1]['total']:.2f}")
-            print(f"   Assignacions inicials: {len(millor_global[0])}/{len(self.necessitats)}")
-        
-        generacions_sense_millora = 0
-        
-        for gen in range(generacions):
+            aturada = self.resum_execucio['aturada']
+            print(f"   → Aturada: {aturada['descripcio']} ({generacions} generacions, "
+                  f"{aturada['temps_segons']:.1f}s)")
+
+    def _executa(self, generacions: int, verbose: bool,
+                 pool: Optional[ProcessPoolExecutor],
+                 criteris: CriterisAturada, inici: float,
+                 fitxer_checkpoint: Optional[str] = None,
+                 interval_checkpoint: int = 10,
+                 checkpoint: Optional[Dict] = None) -> Tuple[List[Assignacio], Dict]:
+        if checkpoint is not None:
+            poblacio = checkpoint['poblacio']
+            millor_global = checkpoint['millor']
+            generacions_sense_millora = checkpoint['generacions_sense_millora']
+            sense_millora_global = checkpoint['sense_millora_global']
+            generacions_fetes = checkpoint['generacions']
+            self.rng.setstate(checkpoint['rng_estat'])
+            if verbose:
+                print(f"\n   ↺ Reprenent des de la generació {generacions_fetes} "
+                      f"(millor = {millor_global[1]['total']:.2f})")
+        else:
+            poblacio = self.genera_poblacio_inicial(pool)
+            millor_global = max(poblacio, key=lambda x: x[1]['total'])
+            generacions_sense_millora = 0
+            # Comptador d'estancament per al criteri d'aturada (no es reinicia amb la diversitat)
+            sense_millora_global = 0
+            generacions_fetes = 0
+
+            if verbose:
+                print(f"\n   Millor individu inicial: {millor_global[1]['total']:.2f}")
+                print(f"   Assignacions inicials: {self.num_cobertes(millor_global[0])}/{len(self.necessitats)}"
+                      f" (cota {self.cota_cobertura})")
+
+        motiu = self._motiu_aturada(criteris, millor_global, sense_millora_global, inici)
+
+        for gen in range(generacions_fetes, generacions):
+            if motiu is not None:
+                break
             nova_poblacio = []
-            
+
             # Elitisme: mantenim els 3 millors
             poblacio_ordenada = sorted(poblacio, key=lambda x: x[1]['total'], reverse=True)
             nova_poblacio.extend(poblacio_ordenada[:3])
-            
-            # Generem la resta de la població
-            while len(nova_poblacio) < self.mida_poblacio:
-                pare1 = self.seleccio_torneig(poblacio)
-                pare2 = self.seleccio_torneig(poblacio)
-                
-                fill = self.encreuament(pare1, pare2)
-                
-                # Mutació adaptativa
-                prob_mut = 0.05 + (0.20 * generacions_sense_millora / 25)
-                prob_mut = min(prob_mut, 0.35)
-                fill = self.mutacio(fill, prob_mutacio=prob_mut)
-                
-                # NOVA LÍNA: Avaluem validesa antes de reparar
-                validesa_penalty = self.evalua_validesa(fill)
-                
-                # NOVA LÍNA: Reparació intel·ligent si té problemes greus
-                if validesa_penalty > 50:
-                    fill = self.reparacio(fill)
-                    validesa_penalty = self.evalua_validesa(fill)  # Reevaluem
-                
-                # Reparació sempre al final (passa de neteja)
-                fill = self.reparacio(fill)
-                
-                resultat = self.restriccions.evalua_solucio(
-                    fill, self.treballadors, self.torns, 
-                    self.necessitats, self.calendari, self.estadistiques
-                )
-                
-                # NOVA LÍNA: Integrem validesa en el score total
-                resultat['validesa_penalty'] = validesa_penalty
-                resultat['total'] -= validesa_penalty * 0.05  # Pes del 5%
-                
-                nova_poblacio.append((fill, resultat))
-            
+
+            # Mutació adaptativa
+            prob_mut = 0.05 + (0.20 * generacions_sense_millora / 25)
+            prob_mut = min(prob_mut, 0.35)
+
+            nova_poblacio.extend(self._crea_fills(poblacio, self.mida_poblacio - len(nova_poblacio),
+                                                  prob_mut, self.rng, pool))
+
             poblacio = nova_poblacio
             millor_actual = max(poblacio, key=lambda x: x[1]['total'])
-            
+
             if millor_actual[1]['total'] > millor_global[1]['total']:
                 millor_global = millor_actual
                 generacions_sense_millora = 0
+                sense_millora_global = 0
             else:
                 generacions_sense_millora += 1
-            
+                sense_millora_global += 1
+            generacions_fetes = gen + 1
+
             if verbose and gen % 10 == 0:
                 validesa_global = self.evalua_validesa(millor_global[0])
                 print(f"   Generació {gen:3d}: Millor = {millor_global[1]['total']:6.2f} | "
                       f"Actual = {millor_actual[1]['total']:6.2f} | "
-                      f"Cobertes = {len(millor_global[0])}/{len(self.necessitats)} | "
+                      f"Cobertes = {self.num_cobertes(millor_global[0])}/{len(self.necessitats)} | "
                       f"Validesa = {validesa_global:6.1f} | "
                       f"Mut = {prob_mut:.2f}")
-            
+
+            motiu = self._motiu_aturada(criteris, millor_global, sense_millora_global, inici)
+            if motiu is not None:
+                break
+
             # Reinici si portem molt temps sense millora
             if generacions_sense_millora > 35:
                 if verbose:
                     print(f"   ↻ Reiniciant diversitat (gen {gen})...")
-                
-                nous_individus = []
-                for _ in range(self.mida_poblacio - 5):
-                    sol = self.genera_solucio_aleatoria()
-                    sol = self.mutacio(sol, prob_mutacio=0.5)
-                    sol = self.reparacio(sol)
-                    res = self.restriccions.evalua_solucio(
-                        sol, self.treballadors, self.torns,
-                        self.necessitats, self.calendari, self.estadistiques
-                    )
-                    validesa_penalty = self.evalua_validesa(sol)
-                    res['validesa_penalty'] = validesa_penalty
-                    res['total'] -= validesa_penalty * 0.05
-                    nous_individus.append((sol, res))
-                
+
+                tasques = [('reinici', self.rng.getrandbits(63))
+                           for _ in range(self.mida_poblacio - 5)]
+                nous_individus = self._processa(tasques, pool)
+
                 poblacio = poblacio_ordenada[:5] + nous_individus
                 generacions_sense_millora = 0
-        
+
+            if fitxer_checkpoint and generacions_fetes % interval_checkpoint == 0:
+                self.desa_checkpoint(fitxer_checkpoint, poblacio, millor_global, generacions_fetes,
+                                     generacions_sense_millora, sense_millora_global)
+
+        if fitxer_checkpoint:
+            self.desa_checkpoint(fitxer_checkpoint, poblacio, millor_global, generacions_fetes,
+                                 generacions_sense_millora, sense_millora_global)
+
+        # En mode ràpid, el millor individu es reavalua sencer si havia quedat dominat
+        millor_global = self._resultat_exacte(millor_global)
+        self.resum_execucio['cache'] = self.cache_fitness.resum()
+        self.resum_execucio['avaluacio'] = self.restriccions.resum_nivells(self._comptadors_avaluacio)
+        if self.restriccions.perfilat:
+            self.resum_execucio['perfil_restriccions'] = self.restriccions.resum_perfil(self._comptadors_avaluacio)
+        if self.cerca_local:
+            self.resum_execucio['cerca_local'] = self.estadistiques_cerca.resum()
+
         if verbose:
             print(f"\n   ✓ Algorisme finalitzat!")
             validesa_final = self.evalua_validesa(millor_global[0])
             print(f"   → Millor score final: {millor_global[1]['total']:.2f}")
             print(f"   → Penalització validesa final: {validesa_final:.1f}")
-            print(f"   → Assignacions finals: {len(millor_global[0])}/{len(self.necessitats)}")
-        
-        return millor_global[0], millor_global[1]
\ No newline at end of file
+            print(f"   → Assignacions finals: {self.num_cobertes(millor_global[0])}/{len(self.necessitats)}")
+            cache = self.resum_execucio['cache']
+            print(f"   → Cache de fitness: {cache['encerts']} encerts / {cache['errors']} errors "
+                  f"({cache['taxa_encert'] * 100:.1f}%)")
+            self._imprimeix_avaluacio()
+            self._imprimeix_perfil()
+            self._imprimeix_cerca_local()
+        self._registra_aturada(motiu or 'generacions', generacions_fetes, inici, verbose)
+
+        # Només convertim a objectes Assignacio el millor individu (per exportar)
+        return self.decodifica(millor_global[0]), millor_global[1]
+
+
+    # ==================== CHECKPOINTS ====================
+
+    def empremta_dades(self) -> str:
+        """
+        Empremta de les dades d'entrada que donen significat als genomes (necessitats,
+        treballadors del grup T, horaris, històric, restriccions i mida de població).
+        Un checkpoint només es pot reprendre si l'empremta coincideix.
+        """
+        h = hashlib.sha256()
+
+        def afegeix(*valors):
+            h.update(repr(valors).encode('utf-8'))
+
+        afegeix(self.mida_poblacio, len(self.necessitats), self.ids_grup_t)
+        for nec, interval in zip(self.necessitats, self.intervals_necessitat):
+            afegeix(nec.servei, nec.data, nec.torn, sorted(nec.formacio), nec.linia, nec.zona, interval)
+        for w, treb_id in enumerate(self.ids_grup_t):
+            t = self.treballadors_grup_t[treb_id]
+            historic = self.timelines_historic[w]
+            afegeix(treb_id, t.torn_assignat, t.zona, sorted(t.habilitacions), t.linia,
+                    sorted(t.dates_descans), t.hores_anuals_realitzades, t.max_hores_anuals,
+                    t.max_hores_ampliables, t.canvis_zona, t.canvis_torn,
+                    list(historic.inicis), list(historic.fins))
+        for data in sorted(self.exclude_map):
+            afegeix(data, sorted(self.exclude_map[data]))
+        for restriccio in self.restriccions.restriccions:
+            afegeix(restriccio['nom'], restriccio['pes'])
+        return h.hexdigest()
+
+    def desa_checkpoint(self, fitxer: str, poblacio: List[Tuple[Genoma, Dict]],
+                        millor: Tuple[Genoma, Dict], generacions: int,
+                        generacions_sense_millora: int, sense_millora_global: int):
+        """
+        Desa l'estat de l'execució en un fitxer binari comprimit: els genomes de la
+        població concatenats, els seus resultats, el millor, l'estat del generador
+        aleatori i els comptadors. S'escriu a un temporal i es reanomena (atòmic).
+        """
+        genomes = array('i')
+        for genoma, _ in poblacio:
+            genomes.extend(genoma)
+        estat = {
+            'empremta': self.empremta_dades(),
+            'num_gens': len(self.necessitats),
+            'genomes': genomes.tobytes(),
+            'resultats': [resultat for _, resultat in poblacio],
+            'millor': (millor[0].tobytes(), millor[1]),
+            'generacions': generacions,
+            'generacions_sense_millora': generacions_sense_millora,
+            'sense_millora_global': sense_millora_global,
+            'rng_estat': self.rng.getstate()
+        }
+        temporal = fitxer + '.tmp'
+        with gzip.open(temporal, 'wb') as f:
+            f.write(CAPCALERA_CHECKPOINT)
+            pickle.dump(estat, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, fitxer)
+
+    def carrega_checkpoint(self, fitxer: str, verbose: bool = True) -> Optional[Dict]:
+        """
+        Llegeix un checkpoint desat amb desa_checkpoint. Retorna None (i es comença
+        de zero) si no existeix, no és vàlid o correspon a unes altres dades.
+        """
+        if not os.path.exists(fitxer):
+            if verbose:
+                print(f"   ⚠️  No hi ha checkpoint a {fitxer}: es comença de zero")
+            return None
+        try:
+            with gzip.open(fitxer, 'rb') as f:
+                if f.read(len(CAPCALERA_CHECKPOINT)) != CAPCALERA_CHECKPOINT:
+                    raise ValueError("capçalera desconeguda")
+                estat = pickle.load(f)
+        except Exception as e:
+            if verbose:
+                print(f"   ⚠️  No s'ha pogut llegir el checkpoint {fitxer} ({e}): es comença de zero")
+            return None
+
+        if estat['empremta'] != self.empremta_dades():
+            if verbose:
+                print(f"   ⚠️  El checkpoint {fitxer} correspon a unes altres dades: es comença de zero")
+            return None
+
+        num_gens = estat['num_gens']
+        genomes = array('i')
+        genomes.frombytes(estat['genomes'])
+        poblacio = [
+            (genomes[k * num_gens:(k + 1) * num_gens], resultat)
+            for k, resultat in enumerate(estat['resultats'])
+        ]
+        millor = array('i')
+        millor.frombytes(estat['millor'][0])
+        estat['poblacio'] = poblacio
+        estat['millor'] = (millor, estat['millor'][1])
+        return estat
+
+    # ==================== MODEL D'ILLES ====================
+
+    def evoluciona_illa(self, illa: EstatIlla, generacions: int) -> EstatIlla:
+        """
+        Fa evolucionar una illa durant unes quantes generacions (dins d'un sol procés).
+        No hi ha reinicis: la diversitat la manté la migració entre illes.
+        """
+        abans = self._comptadors()
+        rng = random.Random()
+        if illa.rng_estat is None:
+            rng.seed(illa.llavor)
+        else:
+            rng.setstate(illa.rng_estat)
+
+        if not illa.poblacio:
+            illa.poblacio = self._processa(self._tasques_poblacio_inicial(rng))
+            illa.millor = max(illa.poblacio, key=lambda x: x[1]['total'])
+
+        for _ in range(generacions):
+            poblacio_ordenada = sorted(illa.poblacio, key=lambda x: x[1]['total'], reverse=True)
+            nova_poblacio = poblacio_ordenada[:3]
+
+            # Pauta de mutació pròpia de l'illa
+            prob_mut = illa.prob_mut_base + (0.20 * illa.generacions_sense_millora / 25)
+            prob_mut = min(prob_mut, illa.prob_mut_max)
+
+            nova_poblacio.extend(self._crea_fills(illa.poblacio, self.mida_poblacio - len(nova_poblacio),
+                                                  prob_mut, rng))
+            illa.poblacio = nova_poblacio
+            illa.generacions += 1
+
+            millor_actual = max(illa.poblacio, key=lambda x: x[1]['total'])
+            if millor_actual[1]['total'] > illa.millor[1]['total']:
+                illa.millor = millor_actual
+                illa.generacions_sense_millora = 0
+            else:
+                illa.generacions_sense_millora += 1
+
+        illa.rng_estat = rng.getstate()
+        for clau, valor in self._diferencia_comptadors(abans).items():
+            illa.comptadors[clau] = illa.comptadors.get(clau, 0) + valor
+        return illa
+
+    @staticmethod
+    def _migra(illes: List[EstatIlla], num_migrants: int, topologia: str) -> int:
+        """
+        Envia els millors individus de cada illa a les seves veïnes i substitueix
+        els pitjors si el migrant és millor i no hi és ja. Retorna els acceptats.
+        """
+        # Fem una foto dels migrants abans de modificar cap illa
+        millors = [
+            sorted(illa.poblacio, key=lambda x: x[1]['total'], reverse=True)[:num_migrants]
+            for illa in illes
+        ]
+        acceptats_total = 0
+        k = len(illes)
+
+        for i, illa in enumerate(illes):
+            if topologia == 'anell':
+                origens = [(i - 1) % k]
+            else:
+                origens = [j for j in range(k) if j != i]
+
+            migrants = [m for j in origens for m in millors[j]]
+            migrants.sort(key=lambda x: x[1]['total'], reverse=True)
+
+            poblacio = sorted(illa.poblacio, key=lambda x: x[1]['total'], reverse=True)
+            presents = {g.tobytes() for g, _ in poblacio}
+            posicio = len(poblacio) - 1
+
+            for genoma, resultat in migrants[:num_migrants]:
+                if posicio < 3:  # No substituïm mai l'elit
+                    break
+                clau = genoma.tobytes()
+                if clau in presents or resultat['total'] <= poblacio[posicio][1]['total']:
+                    continue
+                presents.add(clau)
+                poblacio[posicio] = (genoma[:], resultat)
+                posicio -= 1
+                illa.migrants_acceptats += 1
+                acceptats_total += 1
+                if resultat['total'] > illa.millor[1]['total']:
+                    illa.millor = poblacio[posicio + 1]
+
+            illa.poblacio = poblacio
+
+        return acceptats_total
+
+    def executa_illes(self, generacions: int = 100,
+                      num_illes: int = 4,
+                      interval_migracio: int = 10,
+                      num_migrants: int = 2,
+                      topologia: str = 'anell',
+                      verbose: bool = True,
+                      criteris: CriterisAturada = None) -> Tuple[List[Assignacio], Dict]:
+        """
+        Model d'illes: num_illes subpoblacions evolucionen en processos separats i
+        cada interval_migracio generacions intercanvien els seus millors individus
+        (topologia 'anell' o 'complet'). Substitueix el reinici per estancament.
+        Els criteris d'aturada es comproven entre èpoques de migració.
+        """
+        inici = time.monotonic()
+        self._comptadors_avaluacio = self.restriccions.instantania()
+        criteris = criteris or CriterisAturada()
+        if topologia not in TOPOLOGIES_MIGRACIO:
+            raise ValueError(f"Topologia de migració desconeguda: {topologia}")
+        num_illes = max(1, num_illes)
+        interval_migracio = max(1, interval_migracio)
+
+        # Pautes de mutació repartides entre illes conservadores i exploradores
+        illes = []
+        for k in range(num_illes):
+            fraccio = k / (num_illes - 1) if num_illes > 1 else 0.0
+            illes.append(EstatIlla(
+                index=k,
+                llavor=self.rng.getrandbits(63),
+                prob_mut_base=0.03 + 0.12 * fraccio,
+                prob_mut_max=0.25 + 0.20 * fraccio
+            ))
+
+        if verbose:
+            print(f"   Model d'illes: {num_illes} illes, migració cada {interval_migracio} "
+                  f"generacions ({topologia}, {num_migrants} migrants)")
+
+        pool = ProcessPoolExecutor(
+            max_workers=num_illes,
+            initializer=_inicialitza_worker,
+            initargs=(self,)
+        ) if num_illes > 1 else None
+
+        motiu = None
+        millor_global = None
+        sense_millora_global = 0
+        try:
+            fetes = 0
+            while fetes < generacions or not illes[0].poblacio:
+                epoca = min(interval_migracio, generacions - fetes)
+                if pool is not None:
+                    illes = list(pool.map(_evoluciona_illa_worker, illes, [epoca] * num_illes))
+                else:
+                    illes = [self.evoluciona_illa(illa, epoca) for illa in illes]
+                fetes += epoca
+
+                millor_epoca = max((illa.millor for illa in illes), key=lambda x: x[1]['total'])
+                if millor_global is None or millor_epoca[1]['total'] > millor_global[1]['total']:
+                    millor_global = millor_epoca
+                    sense_millora_global = 0
+                else:
+                    sense_millora_global += epoca
+                motiu = self._motiu_aturada(criteris, millor_global, sense_millora_global, inici)
+
+                if fetes < generacions and num_illes > 1 and motiu is None:
+                    acceptats = self._migra(illes, num_migrants, topologia)
+                else:
+                    acceptats = 0
+
+                if verbose:
+                    millors = ' | '.join(f"{illa.millor[1]['total']:6.2f}" for illa in illes)
+                    print(f"   Generació {fetes:3d}: Millors per illa = {millors} | Migrants acceptats = {acceptats}")
+
+                if motiu is not None:
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        millor_illa = max(illes, key=lambda illa: illa.millor[1]['total'])
+        millor_global = millor_illa.millor
+
+        if pool is not None:
+            # Les illes han evolucionat en altres processos: n'agreguem els comptadors
+            for illa in illes:
+                self._afegeix_comptadors(illa.comptadors)
+        millor_global = self._resultat_exacte(millor_global)
+        self.resum_execucio['cache'] = self.cache_fitness.resum()
+        self.resum_execucio['avaluacio'] = self.restriccions.resum_nivells(self._comptadors_avaluacio)
+        if self.restriccions.perfilat:
+            self.resum_execucio['perfil_restriccions'] = self.restriccions.resum_perfil(self._comptadors_avaluacio)
+        if self.cerca_local:
+            self.resum_execucio['cerca_local'] = self.estadistiques_cerca.resum()
+        self.resum_execucio['illes'] = [
+            {
+                'illa': illa.index,
+                'millor_score': illa.millor[1]['total'],
+                'cobertes': self.num_cobertes(illa.millor[0]),
+                'migrants_acceptats': illa.migrants_acceptats,
+                'prob_mutacio_base': illa.prob_mut_base
+            }
+            for illa in illes
+        ]
+
+        if verbose:
+            print("\n   ✓ Algorisme finalitzat (model d'illes)!")
+            for info in self.resum_execucio['illes']:
+                print(f"   → Illa {info['illa']}: millor = {info['millor_score']:.2f} | "
+                      f"cobertes = {info['cobertes']}/{len(self.necessitats)} | "
+                      f"migrants acceptats = {info['migrants_acceptats']}")
+            print(f"   → Millor score final: {millor_global[1]['total']:.2f} (illa {millor_illa.index})")
+            cache = self.resum_execucio['cache']
+            print(f"   → Cache de fitness: {cache['encerts']} encerts / {cache['errors']} errors")
+            self._imprimeix_avaluacio()
+            self._imprimeix_perfil()
+            self._imprimeix_cerca_local()
+            print(f"   → Assignacions finals: {self.num_cobertes(millor_global[0])}/{len(self.necessitats)}")
+        self._registra_aturada(motiu or 'generacions', fetes, inici, verbose)
+
+        return self.decodifica(millor_global[0]), millor_global[1]
+
+# ==================== APARELLAMENT BIPARTIT ====================
+
+def aparellament_maxim(adjacencia: List[List[int]]) -> List[int]:
+    """
+    Aparellament bipartit màxim (Hopcroft-Karp). adjacencia[i] és la llista de nodes
+    de la dreta compatibles amb el node i de l'esquerra, en ordre de preferència.
+    Retorna, per cada node de l'esquerra, el node aparellat o SENSE_ASSIGNAR.
+    """
+    n = len(adjacencia)
+    parella_esq = [SENSE_ASSIGNAR] * n
+    parella_dreta: Dict[int, int] = {}
+    infinit = n + 1
+
+    while True:
+        # BFS: capes des dels nodes lliures de l'esquerra
+        distancia = [infinit] * n
+        cua = []
+        for i in range(n):
+            if parella_esq[i] == SENSE_ASSIGNAR:
+                distancia[i] = 0
+                cua.append(i)
+        trobat = False
+        for i in cua:
+            for w in adjacencia[i]:
+                j = parella_dreta.get(w)
+                if j is None:
+                    trobat = True
+                elif distancia[j] == infinit:
+                    distancia[j] = distancia[i] + 1
+                    cua.append(j)
+        if not trobat:
+            return parella_esq
+
+        # DFS: camins augmentants disjunts més curts seguint les capes
+        def augmenta(i: int) -> bool:
+            for w in adjacencia[i]:
+                j = parella_dreta.get(w)
+                if j is None or (distancia[j] == distancia[i] + 1 and augmenta(j)):
+                    parella_esq[i] = w
+                    parella_dreta[w] = i
+                    return True
+            distancia[i] = infinit
+            return False
+
+        for i in range(n):
+            if parella_esq[i] == SENSE_ASSIGNAR:
+                augmenta(i)
+
+
+# ==================== WORKERS DEL POOL DE PROCESSOS ====================
+
+# Instància de l'algorisme precarregada a cada procés del pool
+_AG_WORKER: Optional[AlgorismeGenetic] = None
+
+
+def _inicialitza_worker(ag: AlgorismeGenetic):
+    """Inicialitzador del pool: guarda el model de domini (immutable) del procés"""
+    global _AG_WORKER
+    _AG_WORKER = ag
+
+
+def _executa_tasca_worker(tasca: Tuple) -> Tuple[Tuple[Genoma, Dict], Dict[str, float]]:
+    """
+    Executa una tasca de creació i avaluació d'individu dins d'un worker.
+    Retorna també l'increment dels comptadors (cache i cerca local) que ha generat.
+    """
+    abans = _AG_WORKER._comptadors()
+    individu = _AG_WORKER.executa_tasca(tasca)
+    return individu, _AG_WORKER._diferencia_comptadors(abans)
+
+
+def _construeix_individu_worker(tasca: Tuple) -> Tuple[Tuple[Genoma, Optional[float]], Dict[str, float]]:
+    """Construeix un individu dins d'un worker (l'avaluació en lot es fa al procés principal)"""
+    abans = _AG_WORKER._comptadors()
+    construit = _AG_WORKER.construeix_individu(tasca)
+    return construit, _AG_WORKER._diferencia_comptadors(abans)
+
+
+def _evoluciona_illa_worker(illa: EstatIlla, generacions: int) -> EstatIlla:
+    """Fa evolucionar una illa dins d'un worker"""
+    return _AG_WORKER.evoluciona_illa(illa, generacions)
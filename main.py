@@ -17,17 +17,25 @@ from constraints import (
     restriccio_sense_solapaments_rigida,
     restriccio_descans_minim_12h_rigida,
     restriccio_divendres_cap_setmana_rigida,
-    restriccio_unica_assignacio_per_dia_rigida
-
+    restriccio_unica_assignacio_per_dia_rigida,
+    NIVELL_RIGID
 )
 from data_structures import EstadistiquesGlobals
-from genetic_algorithm import AlgorismeGenetic
+from genetic_algorithm import AlgorismeGenetic, CriterisAturada
+from motor_flux import MotorFlux
+from avaluacio_vectorial import NUMPY_DISPONIBLE
 import json
 import csv
-from datetime import datetime, date
-from typing import Dict, Set, Optional
+from datetime import datetime, date, timedelta
+from typing import Dict, Set, Optional, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
 import argparse
+import copy
 from collections import Counter
+
+# Fitxer de checkpoint per defecte quan es fa servir --resume sense --checkpoint
+FITXER_CHECKPOINT = 'checkpoint_ag.bin'
 
 class CustomJSONEncoder(json.JSONEncoder):
     """Encoder personalitzat per serialitzar Sets, dates i times"""
@@ -40,7 +48,439 @@ class CustomJSONEncoder(json.JSONEncoder):
             return obj.strftime('%H:%M')
         return super().default(obj)
 
-def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_duplicate: Optional[str] = None):
+def configura_restriccions(perfilat: bool = False) -> RestriccionManager:
+    """
+    Crea el RestriccionManager amb totes les restriccions i els seus pesos
+    (amb perfilat, es mesura el temps i les crides de cada restricció)
+    """
+    restriccions = RestriccionManager(perfilat=perfilat)
+    
+    # ===== RESTRICCIONS CRÍTIQUES (pes alt) =====
+    print("\n   🔴 RESTRICCIONS CRÍTIQUES:")
+
+    restriccions.afegeix_restriccio(
+        restriccio_unica_assignacio_per_dia_rigida, 
+        pes=0.30, 
+        nom="🔒 Una assignació per dia (RÍGIDA)"
+    )
+    print("      • Una assignació per dia (pes: 0.30))")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_grup_T, 
+        pes=0.20, 
+        nom="👥 Només grup T"
+    )
+    print("      • Només grup T (pes: 0.20)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_sense_descans, 
+        pes=0.20, 
+        nom="❌ Sense descans"
+    )
+    print("      • Sense descans (pes: 0.20)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_formacio_requerida, 
+        pes=0.15, 
+        nom="🎓 Formació requerida"
+    )
+    print("      • Formació requerida (pes: 0.15)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_linia_correcta, 
+        pes=0.10, 
+        nom="🚇 Línia correcta"
+    )
+    print("      • Línia correcta (pes: 0.10)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_hores_anuals, 
+        pes=0.15, 
+        nom="⏰ Hores anuals (màx 1.605h)"
+    )
+    print("      • Hores anuals màximes (pes: 0.15)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_cobertura_completa, 
+        pes=0.10, 
+        nom="📋 Cobertura completa"
+    )
+    print("      • Cobertura completa (pes: 0.10)")
+    
+    # ===== RESTRICCIONS RÍGIDES (pes mitjà) =====
+    print("\n   🟡 RESTRICCIONS IMPORTANTS:")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_dies_consecutius, 
+        pes=0.05, 
+        nom="📅 Màx 9 dies consecutius"
+    )
+    print("      • Màxim 9 dies consecutius (pes: 0.05)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_descans_minim_12h_rigida, 
+        pes=0.25, 
+        nom="💤 Descans mínim 12h"
+    )
+    print("      • Descans mínim 12h entre torns (pes: 0.25)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_divendres_cap_setmana_rigida, 
+        pes=0.15, 
+        nom="🏖️  Divendres pre-cap setmana"
+    )
+    print("      • Divendres acabar abans 22h si descans cap setmana (pes: 0.15)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_sense_solapaments_rigida, 
+        pes=0.25, 
+        nom="🕐 Sense solapaments"
+    )
+    print("      • Sense solapaments (pes: 0.25)")
+    
+    # ===== RESTRICCIONS D'EQUITAT (bonus) =====
+    print("\n   🟢 RESTRICCIONS D'EQUITAT (BONUS):")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_equitat_canvis_zona, 
+        pes=0.03, 
+        nom="🗺️  Equitat canvis zona"
+    )
+    print("      • Equitat en canvis de zona (pes: 0.03)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_equitat_canvis_torn, 
+        pes=0.03, 
+        nom="🔄 Equitat canvis torn"
+    )
+    print("      • Equitat en canvis de torn (pes: 0.03)")
+    
+    restriccions.afegeix_restriccio(
+        restriccio_distribucio_equilibrada, 
+        pes=0.02, 
+        nom="⚖️  Distribució equilibrada"
+    )
+    print("      • Distribució equilibrada (pes: 0.02)")
+    
+    print(f"\n   ✓ Total restriccions configurades: {len(restriccions.restriccions)} "
+          f"({sum(1 for r in restriccions.restriccions if r['nivell'] == NIVELL_RIGID)} rígides)")
+    print(f"   ✓ Suma de pesos: {sum(r['pes'] for r in restriccions.restriccions):.2f}")
+
+    return restriccions
+
+
+def executa_motor(motor: str, treballadors, torns, necessitats, calendari, restriccions,
+                  estadistiques, parametres_motor: Dict, parametres_execucio: Dict,
+                  verbose: bool = True) -> Tuple[List, Dict, Dict]:
+    """
+    Crea el motor (algorisme genètic o flux de cost mínim) i l'executa.
+    Retorna (assignacions, resultat de l'avaluació, resum de l'execució).
+    """
+    if motor == 'flow':
+        # El motor de flux només fa servir els paràmetres del model (exclusions i horaris)
+        ag = MotorFlux(
+            treballadors=treballadors,
+            torns=torns,
+            necessitats=necessitats,
+            calendari=calendari,
+            restriccions=restriccions,
+            estadistiques=estadistiques,
+            exclude_map=parametres_motor.get('exclude_map'),
+            taula_serveis=parametres_motor.get('taula_serveis')
+        )
+        millor_solucio, resultat_avaluacio = ag.executa(verbose=verbose)
+        return millor_solucio, resultat_avaluacio, ag.resum_execucio
+
+    ag = AlgorismeGenetic(
+        treballadors=treballadors,
+        torns=torns,
+        necessitats=necessitats,
+        calendari=calendari,
+        restriccions=restriccions,
+        estadistiques=estadistiques,
+        **parametres_motor
+    )
+    if parametres_execucio['illes'] > 1:
+        # Model d'illes: subpoblacions en processos separats amb migració periòdica
+        millor_solucio, resultat_avaluacio = ag.executa_illes(
+            generacions=parametres_execucio['generacions'],
+            num_illes=parametres_execucio['illes'],
+            interval_migracio=parametres_execucio['interval_migracio'],
+            topologia=parametres_execucio['topologia'],
+            verbose=verbose,
+            criteris=parametres_execucio['criteris']
+        )
+    else:
+        millor_solucio, resultat_avaluacio = ag.executa(
+            generacions=parametres_execucio['generacions'],
+            verbose=verbose,
+            criteris=parametres_execucio['criteris'],
+            fitxer_checkpoint=parametres_execucio['fitxer_checkpoint'],
+            interval_checkpoint=parametres_execucio['interval_checkpoint'],
+            reprendre=parametres_execucio['reprendre']
+        )
+    return millor_solucio, resultat_avaluacio, ag.resum_execucio
+
+
+def descomposa_per_linia(necessitats, treballadors) -> List[Tuple[str, List, Dict]]:
+    """
+    Separa el problema en components independents: un treballador només pot cobrir
+    necessitats de la seva línia, de manera que cada línia (necessitats + treballadors
+    de la línia) es pot resoldre per separat. Retorna [(línia, necessitats, treballadors)].
+    """
+    necessitats_per_linia: Dict[str, List] = {}
+    for nec in necessitats:
+        necessitats_per_linia.setdefault(nec.linia, []).append(nec)
+    return [
+        (linia, necs, {tid: t for tid, t in treballadors.items() if t.linia == linia})
+        for linia, necs in sorted(necessitats_per_linia.items())
+    ]
+
+
+def _executa_component(args: Tuple) -> Tuple[str, List, Dict, Dict, float, Dict]:
+    """
+    Resol el subproblema d'una línia dins d'un procés del pool. Retorna també
+    l'increment dels comptadors del RestriccionManager (nivells i perfil) del procés
+    """
+    (linia, motor, treballadors, torns, necessitats, calendari, restriccions,
+     estadistiques, parametres_motor, parametres_execucio) = args
+    inici = monotonic()
+    abans = restriccions.instantania()
+    solucio, resultat, resum = executa_motor(
+        motor, treballadors, torns, necessitats, calendari, restriccions, estadistiques,
+        parametres_motor, parametres_execucio, verbose=False
+    )
+    return linia, solucio, resultat, resum, monotonic() - inici, restriccions.increment(abans)
+
+
+def resol_per_linia(motor, treballadors, torns, necessitats, calendari, restriccions,
+                    estadistiques, parametres_motor: Dict,
+                    parametres_execucio: Dict) -> Tuple[List, Dict]:
+    """
+    Resol cada línia en el seu propi procés i combina les assignacions. Dins de cada
+    component l'algorisme s'executa en sèrie (sense pool ni illes) i amb la seva llavor.
+    """
+    components = descomposa_per_linia(necessitats, treballadors)
+    tasques = []
+    resum = {'linies': []}
+    for k, (linia, necs, trebs) in enumerate(components):
+        print(f"   Línia {linia}: {len(necs)} necessitats, {len(trebs)} treballadors")
+        if not trebs:
+            print(f"   ⚠️  La línia {linia} no té treballadors: les seves necessitats queden sense cobrir")
+            continue
+        params_motor = dict(parametres_motor, workers=1)
+        if params_motor.get('seed') is not None:
+            params_motor['seed'] = params_motor['seed'] + k
+        params_exec = dict(parametres_execucio, illes=1)
+        if params_exec.get('fitxer_checkpoint'):
+            params_exec['fitxer_checkpoint'] = f"{params_exec['fitxer_checkpoint']}.{linia}"
+        tasques.append((linia, motor, trebs, torns, necs, calendari, restriccions,
+                        estadistiques, params_motor, params_exec))
+
+    solucio = []
+    if tasques:
+        with ProcessPoolExecutor(max_workers=len(tasques)) as pool:
+            for linia, assignacions, resultat, resum_linia, segons, delta in pool.map(_executa_component, tasques):
+                # Els comptadors de cada línia tornen al gestor del procés principal
+                restriccions.afegeix_comptadors(delta)
+                solucio.extend(assignacions)
+                resum['linies'].append({
+                    'linia': linia,
+                    'assignacions': len(assignacions),
+                    'score': resultat['total'],
+                    'temps_segons': round(segons, 2),
+                    'execucio': resum_linia
+                })
+                print(f"   ✓ Línia {linia}: score {resultat['total']:.2f} | "
+                      f"{len(assignacions)} assignacions | {segons:.1f}s")
+    return solucio, resum
+
+
+def registra_assignacions(assignacions, treballadors, estadistiques):
+    """Afegeix les assignacions a l'històric i actualitza hores i canvis dels treballadors"""
+    for assignacio in sorted(assignacions, key=lambda a: (a.data, a.hora_inici)):
+        historic = estadistiques.get_historic(assignacio.treballador_id)
+        historic.afegir_assignacio(assignacio)
+
+        # Actualitzem els comptadors del treballador
+        treb = treballadors[assignacio.treballador_id]
+        treb.hores_anuals_realitzades += assignacio.durada_hores
+        if assignacio.es_canvi_zona:
+            treb.canvis_zona += 1
+        if assignacio.es_canvi_torn:
+            treb.canvis_torn += 1
+
+
+def resol_per_finestres(motor, treballadors, torns, necessitats, calendari, restriccions,
+                        estadistiques, parametres_motor: Dict, parametres_execucio: Dict,
+                        dies_finestra: int = 7, dies_solapament: int = 0,
+                        per_linia: bool = False) -> Tuple[List, Dict]:
+    """
+    Horitzó lliscant: resol el període per finestres de dies_finestra dies. Les
+    assignacions de cada finestra es congelen a l'històric (còpia de treballadors i
+    estadístiques) abans de passar a la següent, de manera que el descans de 12h, els
+    dies consecutius i les hores anuals es respecten entre finestres. Amb dies_solapament
+    > 0 cada finestra inclou també els primers dies de la següent, que no es congelen i
+    es tornen a optimitzar amb la finestra següent.
+    """
+    if not necessitats:
+        return [], {'finestres': []}
+    treballadors_finestra = copy.deepcopy(treballadors)
+    estadistiques_finestra = copy.deepcopy(estadistiques)
+    data_inici = min(nec.data for nec in necessitats)
+    data_final = max(nec.data for nec in necessitats)
+
+    solucio = []
+    resum = {'dies_finestra': dies_finestra, 'dies_solapament': dies_solapament, 'finestres': []}
+    k = 0
+    while data_inici <= data_final:
+        fi_congelada = data_inici + timedelta(days=dies_finestra)
+        fi_finestra = fi_congelada + timedelta(days=dies_solapament)
+        necs = [nec for nec in necessitats if data_inici <= nec.data < fi_finestra]
+        if necs:
+            params_motor = dict(parametres_motor)
+            if params_motor.get('seed') is not None:
+                params_motor['seed'] = params_motor['seed'] + k
+            params_exec = dict(parametres_execucio)
+            if params_exec.get('fitxer_checkpoint'):
+                params_exec['fitxer_checkpoint'] = f"{params_exec['fitxer_checkpoint']}.{data_inici.isoformat()}"
+
+            inici = monotonic()
+            if per_linia:
+                assignacions, resum_finestra = resol_per_linia(
+                    motor, treballadors_finestra, torns, necs, calendari, restriccions,
+                    estadistiques_finestra, params_motor, params_exec
+                )
+            else:
+                assignacions, _, resum_finestra = executa_motor(
+                    motor, treballadors_finestra, torns, necs, calendari, restriccions,
+                    estadistiques_finestra, params_motor, params_exec, verbose=False
+                )
+            segons = monotonic() - inici
+
+            # Només es congelen els dies propis de la finestra; el solapament es reoptimitza
+            congelades = [a for a in assignacions if a.data < fi_congelada]
+            registra_assignacions(congelades, treballadors_finestra, estadistiques_finestra)
+            solucio.extend(congelades)
+            num_necs = sum(1 for nec in necs if nec.data < fi_congelada)
+            resum['finestres'].append({
+                'inici': data_inici,
+                'fi': min(fi_congelada - timedelta(days=1), data_final),
+                'necessitats': num_necs,
+                'assignacions': len(congelades),
+                'temps_segons': round(segons, 2),
+                'execucio': resum_finestra
+            })
+            print(f"   ✓ Finestra {data_inici} → {min(fi_congelada - timedelta(days=1), data_final)}: "
+                  f"{len(congelades)}/{num_necs} necessitats cobertes | {segons:.1f}s")
+            k += 1
+        data_inici = fi_congelada
+    return solucio, resum
+
+
+def calcula_canvis(anteriors, necessitats, treballadors, exclude_map: Dict[date, Set[str]],
+                   dies_veinatge: int = 0) -> Tuple[List, List, Counter]:
+    """
+    Compara les assignacions de l'execució anterior amb les dades actuals. Una assignació
+    anterior es manté si la necessitat encara existeix i el treballador la pot seguir fent
+    (grup T, mateixa línia, sense descans nou ni exclusió). Retorna (assignacions fixes,
+    necessitats afectades, motius), on les afectades són les necessitats noves, les no
+    cobertes i les que han perdut el treballador. Amb dies_veinatge > 0 també s'alliberen
+    les assignacions de la mateixa línia a menys de dies_veinatge dies d'una afectada.
+    """
+    necessitats_per_clau = {(nec.servei, nec.data): nec for nec in necessitats}
+    motius: Counter = Counter()
+    fixes: Dict[Tuple, object] = {}
+    for a in anteriors:
+        clau = (a.torn_id, a.data)
+        nec = necessitats_per_clau.get(clau)
+        treb = treballadors.get(a.treballador_id)
+        if nec is None:
+            motius['necessitat_eliminada'] += 1
+        elif treb is None or treb.grup != 'T' or treb.linia != nec.linia:
+            motius['treballador_no_disponible'] += 1
+        elif treb.te_descans(a.data):
+            motius['descans_nou'] += 1
+        elif a.treballador_id in exclude_map.get(a.data, ()):
+            motius['treballador_exclos'] += 1
+        elif clau in fixes:
+            motius['duplicada'] += 1
+        else:
+            fixes[clau] = a
+
+    afectades = [nec for clau, nec in necessitats_per_clau.items() if clau not in fixes]
+    motius['necessitats_afectades'] = len(afectades)
+
+    if dies_veinatge > 0 and afectades:
+        veinatge = {(nec.linia, nec.data + timedelta(days=d))
+                    for nec in afectades for d in range(-dies_veinatge, dies_veinatge + 1)}
+        alliberades = [clau for clau in fixes
+                       if (necessitats_per_clau[clau].linia, clau[1]) in veinatge]
+        for clau in alliberades:
+            del fixes[clau]
+            afectades.append(necessitats_per_clau[clau])
+        motius['alliberades_veinatge'] = len(alliberades)
+
+    return list(fixes.values()), afectades, motius
+
+
+def resol_incremental(motor, anteriors, treballadors, torns, necessitats, calendari,
+                      restriccions, estadistiques, parametres_motor: Dict,
+                      parametres_execucio: Dict, dies_veinatge: int = 0) -> Tuple[List, Dict]:
+    """
+    Replanificació incremental: manté les assignacions anteriors que continuen sent
+    vàlides i només torna a optimitzar les necessitats afectades pels canvis (descansos
+    nous, files de cobertura noves o eliminades). Les assignacions fixes es congelen a
+    l'històric (còpia) perquè el motor respecti descansos, dies consecutius i hores.
+    """
+    if not anteriors:
+        print("   " + "!" * 66)
+        print("   ⚠️  MODE INCREMENTAL SENSE SOLUCIÓ ANTERIOR: la taula assig_grup_T és buida.")
+        print("   ⚠️  Es replanifiquen TOTES les necessitats des de zero.")
+        print("   " + "!" * 66)
+    fixes, afectades, motius = calcula_canvis(
+        anteriors, necessitats, treballadors, parametres_motor.get('exclude_map') or {}, dies_veinatge
+    )
+    print(f"   Assignacions anteriors: {len(anteriors)} | mantingudes: {len(fixes)} | "
+          f"necessitats a replanificar: {len(afectades)}")
+    for motiu, quantitat in sorted(motius.items()):
+        if motiu != 'necessitats_afectades' and quantitat:
+            print(f"      - {motiu}: {quantitat}")
+
+    resum = {'anteriors': len(anteriors), 'mantingudes': len(fixes), 'motius': dict(motius)}
+    if not afectades:
+        resum['noves'] = 0
+        return fixes, resum
+
+    treballadors_inc = copy.deepcopy(treballadors)
+    estadistiques_inc = copy.deepcopy(estadistiques)
+    registra_assignacions(fixes, treballadors_inc, estadistiques_inc)
+
+    inici = monotonic()
+    noves, _, resum_motor = executa_motor(
+        motor, treballadors_inc, torns, afectades, calendari, restriccions, estadistiques_inc,
+        parametres_motor, parametres_execucio, verbose=False
+    )
+    segons = monotonic() - inici
+    print(f"   ✓ Replanificades {len(noves)}/{len(afectades)} necessitats en {segons:.1f}s")
+
+    resum.update({'noves': len(noves), 'temps_segons': round(segons, 2), 'execucio': resum_motor})
+    return fixes + noves, resum
+
+
+def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_duplicate: Optional[str] = None,
+         workers: int = 1, seed: Optional[int] = None,
+         illes: int = 1, interval_migracio: int = 10, topologia: str = 'anell',
+        mida_cache: int = 500, backend_avaluacio: str = 'python',
+        criteris: Optional[CriterisAturada] = None,
+        fitxer_checkpoint: Optional[str] = None, interval_checkpoint: int = 10,
+        reprendre: bool = False, cerca_local: bool = False,
+        max_moviments_cerca: int = 40, max_ms_cerca: float = 25.0,
+        sembra: str = 'aleatoria', motor: str = 'ga', per_linia: bool = False,
+        dies_finestra: Optional[int] = None, dies_solapament: int = 0,
+        incremental: bool = False, dies_veinatge: int = 0,
+        arrencada_calenta: bool = False, fraccio_previa: float = 0.2,
+        avaluacio_rapida: bool = False, perfil_restriccions: bool = False):
     print("="*70)
     print(" SISTEMA D'ASSIGNACIÓ DE TREBALLADORS - ALGORISME GENÈTIC")
     print("="*70)
@@ -51,6 +491,19 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
         print("✗ No s'ha pogut establir la connexió a la base de dades.")
         return
     
+    # En mode incremental partim de la solució anterior: cal llegir-la abans de reiniciar la taula
+    assignacions_anteriors = []
+    if incremental or arrencada_calenta:
+        print(f"\n♻️  Carregant la solució anterior (mode {'incremental' if incremental else 'arrencada en calent'})...")
+        assignacions_anteriors = data_loader.carrega_assignacions_grup_T()
+    if incremental:
+        # La solució anterior passa a formar part de la nova: les seves dates s'han de reemplaçar a l'històric.
+        # Amb add_new_only s'exclourien justament els treballadors de la solució anterior (ja són a l'històric)
+        # i calcula_canvis la descartaria sencera
+        if on_duplicate and on_duplicate != 'replace_all':
+            print(f"   ⚠️  Mode incremental: s'ignora on_duplicate='{on_duplicate}' i s'aplica 'replace_all'")
+        on_duplicate = 'replace_all'
+
      # ==================== REINICIAR TAULA ASSIGNACIONS ====================
     print("\n🔄 Reiniciant taula d'assignacions...")
     print("-" * 70)
@@ -165,6 +618,14 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
             historic_dates.add(a.data)
 
     dates_a_cobrir = set(n.data for n in necessitats)
+
+    # Arrencada en calent sense assig_grup_T: fem servir les assignacions de l'històric de les dates a cobrir
+    if arrencada_calenta and not assignacions_anteriors:
+        assignacions_anteriors = [
+            a for hist in estadistiques.historials.values()
+            for a in hist.assignacions_any if a.data in dates_a_cobrir
+        ]
+        print(f"   ℹ️  Solució anterior presa de l'històric: {len(assignacions_anteriors)} assignacions")
     dates_solapades = sorted(dates_a_cobrir.intersection(historic_dates))
 
     # Map de exclusió per data -> set(treballador_id) (ús per 'add_new_only')
@@ -195,6 +656,7 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
 
         if not choice:
             choice = ask_on_duplicate()
+        print(f"   Opció aplicada a les dates solapades: {choice}")
 
         if choice == 'replace_all':
             # Eliminem les assignacions de l'històric per aquestes dates i ajustem comptadors
@@ -229,122 +691,23 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
 
         else:
             print('   ℹ️ Opció d\'on_duplicate desconeguda; no s\'aplicarà cap exclusió.')
+
+    # ===== Taula d'horaris (torn, data) per a l'horitzó de planificació =====
+    taula_serveis = DataLoader.construeix_taula_serveis(torns, calendari, dates_a_cobrir)
+    sense_servei = DataLoader.necessitats_sense_servei(necessitats, torns, calendari, taula_serveis)
+    print(f"\n✓ Horaris precalculats: {len(taula_serveis)} parelles (torn, data)")
+    if sense_servei:
+        print(f"   ⚠️  {len(sense_servei)} necessitats sense horari resolt (no s'assignaran):")
+        for nec, motiu in sense_servei[:10]:
+            print(f"      - {nec.servei} {nec.data}: {motiu}")
+        if len(sense_servei) > 10:
+            print(f"      ... i {len(sense_servei) - 10} més")
     
     # ==================== 2. CONFIGURACIÓ DE RESTRICCIONS ====================
     print("\n⚙️  FASE 2: Configurant restriccions...")
     print("-" * 70)
     
-    restriccions = RestriccionManager()
-    
-    # ===== RESTRICCIONS CRÍTIQUES (pes alt) =====
-    print("\n   🔴 RESTRICCIONS CRÍTIQUES:")
-
-    restriccions.afegeix_restriccio(
-        restriccio_unica_assignacio_per_dia_rigida, 
-        pes=0.30, 
-        nom="🔒 Una assignació per dia (RÍGIDA)"
-    )
-    print("      • Una assignació per dia (pes: 0.30))")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_grup_T, 
-        pes=0.20, 
-        nom="👥 Només grup T"
-    )
-    print("      • Només grup T (pes: 0.20)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_sense_descans, 
-        pes=0.20, 
-        nom="❌ Sense descans"
-    )
-    print("      • Sense descans (pes: 0.20)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_formacio_requerida, 
-        pes=0.15, 
-        nom="🎓 Formació requerida"
-    )
-    print("      • Formació requerida (pes: 0.15)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_linia_correcta, 
-        pes=0.10, 
-        nom="🚇 Línia correcta"
-    )
-    print("      • Línia correcta (pes: 0.10)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_hores_anuals, 
-        pes=0.15, 
-        nom="⏰ Hores anuals (màx 1.605h)"
-    )
-    print("      • Hores anuals màximes (pes: 0.15)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_cobertura_completa, 
-        pes=0.10, 
-        nom="📋 Cobertura completa"
-    )
-    print("      • Cobertura completa (pes: 0.10)")
-    
-    # ===== RESTRICCIONS RÍGIDES (pes mitjà) =====
-    print("\n   🟡 RESTRICCIONS IMPORTANTS:")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_dies_consecutius, 
-        pes=0.05, 
-        nom="📅 Màx 9 dies consecutius"
-    )
-    print("      • Màxim 9 dies consecutius (pes: 0.05)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_descans_minim_12h_rigida, 
-        pes=0.25, 
-        nom="💤 Descans mínim 12h"
-    )
-    print("      • Descans mínim 12h entre torns (pes: 0.25)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_divendres_cap_setmana_rigida, 
-        pes=0.15, 
-        nom="🏖️  Divendres pre-cap setmana"
-    )
-    print("      • Divendres acabar abans 22h si descans cap setmana (pes: 0.15)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_sense_solapaments_rigida, 
-        pes=0.25, 
-        nom="🕐 Sense solapaments"
-    )
-    print("      • Sense solapaments (pes: 0.25)")
-    
-    # ===== RESTRICCIONS D'EQUITAT (bonus) =====
-    print("\n   🟢 RESTRICCIONS D'EQUITAT (BONUS):")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_equitat_canvis_zona, 
-        pes=0.03, 
-        nom="🗺️  Equitat canvis zona"
-    )
-    print("      • Equitat en canvis de zona (pes: 0.03)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_equitat_canvis_torn, 
-        pes=0.03, 
-        nom="🔄 Equitat canvis torn"
-    )
-    print("      • Equitat en canvis de torn (pes: 0.03)")
-    
-    restriccions.afegeix_restriccio(
-        restriccio_distribucio_equilibrada, 
-        pes=0.02, 
-        nom="⚖️  Distribució equilibrada"
-    )
-    print("      • Distribució equilibrada (pes: 0.02)")
-    
-    print(f"\n   ✓ Total restriccions configurades: {len(restriccions.restriccions)}")
-    print(f"   ✓ Suma de pesos: {sum(r['pes'] for r in restriccions.restriccions):.2f}")
+    restriccions = configura_restriccions(perfil_restriccions)
     
     # ==================== 3. EXECUCIÓ DE L'ALGORISME GENÈTIC ====================
     print("\n🧬 FASE 3: Executant algorisme genètic...")
@@ -356,40 +719,124 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
     
     print(f"   Mida població: {MIDA_POBLACIO}")
     print(f"   Generacions: {GENERACIONS}")
+    print(f"   Processos: {workers}")
+    if seed is not None:
+        print(f"   Llavor aleatòria: {seed}")
+    if backend_avaluacio == 'numpy' and not NUMPY_DISPONIBLE:
+        print("   ⚠️  numpy no està instal·lat: s'usa el backend d'avaluació python")
+        backend_avaluacio = 'python'
+    print(f"   Backend d'avaluació: {backend_avaluacio}")
+    print(f"   Sembra de la població: {sembra}")
+    if motor == 'flow':
+        print("   Motor: flux de cost mínim (dia a dia)")
+    if per_linia:
+        print("   Descomposició per línia: un subproblema per procés")
+    if arrencada_calenta:
+        print(f"   Arrencada en calent: {fraccio_previa:.0%} de la població a partir de la solució anterior")
+    if incremental:
+        print(f"   Replanificació incremental"
+              f"{f' (veïnatge de {dies_veinatge} dies)' if dies_veinatge else ''}")
+    if dies_finestra:
+        print(f"   Horitzó lliscant: finestres de {dies_finestra} dies"
+              f"{f' amb {dies_solapament} dies de solapament' if dies_solapament else ''}")
+    if cerca_local:
+        print(f"   Cerca local: màx. {max_moviments_cerca} moviments / {max_ms_cerca:.0f} ms per fill")
+    if avaluacio_rapida:
+        print("   Avaluació ràpida: els individus que violen una restricció rígida no s'avaluen sencers")
+    if perfil_restriccions:
+        print("   Perfil de restriccions: temps, crides i errors per restricció")
+    criteris = criteris or CriterisAturada()
+    if criteris.limit_temps is not None:
+        print(f"   Límit de temps: {criteris.limit_temps:.0f}s")
+    if criteris.score_objectiu is not None:
+        print(f"   Score objectiu: {criteris.score_objectiu:.2f}")
+    if criteris.max_sense_millora is not None:
+        print(f"   Màxim de generacions sense millora: {criteris.max_sense_millora}")
+    if criteris.cobertura_maxima:
+        print(f"   Aturada en arribar a la cobertura màxima")
+    if reprendre and not fitxer_checkpoint:
+        fitxer_checkpoint = FITXER_CHECKPOINT
+    if fitxer_checkpoint:
+        if illes > 1:
+            print("   ⚠️  Els checkpoints no estan disponibles en el model d'illes: no se'n desaran")
+            fitxer_checkpoint = None
+        else:
+            print(f"   Checkpoint: {fitxer_checkpoint} (cada {interval_checkpoint} generacions)"
+                  f"{' - reprenent' if reprendre else ''}")
     print()
     
-    ag = AlgorismeGenetic(
-        treballadors=treballadors,
-        torns=torns,
-        necessitats=necessitats,
-        calendari=calendari,
-        restriccions=restriccions,
-        estadistiques=estadistiques,
+    parametres_motor = dict(
         mida_poblacio=MIDA_POBLACIO,
-        exclude_map=exclude_map
+        exclude_map=exclude_map,
+        workers=workers,
+        seed=seed,
+        mida_cache=mida_cache,
+        backend_avaluacio=backend_avaluacio,
+        cerca_local=cerca_local,
+        max_moviments_cerca=max_moviments_cerca,
+        max_ms_cerca=max_ms_cerca,
+        sembra=sembra,
+        solucio_previa=assignacions_anteriors if arrencada_calenta else None,
+        fraccio_previa=fraccio_previa,
+        taula_serveis=taula_serveis,
+        avaluacio_rapida=avaluacio_rapida
     )
-    
-    millor_solucio, resultat_avaluacio = ag.executa(
+    parametres_execucio = dict(
         generacions=GENERACIONS,
-        verbose=True
+        illes=illes,
+        interval_migracio=interval_migracio,
+        topologia=topologia,
+        criteris=criteris,
+        fitxer_checkpoint=fitxer_checkpoint,
+        interval_checkpoint=interval_checkpoint,
+        reprendre=reprendre
     )
+
+    if incremental:
+        # Només es replanifiquen les necessitats afectades pels canvis des de l'última execució
+        millor_solucio, resum_execucio = resol_incremental(
+            motor, assignacions_anteriors, treballadors, torns, necessitats, calendari,
+            restriccions, estadistiques, parametres_motor, parametres_execucio, dies_veinatge
+        )
+        resultat_avaluacio = restriccions.evalua_solucio(
+            millor_solucio, treballadors, torns, necessitats, calendari, estadistiques
+        )
+        print(f"\n   ✓ Solució replanificada: score {resultat_avaluacio['total']:.2f} | "
+              f"{len(millor_solucio)}/{len(necessitats)} necessitats cobertes")
+    elif dies_finestra:
+        # Horitzó lliscant: una finestra de dies rera l'altra amb l'històric congelat
+        millor_solucio, resum_execucio = resol_per_finestres(
+            motor, treballadors, torns, necessitats, calendari, restriccions, estadistiques,
+            parametres_motor, parametres_execucio, dies_finestra, dies_solapament, per_linia
+        )
+        resultat_avaluacio = restriccions.evalua_solucio(
+            millor_solucio, treballadors, torns, necessitats, calendari, estadistiques
+        )
+        print(f"\n   ✓ Solució combinada: score {resultat_avaluacio['total']:.2f} | "
+              f"{len(millor_solucio)}/{len(necessitats)} necessitats cobertes")
+    elif per_linia:
+        # Subproblemes independents per línia, cadascun en el seu procés
+        millor_solucio, resum_execucio = resol_per_linia(
+            motor, treballadors, torns, necessitats, calendari, restriccions, estadistiques,
+            parametres_motor, parametres_execucio
+        )
+        resultat_avaluacio = restriccions.evalua_solucio(
+            millor_solucio, treballadors, torns, necessitats, calendari, estadistiques
+        )
+        print(f"\n   ✓ Solució combinada: score {resultat_avaluacio['total']:.2f} | "
+              f"{len(millor_solucio)}/{len(necessitats)} necessitats cobertes")
+    else:
+        millor_solucio, resultat_avaluacio, resum_execucio = executa_motor(
+            motor, treballadors, torns, necessitats, calendari, restriccions, estadistiques,
+            parametres_motor, parametres_execucio
+        )
     
     # ==================== 4. ACTUALITZAR HISTÒRIC ====================
     print("\n📊 FASE 4: Actualitzant històric...")
     print("-" * 70)
     
     # Afegim les noves assignacions a l'històric
-    for assignacio in millor_solucio:
-        historic = estadistiques.get_historic(assignacio.treballador_id)
-        historic.afegir_assignacio(assignacio)
-        
-        # Actualitzem els comptadors del treballador
-        treb = treballadors[assignacio.treballador_id]
-        treb.hores_anuals_realitzades += assignacio.durada_hores
-        if assignacio.es_canvi_zona:
-            treb.canvis_zona += 1
-        if assignacio.es_canvi_torn:
-            treb.canvis_torn += 1
+    registra_assignacions(millor_solucio, treballadors, estadistiques)
     
     print(f"   ✓ Històric actualitzat amb {len(millor_solucio)} noves assignacions")
     
@@ -564,7 +1011,9 @@ def main(start_date: Optional[date] = None, end_date: Optional[date] = None, on_
                 'total_necessitats': len(necessitats),
                 'cobertura_percentatge': (len(millor_solucio) / len(necessitats) * 100) if necessitats else 0,
                 'treballadors_utilitzats': len(assignacions_per_treb),
-                'total_hores_assignades': sum(hores_per_treb.values()) if hores_per_treb else 0
+                'total_hores_assignades': sum(hores_per_treb.values()) if hores_per_treb else 0,
+                'execucio': resum_execucio,
+                'perfil_restriccions': restriccions.resum_perfil() if restriccions.perfilat else None
             },
             'scores_restriccions': {
                 nom: {
@@ -754,6 +1203,34 @@ if __name__ == "__main__":
     parser.add_argument('--start-date', '-s', help='Data d\'inici (YYYY-MM-DD o DD/MM/YYYY)')
     parser.add_argument('--end-date', '-e', help='Data final (YYYY-MM-DD o DD/MM/YYYY)')
     parser.add_argument('--on-duplicate', help="Com gestionar assignacions prèvies en les mateixes dates: 'replace_all' or 'add_new_only'")
+    parser.add_argument('--engine', choices=['ga', 'flow'], default='ga', help='Motor de resolució: algorisme genètic (ga) o flux de cost mínim per dies (flow)')
+    parser.add_argument('--per-linia', action='store_true', help='Descompon el problema per línia i resol cada línia en un procés')
+    parser.add_argument('--incremental', action='store_true', help="Replanifica només les necessitats afectades pels canvis respecte de la solució anterior (assig_grup_T)")
+    parser.add_argument('--veinatge', type=int, default=0, metavar='DIES', help='Mode incremental: allibera també les assignacions de la mateixa línia a menys de DIES dies dels canvis')
+    parser.add_argument('--arrencada-calenta', action='store_true', help="Sembra part de la població inicial amb la solució anterior (assig_grup_T o, si és buida, l'històric)")
+    parser.add_argument('--fraccio-previa', type=float, default=0.2, help='Fracció de la població inicial sembrada amb la solució anterior')
+    parser.add_argument('--finestra', type=int, default=None, metavar='DIES', help='Horitzó lliscant: resol el període per finestres de DIES dies (p. ex. 7)')
+    parser.add_argument('--solapament', type=int, default=0, metavar='DIES', help='Dies de solapament entre finestres que es tornen a optimitzar')
+    parser.add_argument('--workers', type=int, default=1, help='Nombre de processos per crear i avaluar la població (per defecte 1)')
+    parser.add_argument('--seed', type=int, default=None, help='Llavor aleatòria per fer execucions reproduïbles')
+    parser.add_argument('--illes', type=int, default=1, help="Nombre d'illes (subpoblacions en processos separats); 1 = població única")
+    parser.add_argument('--interval-migracio', type=int, default=10, help='Generacions entre migracions del model d\'illes')
+    parser.add_argument('--topologia', choices=['anell', 'complet'], default='anell', help='Topologia de migració entre illes')
+    parser.add_argument('--backend-avaluacio', choices=['python', 'numpy'], default='python', help="Avaluació individu a individu (python) o de tota la generació en lot (numpy)")
+    parser.add_argument('--time-limit', type=float, default=None, help="Temps màxim d'execució de l'algorisme en segons")
+    parser.add_argument('--target-score', type=float, default=None, help='Atura l\'algorisme quan el millor score arriba a aquest valor')
+    parser.add_argument('--max-sense-millora', type=int, default=None, help='Atura l\'algorisme després de N generacions sense millora')
+    parser.add_argument('--atura-cobertura', action='store_true', help='Atura l\'algorisme quan es cobreixen totes les necessitats cobribles')
+    parser.add_argument('--checkpoint', default=None, help="Fitxer on es desa periòdicament l'estat de l'algorisme")
+    parser.add_argument('--interval-checkpoint', type=int, default=10, help='Generacions entre checkpoints (per defecte 10)')
+    parser.add_argument('--resume', action='store_true', help=f"Reprèn l'execució des del checkpoint si les dades no han canviat (per defecte {FITXER_CHECKPOINT})")
+    parser.add_argument('--cerca-local', action='store_true', help='Aplica una cerca local (memètica) a cada fill')
+    parser.add_argument('--moviments-cerca', type=int, default=40, help='Moviments avaluats com a màxim per fill a la cerca local')
+    parser.add_argument('--ms-cerca', type=float, default=25.0, help='Mil·lisegons com a màxim per fill a la cerca local')
+    parser.add_argument('--sembra', choices=['aleatoria', 'aparellament'], default='aleatoria', help='Construcció dels individus inicials: voraç aleatòria o aparellament màxim per dia')
+    parser.add_argument('--avaluacio-rapida', action='store_true', help='Omet les restriccions flexibles dels individus que ja violen una restricció rígida')
+    parser.add_argument('--perfil-restriccions', action='store_true', help='Mesura el temps, les crides i els errors de cada restricció (informe final i metadades del JSON)')
+    parser.add_argument('--mida-cache', type=int, default=500, help='Entrades de la cache LRU de fitness per procés (0 = desactivada)')
 
     args = parser.parse_args()
 
@@ -796,4 +1273,20 @@ if __name__ == "__main__":
     if sd is None and ed is None and (args.start_date is None and args.end_date is None):
         sd, ed = ask_for_date_interval()
 
-    main(start_date=sd, end_date=ed, on_duplicate=od)
\ No newline at end of file
+    main(start_date=sd, end_date=ed, on_duplicate=od, workers=args.workers, seed=args.seed,
+         illes=args.illes, interval_migracio=args.interval_migracio, topologia=args.topologia,
+         mida_cache=args.mida_cache, backend_avaluacio=args.backend_avaluacio,
+         criteris=CriterisAturada(
+             limit_temps=args.time_limit,
+             score_objectiu=args.target_score,
+             max_sense_millora=args.max_sense_millora,
+             cobertura_maxima=args.atura_cobertura
+         ),
+         fitxer_checkpoint=args.checkpoint, interval_checkpoint=args.interval_checkpoint,
+         reprendre=args.resume, cerca_local=args.cerca_local,
+         max_moviments_cerca=args.moviments_cerca, max_ms_cerca=args.ms_cerca,
+         sembra=args.sembra, motor=args.engine, per_linia=args.per_linia,
+         dies_finestra=args.finestra, dies_solapament=args.solapament,
+         incremental=args.incremental, dies_veinatge=args.veinatge,
+         arrencada_calenta=args.arrencada_calenta, fraccio_previa=args.fraccio_previa,
+         avaluacio_rapida=args.avaluacio_rapida, perfil_restriccions=args.perfil_restriccions)
\ No newline at end of file
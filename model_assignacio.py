@@ -0,0 +1,321 @@
+# model_assignacio.py - MODEL PRECALCULAT COMPARTIT PELS MOTORS D'ASSIGNACIÓ
+
+from array import array
+from datetime import date
+from typing import List, Dict, Tuple, Optional
+from data_structures import (
+    Assignacio, Treballador, Torn, NecessitatCobertura,
+    ServeiTorn, EstadistiquesGlobals, TimelineTreballador, HorariServei
+)
+from data_loader import DataLoader
+from constraints import _viola_divendres
+
+# Genoma: un enter per necessitat (índex del treballador del grup T, o -1 si no està coberta)
+Genoma = array
+SENSE_ASSIGNAR = -1
+
+# Bits de la matriu necessitat × treballador de canvis respecte del perfil del treballador
+CANVI_ZONA = 1
+CANVI_TORN = 2
+
+
+class LlibreTreballadors:
+    """
+    Comptadors d'un individu per treballador del grup T (índex w): assignacions, hores i
+    canvis de zona/torn dins la solució. S'actualitzen en O(1) cada cop que es posa o es
+    treu un gen, i els comparteixen la construcció, l'encreuament, la mutació i la reparació.
+    """
+    __slots__ = ('assignacions', 'hores', 'canvis_zona', 'canvis_torn')
+
+    def __init__(self, num_treballadors: int):
+        self.assignacions = [0] * num_treballadors
+        self.hores = [0.0] * num_treballadors
+        self.canvis_zona = [0] * num_treballadors
+        self.canvis_torn = [0] * num_treballadors
+
+    def afegeix(self, w: int, durada: float, canvis: int):
+        """Registra una assignació nova del treballador w"""
+        self.assignacions[w] += 1
+        self.hores[w] += durada
+        if canvis & CANVI_ZONA:
+            self.canvis_zona[w] += 1
+        if canvis & CANVI_TORN:
+            self.canvis_torn[w] += 1
+
+    def elimina(self, w: int, durada: float, canvis: int):
+        """Treu una assignació del treballador w"""
+        self.assignacions[w] -= 1
+        self.hores[w] -= durada
+        if canvis & CANVI_ZONA:
+            self.canvis_zona[w] -= 1
+        if canvis & CANVI_TORN:
+            self.canvis_torn[w] -= 1
+
+
+class ModelAssignacio:
+    """
+    Model precalculat d'un problema d'assignació, independent del motor que el resol:
+    índex d'elegibilitat, horaris i durades de les necessitats, timelines de l'històric,
+    matriu de canvis de zona/torn i marges d'hores, més la codificació del genoma.
+    L'algorisme genètic i el motor de flux en deriven i hi afegeixen la seva cerca.
+    """
+
+    def __init__(self,
+                 treballadors: Dict[str, Treballador],
+                 torns: Dict[str, Torn],
+                 necessitats: List[NecessitatCobertura],
+                 calendari: Dict,
+                 estadistiques: EstadistiquesGlobals,
+                 exclude_map: Dict = None,
+                 taula_serveis: Optional[Dict[Tuple[str, date], HorariServei]] = None):
+        self.treballadors = treballadors
+        self.torns = torns
+        self.necessitats = necessitats
+        self.calendari = calendari
+        self.estadistiques = estadistiques
+
+        # exclude_map: opcional, map de date -> set(treballador_id) per excloure
+        self.exclude_map = exclude_map or {}
+
+        # Filtrem només treballadors del grup T
+        self.treballadors_grup_t = {
+            tid: t for tid, t in treballadors.items() if t.grup == 'T'
+        }
+
+        # Els gens guarden l'índex del treballador dins aquesta llista
+        self.ids_grup_t: List[str] = list(self.treballadors_grup_t)
+        self.index_treballador = {tid: w for w, tid in enumerate(self.ids_grup_t)}
+
+        print(f"   Treballadors grup T disponibles: {len(self.treballadors_grup_t)}")
+
+        # Creem un índex ràpid de necessitats per facilitar la cerca
+        self.necessitats_per_data = {}
+        for nec in necessitats:
+            if nec.data not in self.necessitats_per_data:
+                self.necessitats_per_data[nec.data] = []
+            self.necessitats_per_data[nec.data].append(nec)
+
+        # Índex (servei, data) -> posició de la necessitat dins self.necessitats
+        self.index_necessitat = {}
+        for i, nec in enumerate(necessitats):
+            self.index_necessitat.setdefault((nec.servei, nec.data), i)
+
+        # Taula (torn, data) -> horari precalculada pel DataLoader; si no es rep,
+        # es construeix només per a les dates de les necessitats
+        if taula_serveis is None:
+            taula_serveis = DataLoader.construeix_taula_serveis(
+                torns, calendari, {nec.data for nec in necessitats}
+            )
+        horaris = [self._resol_horari(i, nec, taula_serveis) for i, nec in enumerate(necessitats)]
+
+        # Servei (horari) de cada necessitat; None si no es pot resoldre o és
+        # una necessitat duplicada (mateix servei i data) que mai s'assigna
+        self.serveis_necessitat: List[Optional[ServeiTorn]] = [
+            horari.servei if horari else None for horari in horaris
+        ]
+
+        # Interval (inici, fi) en minuts absoluts i durada en hores de cada necessitat assignable
+        self.intervals_necessitat: List[Optional[Tuple[int, int]]] = [
+            (horari.inici, horari.fi) if horari else None for horari in horaris
+        ]
+        self.durades_necessitat: List[float] = [
+            horari.durada_hores if horari else 0.0 for horari in horaris
+        ]
+
+        # Necessitats assignables en ordre cronològic (per agrupar l'avaluació sense ordenar)
+        self.ordre_cronologic: List[int] = sorted(
+            (i for i, horari in enumerate(horaris) if horari), key=lambda i: necessitats[i].data
+        )
+
+        # Timeline de l'històric de cada treballador del grup T (base immutable
+        # de les timelines que mantenen els operadors)
+        self.timelines_historic: Dict[int, TimelineTreballador] = {}
+        for w, treb_id in enumerate(self.ids_grup_t):
+            timeline = TimelineTreballador()
+            for a in self.estadistiques.get_historic(treb_id).assignacions_any:
+                timeline.afegeix(*a.interval_minuts())
+            self.timelines_historic[w] = timeline
+
+        # Índex d'elegibilitat: per cada necessitat, els treballadors del grup T
+        # que passen els filtres estàtics (exclusions, descans, línia i formació).
+        # Els operadors només han de fer les comprovacions dinàmiques.
+        self.candidats_per_necessitat = [
+            self._candidats_estatics(nec) for nec in necessitats
+        ]
+
+        # Matriu necessitat × treballador de canvis de zona/torn (bits CANVI_ZONA i CANVI_TORN).
+        # Una fila només depèn de la zona i el torn de la necessitat: es comparteix entre necessitats
+        files_canvis: Dict[Tuple[str, str], bytearray] = {}
+        self.canvis_necessitat: List[bytearray] = []
+        for nec in necessitats:
+            fila = files_canvis.get((nec.zona, nec.torn))
+            if fila is None:
+                fila = bytearray(
+                    (CANVI_ZONA if t.es_canvi_zona(nec.zona) else 0) |
+                    (CANVI_TORN if t.es_canvi_torn(nec.torn) else 0)
+                    for t in (self.treballadors_grup_t[treb_id] for treb_id in self.ids_grup_t)
+                )
+                files_canvis[(nec.zona, nec.torn)] = fila
+            self.canvis_necessitat.append(fila)
+
+        # Matriu necessitat × treballador de la regla del divendres (1 = l'assignació la viola).
+        # Només depèn del parell; les necessitats que no són divendres comparteixen una fila buida
+        fila_buida = bytearray(len(self.ids_grup_t))
+        self.viola_divendres_necessitat: List[bytearray] = []
+        for nec, servei in zip(necessitats, self.serveis_necessitat):
+            if servei is None or nec.data.weekday() != 4:
+                self.viola_divendres_necessitat.append(fila_buida)
+                continue
+            self.viola_divendres_necessitat.append(bytearray(
+                _viola_divendres(Assignacio(treballador_id=treb_id, torn_id=nec.servei, data=nec.data,
+                                            hora_inici=servei.hora_inici, hora_fi=servei.hora_fi),
+                                 self.treballadors)
+                for treb_id in self.ids_grup_t
+            ))
+
+        # Hores que encara pot fer cada treballador: fins al límit ampliable (restricció) i
+        # fins a l'estàndard (preferència). Els operadors hi comparen les hores del llibre
+        self.marge_hores = [
+            t.max_hores_ampliables - t.hores_anuals_realitzades
+            for t in (self.treballadors_grup_t[treb_id] for treb_id in self.ids_grup_t)
+        ]
+        self.marge_estandard = [
+            t.max_hores_anuals - t.hores_anuals_realitzades
+            for t in (self.treballadors_grup_t[treb_id] for treb_id in self.ids_grup_t)
+        ]
+
+        # Cota superior de cobertura: necessitats amb servei resolt i algun candidat elegible
+        self.cota_cobertura = sum(
+            1 for servei, candidats in zip(self.serveis_necessitat, self.candidats_per_necessitat)
+            if servei is not None and candidats
+        )
+
+        # Per a la cerca local: necessitats cobribles, agrupades per dia, i candidats en conjunt
+        self.necessitats_cobribles = [
+            i for i, (servei, candidats) in enumerate(zip(self.serveis_necessitat, self.candidats_per_necessitat))
+            if servei is not None and candidats
+        ]
+        self.cobribles_per_data: Dict[date, List[int]] = {}
+        for i in self.necessitats_cobribles:
+            self.cobribles_per_data.setdefault(necessitats[i].data, []).append(i)
+        self.conjunt_candidats = [set(candidats) for candidats in self.candidats_per_necessitat]
+
+        # Cache d'objectes Assignacio per (necessitat, treballador), compartits entre individus.
+        # La clau és un enter (necessitat * treballadors + treballador) per no crear tuples
+        self._cache_assignacions: Dict[int, Assignacio] = {}
+
+    def _resol_horari(self, idx_nec: int, necessitat: NecessitatCobertura,
+                      taula_serveis: Dict[Tuple[str, date], HorariServei]) -> Optional[HorariServei]:
+        """Horari que aplica a una necessitat (o None si no és assignable)"""
+        if self.index_necessitat[(necessitat.servei, necessitat.data)] != idx_nec:
+            return None
+        return taula_serveis.get((necessitat.servei, necessitat.data))
+
+    def _candidats_estatics(self, necessitat: NecessitatCobertura) -> List[int]:
+        """
+        Retorna els índexs dels treballadors del grup T que poden cobrir la necessitat
+        segons els filtres que no depenen de la solució
+        """
+        exclosos = self.exclude_map.get(necessitat.data, ())
+        candidats = []
+        for w, treb_id in enumerate(self.ids_grup_t):
+            treb = self.treballadors_grup_t[treb_id]
+            # Filtre 0: Excloem si en aquesta data el treballador ja tenia assignació (opció add_new_only)
+            if treb_id in exclosos:
+                continue
+            # Filtre 1: No pot tenir descans
+            if treb.te_descans(necessitat.data):
+                continue
+            # Filtre 2: Ha de ser de la mateixa línia
+            if treb.linia != necessitat.linia:
+                continue
+            # Filtre 3: Ha de tenir la formació necessària
+            if not necessitat.formacio.intersection(treb.habilitacions):
+                continue
+            candidats.append(w)
+        return candidats
+
+    # ==================== CODIFICACIÓ DEL GENOMA ====================
+
+    def genoma_buit(self) -> Genoma:
+        """Retorna un genoma sense cap necessitat coberta"""
+        return array('i', [SENSE_ASSIGNAR]) * len(self.necessitats)
+
+    def _assignacio(self, idx_nec: int, w: int) -> Assignacio:
+        """Retorna (i crea si cal) l'assignació del treballador w a la necessitat idx_nec"""
+        clau = idx_nec * len(self.ids_grup_t) + w
+        assignacio = self._cache_assignacions.get(clau)
+        if assignacio is None:
+            necessitat = self.necessitats[idx_nec]
+            servei = self.serveis_necessitat[idx_nec]
+            treb_id = self.ids_grup_t[w]
+            assignacio = Assignacio(
+                treballador_id=treb_id,
+                torn_id=necessitat.servei,
+                data=necessitat.data,
+                hora_inici=servei.hora_inici,
+                hora_fi=servei.hora_fi,
+                durada_hores=self.durades_necessitat[idx_nec],
+                es_canvi_zona=bool(self.canvis_necessitat[idx_nec][w] & CANVI_ZONA),
+                es_canvi_torn=bool(self.canvis_necessitat[idx_nec][w] & CANVI_TORN)
+            )
+            self._cache_assignacions[clau] = assignacio
+        return assignacio
+
+    def decodifica(self, genoma: Genoma) -> List[Assignacio]:
+        """Converteix un genoma a la llista d'assignacions (per avaluar i exportar)"""
+        return [self._assignacio(i, w) for i, w in enumerate(genoma) if w != SENSE_ASSIGNAR]
+
+    @staticmethod
+    def num_cobertes(genoma: Genoma) -> int:
+        """Nombre de necessitats cobertes pel genoma"""
+        return len(genoma) - genoma.count(SENSE_ASSIGNAR)
+
+    # ==================== TIMELINES I LLIBRE ====================
+
+    def _timeline(self, timelines: Dict[int, TimelineTreballador], w: int) -> TimelineTreballador:
+        """Retorna (i crea si cal) la timeline del treballador w recolzada en el seu històric"""
+        timeline = timelines.get(w)
+        if timeline is None:
+            timeline = TimelineTreballador(base=self.timelines_historic[w])
+            timelines[w] = timeline
+        return timeline
+
+    def _timelines_solucio(self, genoma: Genoma) -> Dict[int, TimelineTreballador]:
+        """Construeix les timelines per treballador de les assignacions del genoma"""
+        timelines: Dict[int, TimelineTreballador] = {}
+        for idx_nec, w in enumerate(genoma):
+            if w != SENSE_ASSIGNAR:
+                self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+        return timelines
+
+    def _compleix_descans_12h(self, timelines: Dict[int, TimelineTreballador],
+                              w: int, idx_nec: int) -> bool:
+        """
+        Verifica que hi hagi 12h de descans abans i després de la necessitat
+        respecte l'històric i les assignacions actuals del treballador
+        """
+        timeline = timelines.get(w) or self.timelines_historic[w]
+        return timeline.te_lloc(*self.intervals_necessitat[idx_nec])
+
+    def _llibre(self, genoma: Genoma) -> LlibreTreballadors:
+        """Construeix el llibre de treballadors d'un genoma (O(n))"""
+        llibre = LlibreTreballadors(len(self.ids_grup_t))
+        for idx_nec, w in enumerate(genoma):
+            if w != SENSE_ASSIGNAR:
+                self._afegeix_gen(llibre, idx_nec, w)
+        return llibre
+
+    def _afegeix_gen(self, llibre: LlibreTreballadors, idx_nec: int, w: int):
+        llibre.afegeix(w, self.durades_necessitat[idx_nec], self.canvis_necessitat[idx_nec][w])
+
+    def _elimina_gen(self, llibre: LlibreTreballadors, idx_nec: int, w: int):
+        llibre.elimina(w, self.durades_necessitat[idx_nec], self.canvis_necessitat[idx_nec][w])
+
+    def _cap_hores(self, llibre: LlibreTreballadors, w: int, idx_nec: int, alliberades: float = 0.0) -> bool:
+        """Comprova si w pot fer la necessitat sense superar el límit ampliable d'hores"""
+        return llibre.hores[w] - alliberades + self.durades_necessitat[idx_nec] <= self.marge_hores[w] + 1e-9
+
+    def _dins_estandard(self, llibre: LlibreTreballadors, w: int) -> bool:
+        """Comprova si w, amb les hores de la solució, encara és dins les hores estàndard"""
+        return llibre.hores[w] <= self.marge_estandard[w] + 1e-9
@@ -0,0 +1,226 @@
+# motor_flux.py - MOTOR EXACTE PER DIES AMB FLUX DE COST MÍNIM
+
+import heapq
+import time
+from datetime import date, timedelta
+from typing import List, Dict, Tuple, Set, Optional
+from data_structures import (
+    Assignacio, Treballador, Torn, NecessitatCobertura,
+    EstadistiquesGlobals, TimelineTreballador, HorariServei
+)
+from constraints import RestriccionManager
+from model_assignacio import (
+    ModelAssignacio, LlibreTreballadors, Genoma, SENSE_ASSIGNAR, CANVI_ZONA, CANVI_TORN
+)
+
+# Costos de l'assignació d'un treballador a una necessitat
+COST_CANVI_ZONA = 10
+COST_CANVI_TORN = 10
+COST_HORES_AMPLIADES = 20  # Superar les hores estàndard (1.218h)
+COST_PER_ASSIGNACIO = 2  # Equilibri: cada assignació prèvia del treballador encareix la següent
+MAX_DIES_CONSECUTIUS = 9
+
+
+class MotorFlux(ModelAssignacio):
+    """
+    Alternativa exacta a l'algorisme genètic. Resol el període dia a dia: cada dia és un
+    problema d'assignació necessitats × treballadors del grup T que es resol amb flux de
+    cost mínim (cobertura màxima i, entre les de cobertura màxima, la de menor cost).
+    Les 12h de descans, el límit d'hores i els dies consecutius es comproven respecte
+    dels dies ja resolts; la regla del divendres es filtra per parella.
+
+    Comparteix amb l'algorisme genètic el model precalculat (ModelAssignacio: índex
+    d'elegibilitat, horaris, timelines i matrius de canvis i del divendres) i la puntuació
+    final es fa amb el mateix RestriccionManager.
+    """
+
+    def __init__(self,
+                 treballadors: Dict[str, Treballador],
+                 torns: Dict[str, Torn],
+                 necessitats: List[NecessitatCobertura],
+                 calendari: Dict,
+                 restriccions: RestriccionManager,
+                 estadistiques: EstadistiquesGlobals,
+                 exclude_map: Dict = None,
+                 taula_serveis: Optional[Dict[Tuple[str, date], HorariServei]] = None):
+        super().__init__(treballadors, torns, necessitats, calendari, estadistiques,
+                         exclude_map=exclude_map, taula_serveis=taula_serveis)
+        self.restriccions = restriccions
+
+        # Resum de l'última execució (mateix format que l'algorisme genètic)
+        self.resum_execucio: Dict = {}
+
+    def cost_assignacio(self, idx_nec: int, w: int, llibre: LlibreTreballadors) -> int:
+        """Cost d'assignar el treballador w a la necessitat idx_nec amb l'estat actual"""
+        canvis = self.canvis_necessitat[idx_nec][w]
+        cost = COST_PER_ASSIGNACIO * llibre.assignacions[w]
+        if canvis & CANVI_ZONA:
+            cost += COST_CANVI_ZONA
+        if canvis & CANVI_TORN:
+            cost += COST_CANVI_TORN
+        if llibre.hores[w] + self.durades_necessitat[idx_nec] > self.marge_estandard[w]:
+            cost += COST_HORES_AMPLIADES
+        return cost
+
+    @staticmethod
+    def _ratxa(dies_treballats: Set, data) -> int:
+        """Dies consecutius que acumularia el treballador si treballa també aquest dia"""
+        ratxa = 1
+        while data - timedelta(days=ratxa) in dies_treballats:
+            ratxa += 1
+        return ratxa
+
+    def resol(self) -> Tuple[Genoma, int]:
+        """Resol tots els dies en ordre cronològic. Retorna el genoma i el cost total"""
+        genoma = self.genoma_buit()
+        timelines: Dict[int, TimelineTreballador] = {}
+        llibre = LlibreTreballadors(len(self.ids_grup_t))
+        dies_treballats: Dict[int, Set] = {
+            w: {a.data for a in self.estadistiques.get_historic(treb_id).assignacions_any}
+            for w, treb_id in enumerate(self.ids_grup_t)
+        }
+        cost_total = 0
+
+        for data in sorted(self.cobribles_per_data):
+            necessitats_dia = self.cobribles_per_data[data]
+            arestes = []
+            for idx_nec in necessitats_dia:
+                opcions = []
+                for w in self.candidats_per_necessitat[idx_nec]:
+                    if not self._cap_hores(llibre, w, idx_nec):
+                        continue
+                    if not self._compleix_descans_12h(timelines, w, idx_nec):
+                        continue
+                    if self._ratxa(dies_treballats[w], data) > MAX_DIES_CONSECUTIUS:
+                        continue
+                    if self.viola_divendres_necessitat[idx_nec][w]:
+                        continue
+                    opcions.append((w, self.cost_assignacio(idx_nec, w, llibre)))
+                arestes.append(opcions)
+
+            aparellament, cost = assignacio_cost_minim(arestes)
+            cost_total += cost
+            for idx_nec, w in zip(necessitats_dia, aparellament):
+                if w == SENSE_ASSIGNAR:
+                    continue
+                genoma[idx_nec] = w
+                self._timeline(timelines, w).afegeix(*self.intervals_necessitat[idx_nec])
+                self._afegeix_gen(llibre, idx_nec, w)
+                dies_treballats[w].add(data)
+
+        return genoma, cost_total
+
+    def executa(self, verbose: bool = True) -> Tuple[List[Assignacio], Dict]:
+        """
+        Resol el període i el puntua amb el RestriccionManager (mateix format de
+        retorn que AlgorismeGenetic.executa, per poder-los comparar directament)
+        """
+        inici = time.monotonic()
+        genoma, cost = self.resol()
+        resultat = self.restriccions.evalua_solucio(
+            self.decodifica(genoma), self.treballadors, self.torns,
+            self.necessitats, self.calendari, self.estadistiques
+        )
+        segons = time.monotonic() - inici
+
+        self.resum_execucio['motor'] = {
+            'motor': 'flux',
+            'cost': cost,
+            'temps_segons': round(segons, 2),
+            'cobertes': self.num_cobertes(genoma),
+            'cota_cobertura': self.cota_cobertura
+        }
+
+        if verbose:
+            print(f"\n   ✓ Motor de flux finalitzat en {segons:.2f}s!")
+            print(f"   → Score: {resultat['total']:.2f}")
+            print(f"   → Cost de l'assignació: {cost}")
+            print(f"   → Assignacions: {self.num_cobertes(genoma)}/{len(self.necessitats)} "
+                  f"(cota {self.cota_cobertura})")
+
+        return self.decodifica(genoma), resultat
+
+
+def assignacio_cost_minim(arestes: List[List[Tuple[int, int]]]) -> Tuple[List[int], int]:
+    """
+    Flux de cost mínim sobre el graf font -> necessitat -> treballador -> pou (capacitats 1).
+    arestes[i] és la llista de (treballador, cost) possibles per a la necessitat i.
+    Camins augmentants més curts amb potencials (Dijkstra): el resultat cobreix el
+    màxim de necessitats i, entre aquestes solucions, té el cost mínim.
+    Retorna el treballador de cada necessitat (o SENSE_ASSIGNAR) i el cost total.
+    """
+    n = len(arestes)
+    treballadors = sorted({w for opcions in arestes for w, _ in opcions})
+    index_treb = {w: k for k, w in enumerate(treballadors)}
+    m = len(treballadors)
+    font, pou = n + m, n + m + 1
+    num_nodes = n + m + 2
+
+    # Llista d'arcs amb l'arc residual a continuació: [destí, capacitat, cost]
+    desti: List[int] = []
+    capacitat: List[int] = []
+    cost_arc: List[int] = []
+    sortints: List[List[int]] = [[] for _ in range(num_nodes)]
+
+    def afegeix_arc(u: int, v: int, cost: int):
+        sortints[u].append(len(desti))
+        desti.append(v)
+        capacitat.append(1)
+        cost_arc.append(cost)
+        sortints[v].append(len(desti))
+        desti.append(u)
+        capacitat.append(0)
+        cost_arc.append(-cost)
+
+    for i, opcions in enumerate(arestes):
+        afegeix_arc(font, i, 0)
+        for w, cost in opcions:
+            afegeix_arc(i, n + index_treb[w], cost)
+    for k in range(m):
+        afegeix_arc(n + k, pou, 0)
+
+    potencial = [0] * num_nodes  # Tots els costos inicials són no negatius
+    cost_total = 0
+    infinit = float('inf')
+
+    while True:
+        distancia = [infinit] * num_nodes
+        arc_previ = [-1] * num_nodes
+        distancia[font] = 0
+        cua = [(0, font)]
+        while cua:
+            d, u = heapq.heappop(cua)
+            if d > distancia[u]:
+                continue
+            for e in sortints[u]:
+                if capacitat[e] == 0:
+                    continue
+                v = desti[e]
+                nd = d + cost_arc[e] + potencial[u] - potencial[v]
+                if nd < distancia[v]:
+                    distancia[v] = nd
+                    arc_previ[v] = e
+                    heapq.heappush(cua, (nd, v))
+        if distancia[pou] == infinit:
+            break
+
+        for u in range(num_nodes):
+            if distancia[u] < infinit:
+                potencial[u] += distancia[u]
+
+        # Augmentem una unitat pel camí trobat
+        v = pou
+        while v != font:
+            e = arc_previ[v]
+            capacitat[e] -= 1
+            capacitat[e ^ 1] += 1
+            cost_total += cost_arc[e]
+            v = desti[e ^ 1]
+
+    aparellament = [SENSE_ASSIGNAR] * n
+    for i in range(n):
+        for e in sortints[i]:
+            v = desti[e]
+            if n <= v < n + m and capacitat[e] == 0 and e % 2 == 0:
+                aparellament[i] = treballadors[v - n]
+    return aparellament, cost_total